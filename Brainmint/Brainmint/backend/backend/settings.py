@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
+import tempfile
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -52,6 +54,8 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "engine.instrumentation.QueryInstrumentationMiddleware",
+    "engine.metrics.MetricsMiddleware",
 ]
 
 ROOT_URLCONF = "backend.urls"
@@ -126,3 +130,95 @@ STATIC_URL = "static/"
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+
+# MySQL connection pool used by engine.db.get_db (per process)
+# https://docs.gunicorn.org/en/stable/design.html#how-many-workers
+
+DB_POOL = {
+    "max_size": 10,
+    "idle_timeout": 300,
+    "recycle": 3600,
+    "ping_interval": 30,
+    "wait_timeout": 5,
+}
+
+
+# Slow-query log (engine/slowlog.py): statements slower than threshold_ms
+# are logged with their EXPLAIN; per-fingerprint aggregates cover the last
+# window_seconds.
+
+SLOW_QUERY_LOG = {
+    "threshold_ms": 200,
+    "window_seconds": 300,
+    "explain": True,
+}
+
+
+# Push events for board mutations (engine/events.py). LocalHub fans out
+# within one process; use a broker-backed hub when running several workers.
+
+EVENT_HUB = "engine.events.LocalHub"
+
+
+# JSON renderer for engine responses (engine/renderers.py). Unset: orjson
+# when installed, else the stdlib encoder ("engine.renderers.stdlib_dumps").
+
+# JSON_RENDERER = "engine.renderers.orjson_dumps"
+
+
+# /metrics answers Django staff and scrapers sending
+# "Authorization: Bearer <token>" for one of these tokens.
+
+METRICS_TOKENS = [token for token in os.environ.get("METRICS_TOKENS", "").split(",") if token]
+
+
+# Git host APIs for the Code page (engine/integrations.py, DEFAULTS there).
+# A repository listing fetches its pages on listing_workers threads and
+# returns what it has after listing_budget seconds.
+# The data is synced into repo_cache by `python manage.py sync_repos`,
+# which must run next to the web workers (see engine/reposync.py).
+
+INTEGRATIONS = {
+    "listing_budget": 10,
+    "listing_workers": 4,
+}
+
+
+# Caches
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# "versions" holds the per-user data versions behind the API ETags
+# (engine/versions.py). It must be shared by all workers: the file cache
+# covers one host; use memcached or redis when serving from several.
+# "integrations" keeps git host API responses for ETag revalidation
+# (engine/httpclient.py); a per-process cache is enough for that.
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "versions": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": Path(tempfile.gettempdir()) / "brainmint-versions",
+    },
+    "integrations": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "OPTIONS": {"MAX_ENTRIES": 5000},
+    },
+}
+
+
+# Logging
+# engine.queries gets one JSON line per request that ran SQL
+# (engine/instrumentation.py)
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "engine": {"handlers": ["console"], "level": "INFO"},
+    },
+}
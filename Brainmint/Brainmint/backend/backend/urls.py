@@ -1,7 +1,10 @@
 from django.contrib import admin
 from django.urls import path, include
 
+from engine import views as engine_views
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('engine.urls')),   # 👈 API PREFIX
+    path('metrics', engine_views.metrics, name='metrics'),
 ]
@@ -0,0 +1,67 @@
+"""
+Change sequence for delta sync of the task board.
+
+Each user has a monotonically increasing change_seq (kept on their
+user_counters row). Every task write takes the next value and stamps it
+on the rows it touches (tasks.change_seq) or, for deletes, on a
+tombstone. /tasks/changes/?since=N then returns everything stamped
+after N. Taking the value locks the user's counters row until commit,
+so a user's sequence numbers become visible in order.
+"""
+
+TASK_TOMBSTONES_DDL = """
+    CREATE TABLE IF NOT EXISTS task_tombstones (
+        task_id INT NOT NULL PRIMARY KEY,
+        user_id INT NOT NULL,
+        change_seq BIGINT NOT NULL,
+        deleted_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        KEY idx_tombstones_user_seq (user_id, change_seq)
+    )
+"""
+
+# More changes than this and the client is told to reload the board
+MAX_CHANGES = 1000
+
+
+def next_change_seq(cursor, user_id):
+    """Allocate the user's next change sequence number (in the caller's transaction)"""
+    cursor.execute("""
+        INSERT INTO user_counters (user_id, change_seq) VALUES (%s, LAST_INSERT_ID(1))
+        ON DUPLICATE KEY UPDATE change_seq = LAST_INSERT_ID(change_seq + 1)
+    """, (user_id,))
+    return cursor.lastrowid
+
+
+def next_task_change_seq(cursor, task_id):
+    """
+    next_change_seq for whoever owns task_id, found in the same statement;
+    None when there is no such task. The task row is locked first, the
+    order the other task writes take their locks in.
+    """
+    cursor.execute("""
+        INSERT INTO user_counters (user_id, change_seq)
+        SELECT user_id, LAST_INSERT_ID(1) FROM tasks WHERE id = %s FOR UPDATE
+        ON DUPLICATE KEY UPDATE change_seq = LAST_INSERT_ID(user_counters.change_seq + 1)
+    """, (task_id,))
+    return cursor.lastrowid or None
+
+
+def record_task_deletion(cursor, user_id, task_id, seq):
+    cursor.execute("""
+        INSERT INTO task_tombstones (task_id, user_id, change_seq) VALUES (%s, %s, %s)
+        ON DUPLICATE KEY UPDATE user_id = %s, change_seq = %s
+    """, (task_id, user_id, seq, user_id, seq))
+
+
+def record_task_deletions(cursor, rows):
+    """Tombstones for several deleted tasks; rows are (task_id, user_id, seq)"""
+    cursor.executemany("""
+        INSERT INTO task_tombstones (task_id, user_id, change_seq) VALUES (%s, %s, %s)
+        ON DUPLICATE KEY UPDATE user_id = VALUES(user_id), change_seq = VALUES(change_seq)
+    """, rows)
+
+
+def current_change_seq(cursor, user_id):
+    cursor.execute("SELECT change_seq FROM user_counters WHERE user_id = %s", (user_id,))
+    row = cursor.fetchone()
+    return row["change_seq"] if row else 0
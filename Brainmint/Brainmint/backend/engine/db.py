@@ -1,10 +1,249 @@
+import os
+import threading
+import time
+from collections import deque
+
 import pymysql
+from django.conf import settings
+
+from .instrumentation import InstrumentedCursor
+
+DB_CONFIG = {
+    "host": "localhost",
+    "user": "root",
+    "password": "**",
+    "database": "brainmint",
+}
+
+# Overridable per deployment with DB_POOL in settings.py
+POOL_DEFAULTS = {
+    "max_size": 10,        # connections per process (per gunicorn worker)
+    "idle_timeout": 300,   # close connections idle longer than this (seconds)
+    "recycle": 3600,       # close connections older than this (seconds)
+    "ping_interval": 30,   # ping idle connections before reuse after this (seconds)
+    "wait_timeout": 5,     # max time to wait for a free connection (seconds)
+}
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes free within wait_timeout"""
+
+
+def _connect():
+    return pymysql.connect(cursorclass=pymysql.cursors.DictCursor, **DB_CONFIG)
+
+
+class PooledConnection:
+    """Proxy around a pymysql connection; close() hands it back to the pool"""
+
+    def __init__(self, pool, conn, created_at):
+        self._pool = pool
+        self._conn = conn
+        self._created_at = created_at
+
+    def _live(self):
+        conn = self.__dict__.get("_conn")
+        if conn is None:
+            raise pymysql.err.InterfaceError("Connection already returned to pool")
+        return conn
+
+    def __getattr__(self, name):
+        return getattr(self._live(), name)
+
+    def cursor(self):
+        # Times each statement for the per-request totals (engine/instrumentation.py)
+        return InstrumentedCursor(self._live().cursor())
+
+    def close(self):
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            self._pool.release(conn, self._created_at)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __del__(self):
+        # Safety net for views that return before reaching db.close()
+        if self.__dict__.get("_conn") is not None:
+            self.close()
+
+
+class ConnectionPool:
+    """Bounded, thread-safe pool of MySQL connections for one process"""
+
+    def __init__(self, connect=_connect, max_size=10, idle_timeout=300,
+                 recycle=3600, ping_interval=30, wait_timeout=5):
+        self._connect = connect
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.recycle = recycle
+        self.ping_interval = ping_interval
+        self.wait_timeout = wait_timeout
+
+        self._cond = threading.Condition()
+        self._idle = deque()  # (conn, created_at, last_used), most recent on the right
+        self._size = 0        # open connections, idle + in use
+        self._in_use = 0
+
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._timeouts = 0
+        self._created = 0
+        self._discarded = 0
+
+    def acquire(self):
+        """Check out a connection, waiting up to wait_timeout for a free slot"""
+        deadline = time.monotonic() + self.wait_timeout
+        waited = False
+        wait_started = None
+
+        while True:
+            entry = None
+            stale = []
+            with self._cond:
+                while True:
+                    now = time.monotonic()
+                    while self._idle:
+                        conn, created_at, last_used = self._idle.pop()
+                        if now - last_used > self.idle_timeout or now - created_at > self.recycle:
+                            stale.append(conn)
+                            self._size -= 1
+                            continue
+                        entry = (conn, created_at, last_used)
+                        break
+                    if entry or self._size < self.max_size:
+                        break
+                    if not waited:
+                        waited = True
+                        wait_started = now
+                        self._waits += 1
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        self._wait_time += now - wait_started
+                        raise PoolTimeout(
+                            f"No free database connection after {self.wait_timeout}s "
+                            f"(max_size={self.max_size})"
+                        )
+                    self._cond.wait(remaining)
+
+                if entry is None:
+                    self._size += 1
+                self._in_use += 1
+                self._checkouts += 1
+                if waited:
+                    self._wait_time += time.monotonic() - wait_started
+                    waited = False
+
+            for conn in stale:
+                self._close_quietly(conn)
+
+            if entry is None:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    self._forget()
+                    raise
+                with self._cond:
+                    self._created += 1
+                return PooledConnection(self, conn, time.monotonic())
+
+            conn, created_at, last_used = entry
+            if time.monotonic() - last_used > self.ping_interval:
+                try:
+                    conn.ping(reconnect=False)
+                except Exception:
+                    # Dead connection: drop it and try again for another one
+                    self._close_quietly(conn)
+                    self._forget()
+                    continue
+            return PooledConnection(self, conn, created_at)
+
+    def release(self, conn, created_at):
+        """Return a checked-out connection; any open transaction is rolled back"""
+        try:
+            # Ends the transaction (and its snapshot) left open by plain SELECTs
+            conn.rollback()
+        except Exception:
+            self._close_quietly(conn)
+            self._forget()
+            return
+
+        now = time.monotonic()
+        if now - created_at > self.recycle:
+            self._close_quietly(conn)
+            self._forget()
+            return
+
+        with self._cond:
+            self._in_use -= 1
+            self._idle.append((conn, created_at, now))
+            self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "max_size": self.max_size,
+                "size": self._size,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "checkouts": self._checkouts,
+                "waits": self._waits,
+                "wait_time_total": round(self._wait_time, 6),
+                "timeouts": self._timeouts,
+                "created": self._created,
+                "discarded": self._discarded,
+            }
+
+    def close_all(self):
+        with self._cond:
+            idle = [entry[0] for entry in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+        for conn in idle:
+            self._close_quietly(conn)
+
+    def _forget(self):
+        """Account for a checked-out connection that will not come back"""
+        with self._cond:
+            self._size -= 1
+            self._in_use -= 1
+            self._discarded += 1
+            self._cond.notify()
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Process-wide pool, rebuilt after fork so workers never share sockets"""
+    global _pool, _pool_pid
+    pid = os.getpid()
+    if _pool is None or _pool_pid != pid:
+        with _pool_lock:
+            if _pool is None or _pool_pid != pid:
+                options = {**POOL_DEFAULTS, **getattr(settings, "DB_POOL", {})}
+                _pool = ConnectionPool(**options)
+                _pool_pid = pid
+    return _pool
+
 
 def get_db():
-    return pymysql.connect(
-        host="localhost",
-        user="root",
-        password="**",
-        database="brainmint",
-        cursorclass=pymysql.cursors.DictCursor
-    )
+    return get_pool().acquire()
+
+
+def pool_stats():
+    return get_pool().stats()
@@ -0,0 +1,197 @@
+"""
+Push channel for board mutations (server-sent events).
+
+Task write endpoints publish a compact event after they commit;
+/tasks/events/?user_id= streams a user's events to every open tab.
+Fan-out goes through a hub, settings.EVENT_HUB (dotted path, default
+LocalHub). LocalHub only reaches subscribers in the same process, so it
+needs a single worker (one ASGI process). With several workers, point
+EVENT_HUB at a broker-backed class with the same subscribe/unsubscribe/
+publish methods. A subscriber whose put() raises is dropped and closed,
+which ends its stream (the browser reconnects); the others still get
+the event.
+
+Serve the stream under ASGI (backend/asgi.py): each connection is then a
+coroutine. Under WSGI every open stream holds a worker thread.
+"""
+import asyncio
+import logging
+import queue
+import threading
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .renderers import get_renderer
+
+logger = logging.getLogger("engine.events")
+
+HEARTBEAT_SECONDS = 15
+HEARTBEAT = b": keepalive\n\n"
+QUEUE_SIZE = 100
+
+# A subscriber that falls this far behind gets one of these instead
+RESYNC = {"type": "resync"}
+
+
+class Subscription:
+    """Events for one stream, read from a blocking (WSGI) generator"""
+
+    def __init__(self, user_id):
+        self.user_id = str(user_id)
+        self.closed = False
+        self._queue = queue.Queue(QUEUE_SIZE)
+        # Publishers take it so only one can drain a full queue and refill it
+        self._put_lock = threading.Lock()
+
+    def put(self, event):
+        """Called from publishing threads; never blocks on the reader"""
+        with self._put_lock:
+            try:
+                self._queue.put_nowait(event)
+            except queue.Full:
+                self._overflow()
+
+    def _overflow(self):
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+        # Only the reader takes items out meanwhile, so there is room
+        self._queue.put_nowait(RESYNC)
+
+    def get(self, timeout):
+        """Next event, or None after `timeout` seconds"""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class AsyncSubscription(Subscription):
+    """Events for one stream, read from an async (ASGI) generator"""
+
+    def __init__(self, user_id):
+        self.user_id = str(user_id)
+        self.closed = False
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(QUEUE_SIZE)
+
+    def put(self, event):
+        self._loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event):
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self._overflow()
+
+    def _overflow(self):
+        while not self._queue.empty():
+            self._queue.get_nowait()
+        self._queue.put_nowait(RESYNC)
+
+    async def get(self, timeout):
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class LocalHub:
+    """In-process fan-out from publishing views to open streams"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def subscribe(self, subscription):
+        with self._lock:
+            self._subscribers.setdefault(subscription.user_id, set()).add(subscription)
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_id, set())
+            subscribers.discard(subscription)
+            if not subscribers:
+                self._subscribers.pop(subscription.user_id, None)
+
+    def publish(self, user_id, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(str(user_id), ()))
+        for subscription in subscribers:
+            try:
+                subscription.put(event)
+            except Exception:
+                # e.g. a stream whose event loop has closed; the others still get the event
+                logger.warning("Dropping event subscriber for user %s", user_id, exc_info=True)
+                self.unsubscribe(subscription)
+                subscription.closed = True
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(s) for s in self._subscribers.values())
+
+
+_hub = None
+_hub_lock = threading.Lock()
+
+
+def get_hub():
+    global _hub
+    if _hub is None:
+        with _hub_lock:
+            if _hub is None:
+                _hub = import_string(getattr(settings, "EVENT_HUB", "engine.events.LocalHub"))()
+    return _hub
+
+
+def publish_task_event(user_id, op, task_id, version, **fields):
+    """Tell the user's open streams a task changed (call after commit)"""
+    event = {"type": "task", "op": op, "task_id": str(task_id), "version": version}
+    if fields:
+        event["fields"] = fields
+    try:
+        get_hub().publish(user_id, event)
+    except Exception:
+        # Clients catch up through /tasks/changes/ on their next event or reload
+        pass
+
+
+def format_event(event):
+    """One SSE frame; task events carry their change version as the id"""
+    lines = []
+    if event.get("version") is not None:
+        lines.append(f"id: {event['version']}")
+    lines.append(f"event: {event['type']}")
+    lines.append(f"data: {get_renderer()(event).decode()}")
+    return ("\n".join(lines) + "\n\n").encode()
+
+
+def stream(user_id):
+    """Blocking SSE generator for WSGI servers"""
+    hub = get_hub()
+    subscription = Subscription(user_id)
+    hub.subscribe(subscription)
+    try:
+        yield b"retry: 3000\n\n"
+        while not subscription.closed:
+            event = subscription.get(HEARTBEAT_SECONDS)
+            yield HEARTBEAT if event is None else format_event(event)
+    finally:
+        hub.unsubscribe(subscription)
+
+
+async def astream(user_id):
+    """SSE generator for ASGI servers"""
+    hub = get_hub()
+    subscription = AsyncSubscription(user_id)
+    hub.subscribe(subscription)
+    try:
+        yield b"retry: 3000\n\n"
+        while not subscription.closed:
+            event = await subscription.get(HEARTBEAT_SECONDS)
+            yield HEARTBEAT if event is None else format_event(event)
+    finally:
+        hub.unsubscribe(subscription)
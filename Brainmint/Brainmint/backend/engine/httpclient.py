@@ -0,0 +1,399 @@
+"""
+Keep-alive JSON client for the git host APIs.
+
+HTTPClient keeps idle connections per (scheme, host, port) and reuses
+them across requests and threads, asks for gzip, and revalidates:
+responses carrying an ETag or Last-Modified are kept in a Django cache
+(keyed by URL and credentials) and requested again with If-None-Match /
+If-Modified-Since, so an unchanged resource costs a 304 (which GitHub
+does not count against the rate limit). 5xx, 429 and secondary rate
+limit 403s are retried with jittered exponential backoff, honouring
+Retry-After up to max_retry_wait; dropped keep-alive connections are
+retried at once. A caller's deadline bounds all of it: a retry whose
+wait would run past the deadline is not made.
+
+It also stops calling hosts that are known to refuse. A CircuitBreaker
+per host opens after breaker_threshold consecutive transport errors or
+5xx responses, and one per (host, credential) does the same on 401s.
+While a breaker is open, calls fail fast with CircuitOpen. After
+breaker_cooldown seconds, one trial call is let through; it closes the
+breaker or opens it again. The rate-limit headers from each response
+(X-RateLimit-*, GitLab's RateLimit-*, Retry-After on 403/429) are kept
+per credential. Once a credential's quota is spent, calls raise
+RateLimited until the reset. Both exceptions are Unavailable and carry
+retry_after, and nothing is sent. The repo sync worker keeps the
+cached data and retries then. gauges() reports breaker states and
+quotas per host for /metrics.
+
+engine.integrations builds the per-process client from settings.
+"""
+import gzip
+import hashlib
+import http.client
+import json
+import random
+import threading
+import time
+import urllib.parse
+
+from django.core.cache import caches
+
+from .metrics import count_refused, observe_outbound
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Headers kept with a cached body and replayed on a 304 (pagination lives in them)
+CACHED_HEADERS = ("Link", "X-Total", "X-Total-Pages", "X-Next-Page", "ETag", "Last-Modified")
+
+
+class HTTPError(Exception):
+    def __init__(self, status, reason, headers=None):
+        super().__init__(f"HTTP {status}: {reason}")
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+
+
+class Unavailable(Exception):
+    """Refused without sending; retry_after is seconds until a call may go out"""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitOpen(Unavailable):
+    pass
+
+
+class RateLimited(Unavailable):
+    pass
+
+
+def _message(items):
+    headers = http.client.HTTPMessage()
+    for name, value in items:
+        headers[name] = value
+    return headers
+
+
+class ConnectionPool:
+    """Idle keep-alive connections per (scheme, host, port)"""
+
+    def __init__(self, max_idle_per_host=4):
+        self.max_idle_per_host = max_idle_per_host
+        self._lock = threading.Lock()
+        self._idle = {}
+
+    def acquire(self, key, timeout):
+        """(connection, reused)"""
+        with self._lock:
+            idle = self._idle.get(key)
+            conn = idle.pop() if idle else None
+        if conn is not None:
+            conn.timeout = timeout
+            if conn.sock is not None:
+                conn.sock.settimeout(timeout)
+            return conn, True
+        scheme, host, port = key
+        cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        return cls(host, port, timeout=timeout), False
+
+    def release(self, key, conn):
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle_per_host:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def clear(self):
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for conns in idle.values():
+            for conn in conns:
+                conn.close()
+
+
+class CircuitBreaker:
+    """
+    Closed, then open (calls refused) after `threshold` consecutive
+    failures. `cooldown` seconds after it opened, or after the last trial
+    started, it goes half-open and lets one trial call through.
+    """
+    CLOSED, HALF_OPEN, OPEN = 0, 1, 2
+
+    def __init__(self, threshold=5, cooldown=30):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.failures = 0
+        self._since = 0.0
+        self._lock = threading.Lock()
+
+    def retry_in(self):
+        """0 if a call may go out (claiming the trial when half-open), else seconds to wait"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return 0
+            wait = self._since + self.cooldown - time.monotonic()
+            if wait > 0:
+                return wait
+            # A trial whose outcome never came back is replaced after another cooldown
+            self.state, self._since = self.HALF_OPEN, time.monotonic()
+            return 0
+
+    def record(self, ok):
+        with self._lock:
+            if ok:
+                self.state, self.failures = self.CLOSED, 0
+                return
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.threshold:
+                self.state, self._since = self.OPEN, time.monotonic()
+
+
+def _header(headers, *names):
+    for name in names:
+        value = headers.get(name)
+        if value is not None and value.strip().isdigit():
+            return int(value)
+    return None
+
+
+class RateLimits:
+    """The quota each host last reported per credential"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._quotas = {}  # (host, credential id) -> {"remaining", "reset", "blocked_until"}
+
+    def update(self, key, status, headers):
+        remaining = _header(headers, "X-RateLimit-Remaining", "RateLimit-Remaining")
+        reset = _header(headers, "X-RateLimit-Reset", "RateLimit-Reset")  # epoch seconds
+        retry_after = _header(headers, "Retry-After")
+        blocked_until = None
+        if status in (403, 429) and retry_after is not None:
+            blocked_until = time.time() + retry_after
+        elif status in (403, 429) and remaining == 0:
+            blocked_until = reset or time.time() + 60
+        elif remaining == 0 and reset:
+            # The call that spent the quota; the next one would be refused
+            blocked_until = reset
+        if remaining is None and blocked_until is None:
+            return
+        with self._lock:
+            quota = self._quotas.setdefault(key, {"remaining": None, "reset": None, "blocked_until": None})
+            if remaining is not None:
+                quota["remaining"], quota["reset"] = remaining, reset
+            quota["blocked_until"] = blocked_until
+
+    def retry_in(self, key):
+        with self._lock:
+            quota = self._quotas.get(key)
+            blocked_until = quota and quota["blocked_until"]
+        return max(blocked_until - time.time(), 0) if blocked_until else 0
+
+    def snapshot(self):
+        with self._lock:
+            return {key: dict(quota) for key, quota in self._quotas.items()}
+
+
+def _credentials(headers):
+    return headers.get("Authorization", "") + headers.get("PRIVATE-TOKEN", "")
+
+
+class HTTPClient:
+    def __init__(self, retries=2, backoff=0.5, max_retry_wait=10, max_idle_per_host=4,
+                 cache="default", cache_ttl=86400, breaker_threshold=5, breaker_cooldown=30):
+        self.retries = retries
+        self.backoff = backoff
+        self.max_retry_wait = max_retry_wait
+        self.pool = ConnectionPool(max_idle_per_host)
+        self.cache_alias = cache
+        self.cache_ttl = cache_ttl
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self.rate_limits = RateLimits()
+        self._breakers = {}  # host or (host, credential id) -> CircuitBreaker
+        self._breakers_lock = threading.Lock()
+
+    def _cache_key(self, url, headers):
+        # Credentials are part of the key so users never see each other's responses
+        return "http:" + hashlib.sha1(f"{url}|{_credentials(headers)}".encode()).hexdigest()
+
+    def _breaker(self, key):
+        with self._breakers_lock:
+            breaker = self._breakers.get(key)
+            if breaker is None:
+                breaker = self._breakers[key] = CircuitBreaker(self.breaker_threshold, self.breaker_cooldown)
+        return breaker
+
+    def _scope(self, url, headers):
+        """(host, credential id); the id is a short hash of the credentials"""
+        credentials = _credentials(headers or {})
+        token = hashlib.sha1(credentials.encode()).hexdigest()[:8] if credentials else "anonymous"
+        return urllib.parse.urlsplit(url).hostname, token
+
+    def check(self, url, headers=None):
+        """Raise Unavailable if a GET to `url` with these credentials would be refused"""
+        host, token = scope = self._scope(url, headers)
+        wait = self.rate_limits.retry_in(scope)
+        if wait:
+            count_refused(host, "rate_limited")
+            raise RateLimited(f"{host} rate limit spent, resets in {wait:.0f}s", wait)
+        for key, what in ((scope, "credentials rejected"), (host, "failing")):
+            wait = self._breaker(key).retry_in()
+            if wait:
+                count_refused(host, "circuit_open")
+                raise CircuitOpen(f"{host} {what}, circuit open for {wait:.0f}s", wait)
+
+    def get_json(self, url, headers=None, timeout=8, deadline=None):
+        """
+        GET returning (parsed JSON, headers). Raises HTTPError for 4xx/5xx
+        and Unavailable when the call is refused without sending.
+        `deadline` (a time.monotonic() value) caps attempts and retry waits.
+        """
+        headers = {"Accept-Encoding": "gzip", **(headers or {})}
+        self.check(url, headers)
+        host, _ = scope = self._scope(url, headers)
+        cache = caches[self.cache_alias]
+        key = self._cache_key(url, headers)
+        cached = cache.get(key)
+        if cached:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        try:
+            status, reason, response_headers, body = self._request(url, headers, timeout, deadline)
+        except (OSError, http.client.HTTPException):
+            self._breaker(host).record(False)
+            raise
+        # 4xx means the host is up; 429s are the rate limiter's business
+        self._breaker(host).record(status < 500)
+        self._breaker(scope).record(status != 401)
+        self.rate_limits.update(scope, status, response_headers)
+
+        if status == 304 and cached:
+            # Cached pagination headers, current rate-limit headers
+            merged = _message(cached["headers"])
+            for name, value in response_headers.items():
+                del merged[name]
+                merged[name] = value
+            return cached["data"], merged
+        if status >= 400:
+            raise HTTPError(status, reason, response_headers)
+
+        data = json.loads(body.decode())
+        etag, last_modified = response_headers.get("ETag"), response_headers.get("Last-Modified")
+        if etag or last_modified:
+            cache.set(key, {
+                "etag": etag,
+                "last_modified": last_modified,
+                "data": data,
+                "headers": [(name, response_headers[name]) for name in CACHED_HEADERS if name in response_headers],
+            }, self.cache_ttl)
+        return data, response_headers
+
+    def gauges(self):
+        """
+        Breaker states and last reported quotas per host, for
+        engine.metrics.render(). Credentials are folded together (worst
+        breaker, lowest quota, latest reset) so no label identifies one.
+        """
+        with self._breakers_lock:
+            breakers = list(self._breakers.items())
+        states = {}
+        for key, breaker in breakers:
+            labels = (key[0], "credentials") if isinstance(key, tuple) else (key, "host")
+            states[labels] = max(states.get(labels, 0), breaker.state)
+        remaining, reset = {}, {}
+        now = time.time()
+        for (host, _), quota in self.rate_limits.snapshot().items():
+            if quota["remaining"] is not None:
+                remaining[host] = min(remaining.get(host, quota["remaining"]), quota["remaining"])
+            until = max(quota["reset"] or 0, quota["blocked_until"] or 0)
+            reset[host] = max(reset.get(host, 0), round(max(until - now, 0), 1))
+        return {
+            "engine_outbound_circuit_state": (
+                "Integration circuit breakers (0 closed, 1 half-open, 2 open); "
+                "scope=credentials is the worst per-credential breaker",
+                [({"host": host, "scope": scope}, state) for (host, scope), state in states.items()],
+            ),
+            "engine_outbound_ratelimit_remaining": (
+                "Calls left in the lowest quota the host last reported",
+                [({"host": host}, value) for host, value in remaining.items()],
+            ),
+            "engine_outbound_ratelimit_reset_seconds": (
+                "Seconds until the last of the host's quotas resets or blocks lifts",
+                [({"host": host}, value) for host, value in reset.items()],
+            ),
+        }
+
+    def _request(self, url, headers, timeout, deadline=None):
+        parts = urllib.parse.urlsplit(url)
+        key = (parts.scheme, parts.hostname, parts.port or (443 if parts.scheme == "https" else 80))
+        target = parts.path + (f"?{parts.query}" if parts.query else "")
+
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            if deadline is not None:
+                timeout = min(timeout, max(deadline - time.monotonic(), 0.1))
+            conn, reused = self.pool.acquire(key, timeout)
+            try:
+                conn.request("GET", target, headers=headers)
+                response = conn.getresponse()
+                body = response.read()
+            except TimeoutError:
+                conn.close()
+                observe_outbound(parts.hostname, "error", time.perf_counter() - started)
+                raise
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                if reused:
+                    # The host closed an idle keep-alive connection; not counted as a retry
+                    continue
+                observe_outbound(parts.hostname, "error", time.perf_counter() - started)
+                if attempt >= self.retries or not self._wait(self._delay(attempt + 1, None), deadline):
+                    raise
+                attempt += 1
+                continue
+
+            observe_outbound(parts.hostname, response.status, time.perf_counter() - started)
+            if response.will_close:
+                conn.close()
+            else:
+                self.pool.release(key, conn)
+            if response.getheader("Content-Encoding") == "gzip":
+                body = gzip.decompress(body)
+
+            if attempt < self.retries and self._should_retry(response, body):
+                delay = self._delay(attempt + 1, response.getheader("Retry-After"))
+                if delay <= self.max_retry_wait and self._wait(delay, deadline):
+                    attempt += 1
+                    continue
+            return response.status, response.reason, response.headers, body
+
+    def _should_retry(self, response, body):
+        if response.status in RETRY_STATUSES:
+            return True
+        # GitHub's secondary rate limit: 403 with Retry-After or this message
+        return response.status == 403 and (
+            response.getheader("Retry-After") is not None or b"secondary rate limit" in body.lower()
+        )
+
+    def _wait(self, delay, deadline):
+        """Sleep before a retry; False (without sleeping) if that would pass the deadline"""
+        if deadline is not None and time.monotonic() + delay >= deadline:
+            return False
+        time.sleep(delay)
+        return True
+
+    def _delay(self, attempt, retry_after):
+        if retry_after and retry_after.isdigit():
+            return int(retry_after) + random.uniform(0, self.backoff)
+        # Full jitter
+        return random.uniform(0, self.backoff * 2 ** attempt)
@@ -0,0 +1,163 @@
+"""
+Per-request SQL instrumentation.
+
+engine.db hands out cursors wrapped in InstrumentedCursor, which times
+every statement and counts fetched rows into the QueryStats of the
+current request. QueryInstrumentationMiddleware opens that collector,
+adds the totals as a Server-Timing header and logs one JSON line per
+request on the "engine.queries" logger.
+
+Each statement is also fed to the slow-query log (engine/slowlog.py).
+
+In tests, assert_num_queries(n) collects the statements run inside the
+block and fails when there are not exactly n (or more than n with
+exact=False), listing them.
+"""
+import contextvars
+import json
+import logging
+import time
+from contextlib import contextmanager
+
+from . import slowlog
+
+logger = logging.getLogger("engine.queries")
+
+_current = contextvars.ContextVar("engine_query_stats", default=None)
+
+
+class QueryStats:
+    """Statements run while handling one request (or one assert block)"""
+
+    def __init__(self):
+        self.count = 0
+        self.time = 0.0
+        self.rows = 0
+        self.slowest = None  # (seconds, sql)
+        self.statements = []
+
+    def record(self, sql, elapsed):
+        self.count += 1
+        self.time += elapsed
+        self.statements.append(sql)
+        if self.slowest is None or elapsed > self.slowest[0]:
+            self.slowest = (elapsed, sql)
+
+    def as_dict(self):
+        return {
+            "queries": self.count,
+            "db_ms": round(self.time * 1000, 2),
+            "rows": self.rows,
+            "slowest_ms": round(self.slowest[0] * 1000, 2) if self.slowest else 0,
+            "slowest_sql": " ".join(self.slowest[1].split())[:200] if self.slowest else None,
+        }
+
+
+def current_stats():
+    return _current.get()
+
+
+class InstrumentedCursor:
+    """Cursor proxy that records execute() time and fetched rows"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def _timed(self, method, query, args):
+        started = time.perf_counter()
+        try:
+            return method(query, args)
+        finally:
+            elapsed = time.perf_counter() - started
+            stats = _current.get()
+            if stats is not None:
+                stats.record(query, elapsed)
+            slowlog.observe(self._cursor, query, args, elapsed)
+
+    def execute(self, query, args=None):
+        return self._timed(self._cursor.execute, query, args)
+
+    def executemany(self, query, args):
+        return self._timed(self._cursor.executemany, query, args)
+
+    def _count(self, rows):
+        stats = _current.get()
+        if stats is not None and rows:
+            stats.rows += 1 if isinstance(rows, dict) else len(rows)
+        return rows
+
+    def fetchone(self):
+        return self._count(self._cursor.fetchone())
+
+    def fetchmany(self, size=None):
+        return self._count(self._cursor.fetchmany(size))
+
+    def fetchall(self):
+        return self._count(self._cursor.fetchall())
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+@contextmanager
+def collect_queries():
+    """Record the statements run inside the block into a fresh QueryStats"""
+    stats = QueryStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def assert_num_queries(expected, exact=True):
+    """Fail unless the block runs exactly `expected` statements (at most, if not exact)"""
+    with collect_queries() as stats:
+        yield stats
+    if stats.count > expected or (exact and stats.count != expected):
+        listing = "\n".join(f"  {i + 1}. {' '.join(sql.split())}" for i, sql in enumerate(stats.statements))
+        raise AssertionError(
+            f"{stats.count} queries executed, {'' if exact else 'at most '}{expected} expected\n{listing}"
+        )
+
+
+def server_timing(stats):
+    """Server-Timing header value for a request's QueryStats"""
+    entries = [f'db;dur={stats.time * 1000:.2f};desc="{stats.count} queries, {stats.rows} rows"']
+    if stats.slowest:
+        entries.append(f"db-slowest;dur={stats.slowest[0] * 1000:.2f}")
+    return ", ".join(entries)
+
+
+class QueryInstrumentationMiddleware:
+    """Adds Server-Timing and a log line with each request's SQL totals"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        with collect_queries() as stats:
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        timing = server_timing(stats) + f", app;dur={elapsed * 1000:.2f}"
+        if response.has_header("Server-Timing"):
+            timing = f"{response['Server-Timing']}, {timing}"
+        response["Server-Timing"] = timing
+
+        if stats.count:
+            match = getattr(request, "resolver_match", None)
+            logger.info(json.dumps({
+                "view": match.url_name if match else None,
+                "method": request.method,
+                "path": request.path,
+                "status": response.status_code,
+                "ms": round(elapsed * 1000, 2),
+                **stats.as_dict(),
+            }))
+        return response
@@ -0,0 +1,456 @@
+"""
+Git host API access for the Code page (GitHub, GitLab, Bitbucket).
+
+RepoListing fetches a user's repositories following the host's
+pagination. It reads the first page, works out the remaining page URLs
+from what the host reports (GitHub's Link rel="last", GitLab's
+X-Total-Pages, Bitbucket's size/pagelen) and fetches them concurrently
+on a small thread pool, yielding pages in order as they arrive. When the host does not say how many pages there
+are, its "next" links are followed one at a time.
+
+A listing runs against one deadline (listing_budget seconds): pages
+that miss it, fail, or lie beyond max_pages are dropped and the
+listing is marked incomplete.
+
+fetch_repo_data() builds the Code page's repo panel (stats, recent
+commits, open pull/merge requests, branches, top contributors) from
+REPO_RESOURCES, requesting the parts concurrently against one deadline
+and returning whatever arrived, with per-call timings.
+
+Both are called by the repo sync worker (engine/reposync.py), not in
+requests. They go through one keep-alive HTTPClient per process
+(engine/httpclient.py). It revalidates cached responses, retries
+transient failures, and fails fast while a host is down or a token's
+quota is spent. Settings come from settings.INTEGRATIONS; the base
+URLs can point at a local fake API.
+"""
+import base64
+import re
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout, wait
+
+from django.conf import settings
+
+from .httpclient import HTTPClient
+
+DEFAULTS = {
+    "github_url": "https://api.github.com",
+    "gitlab_url": "https://gitlab.com/api/v4",
+    "bitbucket_url": "https://api.bitbucket.org/2.0",
+    "timeout": 8,            # seconds per API request
+    "listing_budget": 10,    # seconds for a whole repository listing
+    "listing_workers": 4,    # concurrent page fetches per listing
+    "repo_data_budget": 8,   # seconds for all of a repo panel's calls together
+    "max_pages": 50,         # of 100 repositories each
+    "retries": 2,            # on 5xx, 429 and secondary rate limits
+    "backoff": 0.5,          # seconds, doubled per retry (with full jitter)
+    "max_retry_wait": 10,    # don't wait longer than this for a Retry-After
+    "max_idle_per_host": 4,  # keep-alive connections kept per host
+    "cache": "integrations", # Django cache for ETag/Last-Modified revalidation
+    "cache_ttl": 86400,
+    "refresh_interval": 900, # seconds before cached repo data is refreshed
+    "idle_days": 7,          # stop refreshing repos nobody opened for this long
+    "sync_batch": 20,        # rows claimed per worker pass
+    "sync_workers": 4,       # rows refreshed concurrently
+    "lease_seconds": 120,    # a claimed row is retried by others after this
+    "breaker_threshold": 5,  # consecutive failures before a host's calls fail fast
+    "breaker_cooldown": 30,  # seconds before an open breaker lets a trial call through
+}
+
+PLATFORMS = ("github", "gitlab", "bitbucket")
+
+_LINK = re.compile(r'<([^>]+)>\s*;\s*rel="(\w+)"')
+
+
+class RepoDataUnavailable(Exception):
+    """Every part of a repo panel failed; `errors` maps each part to why"""
+
+    def __init__(self, errors):
+        super().__init__(f"Every repo data request failed: {'; '.join(sorted(set(errors.values())))}")
+        self.errors = errors
+
+
+def config():
+    return {**DEFAULTS, **getattr(settings, "INTEGRATIONS", {})}
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """The process's shared HTTPClient (keep-alive pool and response cache)"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                conf = config()
+                _client = HTTPClient(
+                    retries=conf["retries"], backoff=conf["backoff"],
+                    max_retry_wait=conf["max_retry_wait"], max_idle_per_host=conf["max_idle_per_host"],
+                    cache=conf["cache"], cache_ttl=conf["cache_ttl"],
+                    breaker_threshold=conf["breaker_threshold"], breaker_cooldown=conf["breaker_cooldown"],
+                )
+    return _client
+
+
+def fetch_json(url, headers=None, timeout=8, deadline=None):
+    """HTTP GET returning (parsed JSON, response headers); retries stop at deadline"""
+    return get_client().get_json(url, headers, timeout, deadline)
+
+
+def auth_headers(platform, token):
+    if platform == "github":
+        return {"Accept": "application/vnd.github+json", "User-Agent": "BrainMint", "Authorization": f"Bearer {token}"}
+    if platform == "gitlab":
+        return {"User-Agent": "BrainMint", "PRIVATE-TOKEN": token}
+    # Bitbucket tokens are stored as username:app_password
+    return {"User-Agent": "BrainMint", "Authorization": f"Basic {base64.b64encode(token.encode()).decode()}"}
+
+
+def parse_link_header(value):
+    """{"next": url, "last": url, ...} from an RFC 8288 Link header"""
+    return {rel: url for url, rel in _LINK.findall(value or "")}
+
+
+def with_page(url, page):
+    parts = urllib.parse.urlsplit(url)
+    query = dict(urllib.parse.parse_qsl(parts.query))
+    query["page"] = str(page)
+    return urllib.parse.urlunsplit(parts._replace(query=urllib.parse.urlencode(query)))
+
+
+def _page_number(url):
+    value = dict(urllib.parse.parse_qsl(urllib.parse.urlsplit(url).query)).get("page")
+    return int(value) if value and value.isdigit() else None
+
+
+def _repo(platform, item):
+    """The Code page's repository fields for one API item"""
+    if platform == "github":
+        return {
+            "name": item["full_name"],
+            "url": item["html_url"],
+            "description": item.get("description", ""),
+            "stars": item.get("stargazers_count", 0),
+            "language": item.get("language", ""),
+            "updated_at": item["updated_at"][:10],
+            "is_private": item.get("private", False)
+        }
+    if platform == "gitlab":
+        return {
+            "name": item["path_with_namespace"],
+            "url": item["web_url"],
+            "description": item.get("description", ""),
+            "stars": item.get("star_count", 0),
+            "language": "",
+            "updated_at": item["last_activity_at"][:10],
+            "is_private": item.get("visibility") != "public"
+        }
+    return {
+        "name": item["full_name"],
+        "url": item["links"]["html"]["href"],
+        "description": item.get("description", ""),
+        "stars": 0,
+        "language": item.get("language", ""),
+        "updated_at": item["updated_on"][:10],
+        "is_private": item.get("is_private", False)
+    }
+
+
+def _extract_github_repo(url):
+    """Extract owner/repo from GitHub URL"""
+    url = url.rstrip("/")
+    parts = url.replace("https://github.com/", "").replace("http://github.com/", "").split("/")
+    if len(parts) >= 2:
+        return f"{parts[0]}/{parts[1]}"
+    return None
+
+
+def _extract_gitlab_repo(url):
+    """Extract namespace/project from GitLab URL"""
+    url = url.rstrip("/")
+    path = url.replace("https://gitlab.com/", "").replace("http://gitlab.com/", "")
+    return path if path else None
+
+
+def _extract_bitbucket_repo(url):
+    """Extract workspace/repo from Bitbucket URL"""
+    url = url.rstrip("/")
+    parts = url.replace("https://bitbucket.org/", "").replace("http://bitbucket.org/", "").split("/")
+    if len(parts) >= 2:
+        return parts[0], parts[1]
+    return None, None
+
+
+def repo_api_url(platform, repo_url, conf=None):
+    """The API base for one repository, from its web URL"""
+    conf = conf or config()
+    if platform == "github":
+        repo = _extract_github_repo(repo_url)
+        return f"{conf['github_url']}/repos/{repo}" if repo else None
+    if platform == "gitlab":
+        path = _extract_gitlab_repo(repo_url)
+        return f"{conf['gitlab_url']}/projects/{urllib.parse.quote(path, safe='')}" if path else None
+    workspace, slug = _extract_bitbucket_repo(repo_url)
+    return f"{conf['bitbucket_url']}/repositories/{workspace}/{slug}" if workspace else None
+
+
+def _first_line(message):
+    return (message or "").split("\n", 1)[0]
+
+
+# platform -> {part of the repo panel: (path under the repo's API URL, parser)}
+REPO_RESOURCES = {
+    "github": {
+        "stats": ("", lambda r: {
+            "name": r["full_name"],
+            "visibility": "private" if r.get("private") else "public",
+            "language": r.get("language") or "",
+            "description": r.get("description") or "",
+            "default_branch": r.get("default_branch"),
+            "stars": r.get("stargazers_count", 0),
+            "forks": r.get("forks_count", 0),
+            "open_issues": r.get("open_issues_count", 0),
+        }),
+        "commits": ("/commits?per_page=10", lambda rows: [{
+            "sha": c["sha"][:7],
+            "message": _first_line(c["commit"]["message"]),
+            "author": c["commit"]["author"]["name"],
+            "date": c["commit"]["author"]["date"][:10],
+        } for c in rows]),
+        "pull_requests": ("/pulls?state=open&per_page=10", lambda rows: [{
+            "number": pr["number"],
+            "title": pr["title"],
+            "url": pr["html_url"],
+            "author": (pr.get("user") or {}).get("login", ""),
+            "created_at": pr["created_at"][:10],
+        } for pr in rows]),
+        "branches": ("/branches?per_page=100", lambda rows: [b["name"] for b in rows]),
+        "contributors": ("/contributors?per_page=10", lambda rows: [
+            {"name": c["login"], "commits": c["contributions"]} for c in rows
+        ]),
+    },
+    "gitlab": {
+        "stats": ("", lambda r: {
+            "name": r["path_with_namespace"],
+            "visibility": r.get("visibility", ""),
+            "language": "",
+            "description": r.get("description") or "",
+            "default_branch": r.get("default_branch"),
+            "stars": r.get("star_count", 0),
+            "forks": r.get("forks_count", 0),
+            "open_issues": r.get("open_issues_count"),
+        }),
+        "commits": ("/repository/commits?per_page=10", lambda rows: [{
+            "sha": c["short_id"],
+            "message": c["title"],
+            "author": c["author_name"],
+            "date": c["created_at"][:10],
+        } for c in rows]),
+        "pull_requests": ("/merge_requests?state=opened&per_page=10", lambda rows: [{
+            "number": mr["iid"],
+            "title": mr["title"],
+            "url": mr["web_url"],
+            "author": (mr.get("author") or {}).get("username", ""),
+            "created_at": mr["created_at"][:10],
+        } for mr in rows]),
+        "branches": ("/repository/branches?per_page=100", lambda rows: [b["name"] for b in rows]),
+        "contributors": ("/repository/contributors?per_page=10&order_by=commits&sort=desc", lambda rows: [
+            {"name": c["name"], "commits": c["commits"]} for c in rows
+        ]),
+    },
+    "bitbucket": {
+        "stats": ("", lambda r: {
+            "name": r["full_name"],
+            "visibility": "private" if r.get("is_private") else "public",
+            "language": r.get("language") or "",
+            "description": r.get("description") or "",
+            "default_branch": (r.get("mainbranch") or {}).get("name"),
+            "stars": None,
+            "forks": None,
+            "open_issues": None,
+        }),
+        "commits": ("/commits?pagelen=10", lambda data: [{
+            "sha": c["hash"][:7],
+            "message": _first_line(c.get("message")),
+            "author": (c["author"].get("user") or {}).get("display_name") or c["author"].get("raw", ""),
+            "date": c["date"][:10],
+        } for c in data.get("values", [])]),
+        "pull_requests": ("/pullrequests?state=OPEN&pagelen=10", lambda data: [{
+            "number": pr["id"],
+            "title": pr["title"],
+            "url": pr["links"]["html"]["href"],
+            "author": (pr.get("author") or {}).get("display_name", ""),
+            "created_at": pr["created_on"][:10],
+        } for pr in data.get("values", [])]),
+        "branches": ("/refs/branches?pagelen=100", lambda data: [b["name"] for b in data.get("values", [])]),
+    },
+}
+
+
+def fetch_repo_data(platform, token, repo_url):
+    """
+    The Code page's repo panel: one entry per REPO_RESOURCES part, all
+    fetched at once on their own threads within repo_data_budget seconds.
+    Parts that fail or miss the deadline are left out and listed in
+    "errors" ("partial" is then true); "timings" has each call's ms.
+    Raises RepoDataUnavailable only when every part failed.
+    """
+    if platform not in PLATFORMS:
+        raise ValueError("Invalid platform")
+    conf = config()
+    base = repo_api_url(platform, repo_url, conf)
+    if not base:
+        raise ValueError(f"Not a {platform} repository URL: {repo_url}")
+    headers = auth_headers(platform, token)
+    resources = REPO_RESOURCES[platform]
+    # Fail once, up front, rather than once per part when the host is refusing calls
+    get_client().check(base, headers)
+    deadline = time.monotonic() + conf["repo_data_budget"]
+    timings = {}
+
+    def fetch_part(name):
+        path, parse = resources[name]
+        started = time.perf_counter()
+        try:
+            timeout = min(conf["timeout"], max(deadline - time.monotonic(), 0.1))
+            return parse(fetch_json(base + path, headers, timeout=timeout, deadline=deadline)[0])
+        finally:
+            timings[name] = round((time.perf_counter() - started) * 1000, 1)
+
+    # OPTIMIZED: Parts in parallel, so the panel costs about the slowest call rather than the sum
+    executor = ThreadPoolExecutor(max_workers=len(resources))
+    try:
+        futures = {name: executor.submit(fetch_part, name) for name in resources}
+        wait(futures.values(), timeout=conf["repo_data_budget"])
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    finished = {name for name, future in futures.items() if future.done()}
+    result, errors = {}, {}
+    for name, future in futures.items():
+        if name not in finished:
+            errors[name] = "timed out"
+        elif future.exception() is not None:
+            errors[name] = str(future.exception()) or type(future.exception()).__name__
+        else:
+            result[name] = future.result()
+    if not result:
+        raise RepoDataUnavailable(errors)
+
+    result["timings"] = {name: timings.get(name) if name in finished else None for name in resources}
+    result["errors"] = errors
+    result["partial"] = bool(errors)
+    return result
+
+
+class RepoListing:
+    """
+    A user's repositories on one platform. Creating it fetches the first
+    page (and raises if that fails); pages() yields lists of repos.
+    """
+
+    def __init__(self, platform, token):
+        if platform not in PLATFORMS:
+            raise ValueError("Invalid platform")
+        self.platform = platform
+        self.settings = config()
+        self.headers = auth_headers(platform, token)
+        self.deadline = time.monotonic() + self.settings["listing_budget"]
+        self.complete = True
+        self.first_url = self._first_url()
+        self.first_data, self.first_headers = self._fetch(self.first_url)
+
+    def _first_url(self):
+        if self.platform == "github":
+            return f"{self.settings['github_url']}/user/repos?per_page=100&sort=updated&page=1"
+        if self.platform == "gitlab":
+            return f"{self.settings['gitlab_url']}/projects?membership=true&per_page=100&order_by=updated_at&page=1"
+        return f"{self.settings['bitbucket_url']}/repositories?role=member&pagelen=100&page=1"
+
+    def _fetch(self, url):
+        remaining = self.deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError("Listing deadline passed")
+        return fetch_json(
+            url, self.headers, timeout=min(self.settings["timeout"], remaining), deadline=self.deadline
+        )
+
+    def _items(self, data):
+        return data.get("values", []) if self.platform == "bitbucket" else data
+
+    def _remaining_urls(self):
+        """Page URLs after the first, or None when the host doesn't say how many"""
+        if self.platform == "github":
+            links = parse_link_header(self.first_headers.get("Link"))
+            if "last" not in links:
+                return None if "next" in links else []
+            total = _page_number(links["last"])
+        elif self.platform == "gitlab":
+            total = self.first_headers.get("X-Total-Pages")
+            if not total:
+                return None if self.first_headers.get("X-Next-Page") else []
+            total = int(total)
+        else:
+            size, pagelen = self.first_data.get("size"), self.first_data.get("pagelen")
+            if size is None or not pagelen:
+                return None if self.first_data.get("next") else []
+            total = -(-size // pagelen)
+        if total is None:
+            return None
+        return [with_page(self.first_url, page) for page in range(2, total + 1)]
+
+    def _next_url(self, data, headers):
+        if self.platform == "github":
+            return parse_link_header(headers.get("Link")).get("next")
+        if self.platform == "gitlab":
+            page = headers.get("X-Next-Page")
+            return with_page(self.first_url, page) if page else None
+        return data.get("next")
+
+    def pages(self):
+        yield [_repo(self.platform, item) for item in self._items(self.first_data)]
+
+        urls = self._remaining_urls()
+        if urls is None:
+            yield from self._follow_next()
+            return
+
+        max_pages = self.settings["max_pages"]
+        if len(urls) >= max_pages:
+            urls = urls[:max_pages - 1]
+            self.complete = False
+
+        executor = ThreadPoolExecutor(max_workers=self.settings["listing_workers"])
+        try:
+            futures = [executor.submit(self._fetch, url) for url in urls]
+            for future in futures:
+                try:
+                    data, _ = future.result(timeout=max(0, self.deadline - time.monotonic()))
+                except FutureTimeout:
+                    self.complete = False
+                    break
+                except Exception:
+                    self.complete = False
+                    continue
+                yield [_repo(self.platform, item) for item in self._items(data)]
+        finally:
+            # Pages still queued are dropped; running ones end within their timeout
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _follow_next(self):
+        url = self._next_url(self.first_data, self.first_headers)
+        fetched = 1
+        while url and fetched < self.settings["max_pages"]:
+            try:
+                data, headers = self._fetch(url)
+            except Exception:
+                break
+            fetched += 1
+            yield [_repo(self.platform, item) for item in self._items(data)]
+            url = self._next_url(data, headers)
+        if url:
+            self.complete = False
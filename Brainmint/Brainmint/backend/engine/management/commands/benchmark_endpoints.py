@@ -0,0 +1,165 @@
+import datetime
+import json
+import random
+import socket
+import subprocess
+import threading
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from engine.instrumentation import collect_queries
+from engine.workload import call_view, workload_session
+
+# Report meta that must match for --compare: latency only compares on one setup
+SETUP = ("host", "manifest", "concurrency")
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(samples, elapsed):
+    """Per-endpoint report from {name: [(seconds, queries, ok), ...]}"""
+    endpoints = {}
+    for name, rows in sorted(samples.items()):
+        times = sorted(seconds for seconds, _, _ in rows)
+        endpoints[name] = {
+            "requests": len(rows),
+            "errors": sum(1 for _, _, ok in rows if not ok),
+            "rps": round(len(rows) / elapsed, 2),
+            "mean_ms": round(sum(times) / len(times) * 1000, 2),
+            "p50_ms": round(percentile(times, 0.50) * 1000, 2),
+            "p95_ms": round(percentile(times, 0.95) * 1000, 2),
+            "p99_ms": round(percentile(times, 0.99) * 1000, 2),
+            "queries_per_request": round(sum(q for _, q, _ in rows) / len(rows), 2),
+        }
+    total = sum(e["requests"] for e in endpoints.values())
+    return {"requests": total, "rps": round(total / elapsed, 2), "endpoints": endpoints}
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay the weighted dashboard workload against users from seed_workload and "
+        "report throughput, p50/p95/p99 latency and queries per request per endpoint. "
+        "No baseline is shipped: --save a run before a change and --compare after it, "
+        "on the same machine and database"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--manifest", default="benchmarks/seed.json", help="Written by seed_workload")
+        parser.add_argument("--duration", type=float, default=30, help="Seconds to run after warm-up")
+        parser.add_argument("--warmup", type=float, default=3)
+        parser.add_argument("--concurrency", type=int, default=4, help="Client threads")
+        parser.add_argument("--seed", type=int, default=1, help="Random seed for the request mix")
+        parser.add_argument("--save", help="Write the report as JSON, for a later --compare")
+        parser.add_argument(
+            "--compare", help="Report saved by --save on this host with the same manifest and concurrency"
+        )
+        parser.add_argument(
+            "--tolerance", type=float, default=0.15,
+            help="Allowed p95 regression against --compare before failing (fraction)"
+        )
+
+    def handle(self, *args, **options):
+        manifest = Path(options["manifest"])
+        if not manifest.exists():
+            raise CommandError(f"No manifest at {manifest}; run seed_workload first")
+        seeds = json.loads(manifest.read_text())["users"]
+
+        self._run(seeds, options["warmup"], options, record=False)
+        report = self._run(seeds, options["duration"], options, record=True)
+        report["meta"] = {
+            "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "git": self._git_revision(),
+            "host": socket.gethostname(),
+            "manifest": json.loads(manifest.read_text())["settings"],
+            "concurrency": options["concurrency"],
+            "duration": options["duration"],
+        }
+
+        self._print(report)
+        if options["save"]:
+            path = Path(options["save"])
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(report, indent=2))
+            self.stdout.write(f"Saved {path}")
+        if options["compare"]:
+            self._compare(json.loads(Path(options["compare"]).read_text()), report, options["tolerance"])
+
+    def _run(self, seeds, duration, options, record):
+        samples = {}
+        lock = threading.Lock()
+        deadline = time.monotonic() + duration
+
+        def client(index):
+            rng = random.Random(options["seed"] * 1000 + index)
+            local = {}
+            while time.monotonic() < deadline:
+                _, requests = workload_session(rng.choice(seeds), rng)
+                for name, method, params in requests:
+                    with collect_queries() as stats:
+                        started = time.perf_counter()
+                        response = call_view(name, method, params)
+                        seconds = time.perf_counter() - started
+                    local.setdefault(name, []).append((seconds, stats.count, response.status_code < 500))
+            with lock:
+                for name, rows in local.items():
+                    samples.setdefault(name, []).extend(rows)
+
+        started = time.monotonic()
+        threads = [threading.Thread(target=client, args=(i,)) for i in range(options["concurrency"])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return summarize(samples, time.monotonic() - started) if record else None
+
+    def _print(self, report):
+        self.stdout.write(
+            f"{'endpoint':<22} {'reqs':>6} {'err':>4} {'rps':>8} {'p50 ms':>8} "
+            f"{'p95 ms':>8} {'p99 ms':>8} {'q/req':>6}"
+        )
+        for name, e in report["endpoints"].items():
+            self.stdout.write(
+                f"{name:<22} {e['requests']:>6} {e['errors']:>4} {e['rps']:>8.1f} {e['p50_ms']:>8.2f} "
+                f"{e['p95_ms']:>8.2f} {e['p99_ms']:>8.2f} {e['queries_per_request']:>6.2f}"
+            )
+        self.stdout.write(f"Total: {report['requests']} requests, {report['rps']} req/s")
+
+    def _compare(self, baseline, report, tolerance):
+        base_meta, meta = baseline.get("meta", {}), report.get("meta", {})
+        differs = [key for key in SETUP if base_meta.get(key) != meta.get(key)]
+        if differs:
+            raise CommandError(f"Baseline was recorded on a different setup ({', '.join(differs)}); run it again here")
+        regressions = []
+        self.stdout.write(f"\n{'endpoint':<22} {'p95 base':>9} {'p95 now':>9} {'change':>8} {'q/req':>11}")
+        for name, now in report["endpoints"].items():
+            base = baseline["endpoints"].get(name)
+            if not base:
+                self.stdout.write(f"{name:<22} {'-':>9} {now['p95_ms']:>9.2f}      new")
+                continue
+            change = (now["p95_ms"] - base["p95_ms"]) / base["p95_ms"] if base["p95_ms"] else 0.0
+            queries = f"{base['queries_per_request']:g}->{now['queries_per_request']:g}"
+            self.stdout.write(
+                f"{name:<22} {base['p95_ms']:>9.2f} {now['p95_ms']:>9.2f} {change:>+8.0%} {queries:>11}"
+            )
+            if change > tolerance:
+                regressions.append(f"{name}: p95 {base['p95_ms']} -> {now['p95_ms']} ms")
+            if now["queries_per_request"] > base["queries_per_request"]:
+                regressions.append(f"{name}: queries/request {queries}")
+        if regressions:
+            raise CommandError("Regressions against baseline:\n  " + "\n  ".join(regressions))
+        self.stdout.write(self.style.SUCCESS("No regressions against baseline"))
+
+    def _git_revision(self):
+        try:
+            return subprocess.run(
+                ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
@@ -0,0 +1,91 @@
+import datetime
+import json
+import random
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+
+from engine.renderers import orjson, orjson_dumps, stdlib_dumps
+from engine.views import _task_to_dict
+
+
+def board_payload(tasks, rng):
+    """get_tasks-shaped body for `tasks` synthetic rows, dates left as pymysql returns them"""
+    today = datetime.date.today()
+    columns = {"todo": [], "progress": [], "review": [], "done": []}
+    for i in range(tasks):
+        status = rng.choice(list(columns))
+        total = rng.randint(0, 8)
+        columns[status].append(_task_to_dict({
+            "id": i + 1,
+            "title": f"Task {i + 1} " + "x" * rng.randint(10, 60),
+            "priority": rng.choice(["High", "Medium", "Low"]),
+            "status": status,
+            "due_date": today + datetime.timedelta(days=rng.randint(-60, 60)) if rng.random() < 0.8 else None,
+            "subtasks_total": total,
+            "subtasks_completed": rng.randint(0, total),
+            "sprint_id": rng.randint(1, 26),
+            "sprint_name": f"Sprint {rng.randint(1, 26)}",
+        }))
+    return {
+        "columns": {st: {"tasks": rows, "next_cursor": None} for st, rows in columns.items()},
+        "sync_version": tasks,
+    }
+
+
+def _with_str_dates(payload):
+    # What the views built before the renderer: dates pre-formatted with str()
+    return {**payload, "columns": {
+        st: {**column, "tasks": [{**t, "dueDate": str(t["dueDate"]) if t["dueDate"] else ""} for t in column["tasks"]]}
+        for st, column in payload["columns"].items()
+    }}
+
+
+class Command(BaseCommand):
+    help = "Time and measure peak memory of rendering a large board with each JSON renderer"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tasks", type=int, default=50000)
+        parser.add_argument("--repeat", type=int, default=5, help="Timed runs per renderer (best is reported)")
+        parser.add_argument("--seed", type=int, default=1)
+
+    def handle(self, *args, **options):
+        if options["repeat"] < 1:
+            raise CommandError("--repeat must be at least 1")
+        payload = board_payload(options["tasks"], random.Random(options["seed"]))
+        legacy = _with_str_dates(payload)
+
+        renderers = [
+            # django.http.JsonResponse: DjangoJSONEncoder to str, then encoded to bytes
+            ("django JsonResponse", lambda: json.dumps(legacy, cls=DjangoJSONEncoder).encode()),
+            ("stdlib_dumps", lambda: stdlib_dumps(payload)),
+            ("orjson_dumps", lambda: orjson_dumps(payload)),
+        ]
+        if orjson is None:
+            renderers.pop()
+            self.stdout.write("orjson is not installed; skipping orjson_dumps")
+
+        self.stdout.write(f"{options['tasks']} tasks, best of {options['repeat']}")
+        self.stdout.write(f"{'renderer':<20} {'ms':>9} {'peak MiB':>9} {'body KiB':>9}")
+        for name, render in renderers:
+            timings = []
+            for _ in range(options["repeat"]):
+                started = time.perf_counter()
+                body = render()
+                timings.append(time.perf_counter() - started)
+
+            tracemalloc.start()
+            render()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            self.stdout.write(
+                f"{name:<20} {min(timings) * 1000:>9.1f} {peak / 2 ** 20:>9.1f} {len(body) / 1024:>9.0f}"
+            )
+
+        # The fast paths must produce the same document
+        decoded = [json.loads(render()) for _, render in renderers]
+        if any(doc != decoded[0] for doc in decoded[1:]):
+            raise CommandError("Renderers disagree on the rendered board")
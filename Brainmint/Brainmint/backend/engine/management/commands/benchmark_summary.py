@@ -0,0 +1,112 @@
+import datetime
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+
+from engine import views
+from engine.db import get_db
+from engine.instrumentation import collect_queries
+from engine.workload import delete_users, seed_user
+
+# The eight statements /summary/ issued before it was folded into
+# conditional aggregates, kept here as the benchmark baseline.
+LEGACY_SUMMARY_QUERIES = [
+    ("SELECT COUNT(*) as count FROM tasks WHERE user_id = %s AND status != 'done'", "u"),
+    ("SELECT COUNT(*) as count FROM tasks WHERE user_id = %s AND status != 'done' "
+     "AND due_date < %s AND due_date != ''", "ut"),
+    ("SELECT COUNT(*) as count FROM sprints WHERE user_id = %s AND start_date <= %s AND end_date >= %s", "utt"),
+    ("SELECT COUNT(*) as count FROM tasks WHERE user_id = %s AND status = 'done' AND due_date >= %s", "uw"),
+    ("SELECT COUNT(*) as count FROM sprints WHERE user_id = %s", "u"),
+    ("SELECT COUNT(*) as total FROM tasks WHERE user_id = %s", "u"),
+    ("SELECT COUNT(*) as done FROM tasks WHERE user_id = %s AND status = 'done'", "u"),
+    ("SELECT id, title, status, priority, due_date FROM tasks WHERE user_id = %s "
+     "ORDER BY id DESC LIMIT 10", "u"),
+]
+
+
+class Command(BaseCommand):
+    help = "Compare round trips and latency of /summary/ against the legacy eight-query version"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", type=int, help="Measure this existing user")
+        parser.add_argument(
+            "--seed-tasks", type=int, default=0,
+            help="Instead, measure a synthetic user with this many tasks (e.g. 50000), removed afterwards"
+        )
+        parser.add_argument("--runs", type=int, default=200)
+        parser.add_argument("--keep", action="store_true", help="Keep the synthetic user")
+
+    def handle(self, *args, **options):
+        if bool(options["user"]) == bool(options["seed_tasks"]):
+            raise CommandError("Pass either --user or --seed-tasks")
+
+        seeded = None
+        if options["seed_tasks"]:
+            seeded = self._seed(options["seed_tasks"])
+        user_id = options["user"] or seeded
+        try:
+            legacy = self._measure(options["runs"], lambda: self._legacy_summary(user_id))
+
+            request = RequestFactory().get("/api/summary/", {"user_id": user_id})
+            current = self._measure(options["runs"], lambda: self._current_summary(request))
+        finally:
+            if seeded and not options["keep"]:
+                self._delete(seeded)
+
+        self.stdout.write(f"{'variant':<10}{'queries':>9}{'p50 ms':>10}{'p95 ms':>10}")
+        for name, (queries, timings) in (("legacy", legacy), ("current", current)):
+            p50 = statistics.median(timings)
+            p95 = statistics.quantiles(timings, n=20)[-1] if len(timings) > 1 else timings[0]
+            self.stdout.write(f"{name:<10}{queries:>9}{p50 * 1000:>10.2f}{p95 * 1000:>10.2f}")
+
+    def _measure(self, runs, fn):
+        timings = []
+        queries = 0
+        for _ in range(runs):
+            start = time.perf_counter()
+            queries = fn()
+            timings.append(time.perf_counter() - start)
+        return queries, timings
+
+    def _legacy_summary(self, user_id):
+        today = datetime.date.today()
+        values = {"u": user_id, "t": today, "w": today - datetime.timedelta(days=7)}
+        db = get_db()
+        cursor = db.cursor()
+        try:
+            for query, args in LEGACY_SUMMARY_QUERIES:
+                cursor.execute(query, tuple(values[a] for a in args))
+                cursor.fetchall()
+        finally:
+            db.close()
+        return len(LEGACY_SUMMARY_QUERIES)
+
+    def _current_summary(self, request):
+        with collect_queries() as stats:
+            response = views.get_summary(request)
+        if response.status_code != 200:
+            raise RuntimeError(response.content.decode())
+        return stats.count
+
+    def _seed(self, tasks):
+        """A synthetic user with `tasks` tasks and matching rollups; returns its id"""
+        db = get_db()
+        cursor = db.cursor()
+        try:
+            user_id = seed_user(cursor, tasks=tasks)["user_id"]
+            db.commit()
+        finally:
+            db.close()
+        self.stdout.write(f"Seeded user {user_id} with {tasks} tasks")
+        return user_id
+
+    def _delete(self, user_id):
+        db = get_db()
+        cursor = db.cursor()
+        try:
+            delete_users(cursor, [user_id])
+            db.commit()
+        finally:
+            db.close()
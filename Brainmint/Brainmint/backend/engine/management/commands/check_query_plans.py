@@ -0,0 +1,107 @@
+from unittest import mock
+
+from django.core.management.base import BaseCommand, CommandError
+
+from engine import views
+from engine.db import get_db
+from engine.workload import (
+    call_view, dashboard_reads, dashboard_writes, delete_users, maintenance_writes, seed_user, signup_email,
+)
+
+EXPLAINABLE = ("SELECT", "UPDATE", "DELETE", "INSERT")
+
+# One-off maintenance views that walk every task on purpose; reported, not failed
+FULL_SCAN_VIEWS = {"fix_completed_tasks"}
+
+
+class RecordingCursor:
+    def __init__(self, cursor, statements):
+        self._cursor = cursor
+        self._statements = statements
+
+    def execute(self, query, params=None):
+        self._statements.append(self._cursor.mogrify(query, params))
+        return self._cursor.execute(query, params)
+
+    def executemany(self, query, seq_of_params):
+        seq_of_params = list(seq_of_params)
+        self._statements.extend(self._cursor.mogrify(query, params) for params in seq_of_params)
+        return self._cursor.executemany(query, seq_of_params)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed users, run every engine view against them and EXPLAIN each SQL "
+        "statement issued; fails if any statement does a full table scan"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=20, help="Seeded users (index selectivity)")
+        parser.add_argument("--tasks", type=int, default=500, help="Tasks per seeded user")
+        parser.add_argument("--sprints", type=int, default=12, help="Sprints per seeded user")
+        parser.add_argument("--keep", action="store_true", help="Keep the seeded rows afterwards")
+
+    def handle(self, *args, **options):
+        db = get_db()
+        cursor = db.cursor()
+        seeds = []
+
+        try:
+            for _ in range(options["users"]):
+                seeds.append(seed_user(cursor, tasks=options["tasks"], sprints=options["sprints"]))
+            db.commit()
+
+            statements = self._capture(seeds[0])
+            failures, expected = [], []
+            for view_name, sql in statements:
+                for row in self._explain(cursor, sql):
+                    table = row.get("table") or ""
+                    if row.get("type") == "ALL" and not table.startswith("<"):
+                        (expected if view_name in FULL_SCAN_VIEWS else failures).append((view_name, table, sql))
+        finally:
+            if seeds and not options["keep"]:
+                cursor.execute("SELECT id FROM users WHERE email = %s", (signup_email(seeds[0]),))
+                signed_up = [row["id"] for row in cursor.fetchall()]
+                delete_users(cursor, [seed["user_id"] for seed in seeds] + signed_up)
+                db.commit()
+            db.close()
+
+        self.stdout.write(f"Checked {len(statements)} statements from {len({v for v, _ in statements})} views")
+        for view_name, table, sql in expected:
+            self.stdout.write(self.style.WARNING(f"{view_name}: full scan of {table} (maintenance view)"))
+        for view_name, table, sql in failures:
+            self.stdout.write(self.style.ERROR(f"{view_name}: full scan of {table}\n    {' '.join(sql.split())}"))
+        if failures:
+            raise CommandError(f"{len(failures)} statements do full table scans")
+        self.stdout.write(self.style.SUCCESS("No full table scans"))
+
+    def _capture(self, seed):
+        """Run the scripted workload and collect (view, statement) pairs"""
+        captured = []
+
+        for name, method, params in dashboard_reads(seed) + dashboard_writes(seed) + maintenance_writes(seed):
+            statements = []
+
+            def recording_db():
+                db = get_db()
+                cursor = db.cursor()
+                db.cursor = lambda: RecordingCursor(cursor, statements)
+                return db
+
+            with mock.patch.object(views, "get_db", recording_db):
+                response = call_view(name, method, params)
+            if response.status_code >= 500:
+                raise CommandError(f"{name} failed: {response.content.decode()}")
+            captured.extend((name, sql) for sql in statements)
+        return captured
+
+    def _explain(self, cursor, sql):
+        if not sql.lstrip().upper().startswith(EXPLAINABLE):
+            return []
+        if sql.lstrip().upper().startswith("INSERT") and " SELECT " not in sql.upper():
+            return []
+        cursor.execute("EXPLAIN " + sql)
+        return [{key.lower(): value for key, value in row.items()} for row in cursor.fetchall()]
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from engine.db import get_db
+from engine.schema import MIGRATIONS, applied_versions, migrate
+
+
+class Command(BaseCommand):
+    help = "Apply pending engine MySQL schema migrations (tables and indexes)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--list", action="store_true", help="Show migrations and whether they are applied")
+
+    def handle(self, *args, **options):
+        db = get_db()
+        cursor = db.cursor()
+
+        try:
+            if options["list"]:
+                applied = applied_versions(cursor)
+                for version, description, _ in MIGRATIONS:
+                    mark = "X" if version in applied else " "
+                    self.stdout.write(f"[{mark}] {version} {description}")
+                return
+
+            done = migrate(cursor, log=self.stdout.write)
+        finally:
+            db.close()
+
+        if done:
+            self.stdout.write(self.style.SUCCESS(f"Applied {', '.join(done)}"))
+        else:
+            self.stdout.write("Schema is up to date")
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from engine.db import get_db
+from engine.stats import create_sprint_stats, rebuild_sprint_stats
+
+
+class Command(BaseCommand):
+    help = "Create or recompute the sprint_stats rollup from the tasks table (drift repair)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", type=int, help="Only rebuild this user's sprints")
+
+    def handle(self, *args, **options):
+        db = get_db()
+        cursor = db.cursor()
+
+        try:
+            # A new table is filled for every user, whatever --user says
+            rows = create_sprint_stats(cursor)
+            if rows is None:
+                rows = rebuild_sprint_stats(cursor, options["user"])
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt sprint_stats for {rows} sprints"))
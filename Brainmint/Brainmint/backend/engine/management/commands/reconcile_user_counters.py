@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from engine.db import get_db
+from engine.stats import create_user_counters, reconcile_user_counters
+
+
+class Command(BaseCommand):
+    help = "Create or recompute the user_counters KPI rows from the tasks and sprints tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", type=int, help="Only reconcile this user")
+
+    def handle(self, *args, **options):
+        db = get_db()
+        cursor = db.cursor()
+
+        try:
+            # A new table is filled for every user, whatever --user says
+            rows = create_user_counters(cursor)
+            if rows is None:
+                rows = reconcile_user_counters(cursor, options["user"])
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        self.stdout.write(self.style.SUCCESS(f"Reconciled user_counters for {rows} users"))
@@ -0,0 +1,61 @@
+import json
+import random
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from engine.db import get_db
+from engine.workload import delete_users, seed_user
+
+
+class Command(BaseCommand):
+    help = (
+        "Insert synthetic users (tasks, sprints, pages, integrations) for benchmarks "
+        "and write their ids to a manifest; --delete removes them again"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--manifest", default="benchmarks/seed.json", help="Where the seeded ids are kept")
+        parser.add_argument("--users", type=int, default=10)
+        parser.add_argument("--tasks", type=int, default=1000, help="Tasks per user")
+        parser.add_argument("--sprints", type=int, default=26, help="Sprints per user")
+        parser.add_argument("--pages", type=int, default=10, help="Pages per user")
+        parser.add_argument("--no-integrations", action="store_true", help="Skip the GitHub integration row")
+        parser.add_argument("--seed", type=int, default=1, help="Random seed, for reproducible data")
+        parser.add_argument("--delete", action="store_true", help="Delete the users listed in --manifest")
+
+    def handle(self, *args, **options):
+        manifest = Path(options["manifest"])
+        db = get_db()
+        cursor = db.cursor()
+
+        try:
+            if options["delete"]:
+                if not manifest.exists():
+                    raise CommandError(f"No manifest at {manifest}")
+                users = json.loads(manifest.read_text())["users"]
+                delete_users(cursor, [user["user_id"] for user in users])
+                db.commit()
+                manifest.unlink()
+                self.stdout.write(self.style.SUCCESS(f"Deleted {len(users)} seeded users"))
+                return
+
+            if manifest.exists():
+                raise CommandError(f"{manifest} exists; run with --delete first")
+
+            rng = random.Random(options["seed"])
+            users = []
+            for i in range(options["users"]):
+                users.append(seed_user(
+                    cursor, tasks=options["tasks"], sprints=options["sprints"], pages=options["pages"],
+                    integrations=not options["no_integrations"], rng=rng,
+                ))
+                db.commit()
+                self.stdout.write(f"  user {i + 1}/{options['users']}: id {users[-1]['user_id']}")
+        finally:
+            db.close()
+
+        manifest.parent.mkdir(parents=True, exist_ok=True)
+        settings_used = {k: options[k] for k in ("users", "tasks", "sprints", "pages", "seed")}
+        manifest.write_text(json.dumps({"settings": settings_used, "users": users}, indent=2))
+        self.stdout.write(self.style.SUCCESS(f"Seeded {len(users)} users into {manifest}"))
@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from engine.db import get_db
+from engine.slowlog import get_log
+from engine.workload import call_view, dashboard_reads, dashboard_writes, delete_users, seed_user
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed users, replay the dashboard workload and print the heaviest SQL "
+        "fingerprints (a live worker's table is at /api/admin/slow-queries/)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=5, help="Seeded users")
+        parser.add_argument("--tasks", type=int, default=2000, help="Tasks per seeded user")
+        parser.add_argument("--sprints", type=int, default=26, help="Sprints per seeded user")
+        parser.add_argument("--rounds", type=int, default=5, help="Workload passes per user")
+        parser.add_argument("--top", type=int, default=15)
+        parser.add_argument("--order", choices=["total", "p95", "count", "max"], default="total")
+        parser.add_argument("--keep", action="store_true", help="Keep the seeded rows afterwards")
+
+    def handle(self, *args, **options):
+        db = get_db()
+        cursor = db.cursor()
+        seeds = []
+
+        try:
+            for _ in range(options["users"]):
+                seeds.append(seed_user(cursor, tasks=options["tasks"], sprints=options["sprints"]))
+            db.commit()
+
+            log = get_log()
+            log.clear()
+            for _ in range(options["rounds"]):
+                for seed in seeds:
+                    for name, method, params in dashboard_reads(seed) + dashboard_writes(seed):
+                        response = call_view(name, method, params)
+                        if response.status_code >= 500:
+                            raise CommandError(f"{name} failed: {response.content.decode()}")
+            rows = log.top(options["top"], options["order"])
+        finally:
+            if seeds and not options["keep"]:
+                delete_users(cursor, [seed["user_id"] for seed in seeds])
+                db.commit()
+            db.close()
+
+        self.stdout.write(f"{'count':>7} {'total ms':>10} {'avg ms':>8} {'p95 ms':>8} {'max ms':>8}  fingerprint")
+        for row in rows:
+            self.stdout.write(
+                f"{row['count']:>7} {row['total_ms']:>10.1f} {row['avg_ms']:>8.2f} "
+                f"{row['p95_ms']:>8.2f} {row['max_ms']:>8.2f}  {row['fingerprint'][:140]}"
+            )
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from engine.integrations import config
+from engine.reposync import sync_once
+
+
+class Command(BaseCommand):
+    help = (
+        "Refresh cached git host data (repo listings and repo panels) in repo_cache; "
+        "runs until interrupted unless --once"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Run a single pass and exit")
+        parser.add_argument("--poll", type=float, default=2, help="Seconds to sleep when nothing is due")
+
+    def handle(self, *args, **options):
+        conf = config()
+        log = self.stdout.write
+        while True:
+            try:
+                refreshed = sync_once(conf, log)
+            except Exception as e:
+                # Database hiccups shouldn't kill the worker; try again next poll
+                self.stderr.write(f"Sync pass failed: {e}")
+                refreshed = 0
+            if options["once"]:
+                return
+            if not refreshed:
+                time.sleep(options["poll"])
@@ -0,0 +1,203 @@
+"""
+In-process metrics in Prometheus text format, served at /metrics.
+
+Each thread records into its own shard (a plain dict), so recording
+never takes a lock; the registry lock is only taken when a thread
+records for the first time, when /metrics merges the shards, and when
+a finished thread's shard is folded into the registry's base totals
+(thread pools and runserver start a thread per call or request).
+Numbers are per process: with several gunicorn workers each one
+reports its own, labelled with its pid.
+"""
+import bisect
+import os
+import threading
+import time
+import weakref
+
+from .instrumentation import current_stats
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# name -> (type, help, buckets)
+METRICS = {
+    "engine_http_requests_total": ("counter", "Requests by URL name, method and status", None),
+    "engine_http_request_duration_seconds": ("histogram", "Request latency by URL name", LATENCY_BUCKETS),
+    "engine_http_response_size_bytes": ("histogram", "Response body size by URL name", SIZE_BUCKETS),
+    "engine_db_queries_per_request": ("histogram", "SQL statements per request by URL name", QUERY_BUCKETS),
+    "engine_db_time_seconds_total": ("counter", "Time spent in SQL by URL name", None),
+    "engine_outbound_request_duration_seconds": (
+        "histogram", "Integration API calls by host and outcome", LATENCY_BUCKETS
+    ),
+    "engine_outbound_refused_total": (
+        "counter", "Integration API calls refused without sending (circuit open or rate limited)", None
+    ),
+}
+
+# engine.db.pool_stats() keys that only ever grow
+POOL_COUNTERS = {"checkouts", "waits", "wait_time_total", "timeouts", "created", "discarded"}
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._shards = []
+        self._base = {}  # what threads that have finished recorded
+
+    def _shard(self):
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = {}
+            with self._lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+            weakref.finalize(threading.current_thread(), self._retire, shard)
+        return shard
+
+    def _retire(self, shard):
+        with self._lock:
+            self._shards.remove(shard)
+            _merge(self._base, shard)
+
+    def inc(self, name, labels, value=1):
+        shard = self._shard()
+        key = (name, tuple(sorted(labels.items())))
+        shard[key] = shard.get(key, 0) + value
+
+    def observe(self, name, labels, value):
+        buckets = METRICS[name][2]
+        shard = self._shard()
+        key = (name, tuple(sorted(labels.items())))
+        # Per-bucket counts (not cumulative), then sum and count
+        series = shard.get(key)
+        if series is None:
+            series = shard[key] = [0] * (len(buckets) + 3)
+        series[bisect.bisect_left(buckets, value)] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def collect(self):
+        """Merge every thread's shard: {(name, labels): value or series}"""
+        merged = {}
+        with self._lock:
+            shards = list(self._shards)
+            _merge(merged, self._base)
+        for shard in shards:
+            _merge(merged, shard)
+        return merged
+
+    def clear(self):
+        with self._lock:
+            self._base.clear()
+            for shard in self._shards:
+                shard.clear()
+
+
+def _merge(into, shard):
+    for key, value in list(shard.items()):
+        if isinstance(value, list):
+            total = into.setdefault(key, [0] * len(value))
+            for i, v in enumerate(value):
+                total[i] += v
+        else:
+            into[key] = into.get(key, 0) + value
+
+
+registry = Registry()
+
+
+def _labels(pairs, extra=()):
+    pairs = list(pairs) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (
+        (k, str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'))
+        for k, v in pairs
+    )
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(pool=None, gauges=None):
+    """
+    Prometheus text exposition of the registry, plus pool gauges and
+    `gauges`: {name: (help, [(labels dict, value), ...])}
+    """
+    merged = registry.collect()
+    pid = (("pid", os.getpid()),)
+    lines = []
+
+    for name, (kind, help_text, buckets) in METRICS.items():
+        series = sorted((labels, value) for (n, labels), value in merged.items() if n == name)
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in series:
+            if kind != "histogram":
+                lines.append(f"{name}{_labels(pid + labels)} {_number(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip(buckets + ("+Inf",), value):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(pid + labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{name}_sum{_labels(pid + labels)} {_number(value[-2])}")
+            lines.append(f"{name}_count{_labels(pid + labels)} {value[-1]}")
+
+    for key, value in (pool or {}).items():
+        kind = "counter" if key in POOL_COUNTERS else "gauge"
+        name = f"engine_db_pool_{key}" + ("_total" if kind == "counter" and not key.endswith("_total") else "")
+        lines.append(f"# TYPE {name} {kind}")
+        lines.append(f"{name}{_labels(pid)} {_number(value)}")
+
+    for name, (help_text, series) in (gauges or {}).items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} gauge")
+        for labels, value in sorted(series, key=lambda s: sorted(s[0].items())):
+            lines.append(f"{name}{_labels(pid + tuple(sorted(labels.items())))} {_number(value)}")
+
+    return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """
+    Records latency, status and payload size per URL name. List it after
+    QueryInstrumentationMiddleware so it also sees the request's SQL totals.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        match = getattr(request, "resolver_match", None)
+        view = {"view": match.url_name if match and match.url_name else "unmatched"}
+        registry.inc("engine_http_requests_total", {
+            **view, "method": request.method, "status": response.status_code
+        })
+        registry.observe("engine_http_request_duration_seconds", view, elapsed)
+        if not response.streaming:
+            registry.observe("engine_http_response_size_bytes", view, len(response.content))
+
+        stats = current_stats()
+        if stats is not None:
+            registry.observe("engine_db_queries_per_request", view, stats.count)
+            registry.inc("engine_db_time_seconds_total", view, stats.time)
+        return response
+
+
+def observe_outbound(host, outcome, seconds):
+    """Record one integration API call (outcome: HTTP status or "error")"""
+    registry.observe("engine_outbound_request_duration_seconds", {"host": host, "outcome": outcome}, seconds)
+
+
+def count_refused(host, reason):
+    """Count an integration call refused before sending (reason: circuit_open or rate_limited)"""
+    registry.inc("engine_outbound_refused_total", {"host": host, "reason": reason})
@@ -0,0 +1,63 @@
+"""
+JSON rendering for engine views.
+
+Views return renderers.JsonResponse, which serializes through the
+callable named by settings.JSON_RENDERER (dotted path). Without the
+setting that is orjson_dumps when orjson is installed, else
+stdlib_dumps. Both encode straight to bytes, compactly, and handle the
+values pymysql returns: date, datetime and time as ISO 8601 strings,
+Decimal as a string (like Django's encoder), so views can pass rows'
+columns through without str() calls.
+"""
+import datetime
+import decimal
+import json
+from functools import lru_cache
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.module_loading import import_string
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def stdlib_dumps(data):
+    return json.dumps(data, default=_default, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def orjson_dumps(data):
+    # orjson writes date/datetime/time itself; OPT_NON_STR_KEYS keeps int dict keys working like json
+    return orjson.dumps(data, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+@lru_cache(maxsize=None)
+def _load(path):
+    return import_string(path)
+
+
+def get_renderer():
+    path = getattr(settings, "JSON_RENDERER", None)
+    if path:
+        return _load(path)
+    return orjson_dumps if orjson is not None else stdlib_dumps
+
+
+class JsonResponse(HttpResponse):
+    """Drop-in for django.http.JsonResponse that renders with get_renderer()"""
+
+    def __init__(self, data, **kwargs):
+        kwargs.setdefault("content_type", "application/json")
+        super().__init__(content=get_renderer()(data), **kwargs)
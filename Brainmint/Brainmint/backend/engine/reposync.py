@@ -0,0 +1,221 @@
+"""
+Background sync of git host data into repo_cache.
+
+repo_cache holds, per user and platform, the repository listing (the
+row with repo_url '') and a snapshot of each repository the Code page
+has opened (stats, branches, recent commits, open PRs), stored as the
+JSON the endpoints serve. The integration endpoints only read it: they
+report its age and queue a refresh (refresh_requested_at) when a row
+is missing, stale or POST /integrations/refresh/ asks for one.
+
+`manage.py sync_repos` does the API calls. Each pass it adds a listing
+row for new integrations, claims due rows (refresh requested, never
+synced, or older than refresh_interval; repositories nobody opened for
+idle_days are left alone) and refreshes them on sync_workers threads.
+Claimed rows are leased with FOR UPDATE SKIP LOCKED (MySQL 8), so
+several workers can run side by side; a failed refresh keeps the old
+data, records the error and is retried after refresh_interval. Calls
+the HTTP client refused without sending (circuit open, rate limit spent)
+are retried once the host can be called again.
+
+Deploy the worker next to the web processes, e.g. a systemd unit or
+container running `python manage.py sync_repos` (several are fine).
+The endpoints never call the git hosts themselves, so without it the
+Code page stays at "Syncing…" and then reports that nothing arrived.
+"""
+import json
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .db import get_db
+from .httpclient import Unavailable
+from .integrations import RepoDataUnavailable, RepoListing, config, fetch_repo_data
+
+REPO_CACHE_DDL = """
+    CREATE TABLE IF NOT EXISTS repo_cache (
+        user_id INT NOT NULL,
+        platform VARCHAR(16) NOT NULL,
+        repo_url VARCHAR(512) NOT NULL,
+        data MEDIUMTEXT NULL,
+        complete TINYINT(1) NOT NULL DEFAULT 1,
+        error VARCHAR(512) NULL,
+        synced_at TIMESTAMP NULL,
+        viewed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        refresh_requested_at TIMESTAMP NULL,
+        leased_until TIMESTAMP NULL,
+        PRIMARY KEY (user_id, platform, repo_url),
+        KEY idx_repo_cache_due (leased_until, synced_at)
+    )
+"""
+
+LISTING = ""  # repo_url of a platform's repository listing row
+
+
+def request_refresh(cursor, user_id, platform, repo_url=LISTING):
+    """Queue a refresh for the worker (in the caller's transaction)"""
+    cursor.execute("""
+        INSERT INTO repo_cache (user_id, platform, repo_url, refresh_requested_at)
+        VALUES (%s, %s, %s, NOW())
+        ON DUPLICATE KEY UPDATE
+            refresh_requested_at = COALESCE(refresh_requested_at, NOW()), viewed_at = NOW()
+    """, (user_id, platform, repo_url))
+
+
+def clear_integration(cursor, user_id, platform):
+    """Drop a platform's cached data (token changed or integration removed)"""
+    cursor.execute("DELETE FROM repo_cache WHERE user_id = %s AND platform = %s", (user_id, platform))
+
+
+def read_cached(cursor, user_id, platform, repo_url=LISTING):
+    """
+    The cached data and its staleness for an endpoint response, queueing
+    a refresh when the row is missing or older than refresh_interval.
+    Returns (data or None, sync info); the caller commits.
+    """
+    interval = config()["refresh_interval"]
+    cursor.execute("""
+        SELECT data, complete, error, synced_at, refresh_requested_at,
+               TIMESTAMPDIFF(SECOND, synced_at, NOW()) AS age,
+               viewed_at < NOW() - INTERVAL 1 HOUR AS unviewed
+        FROM repo_cache WHERE user_id = %s AND platform = %s AND repo_url = %s
+    """, (user_id, platform, repo_url))
+    row = cursor.fetchone()
+
+    stale = row is None or row["synced_at"] is None or row["age"] > interval
+    refreshing = row is not None and row["refresh_requested_at"] is not None
+    if stale and not refreshing:
+        request_refresh(cursor, user_id, platform, repo_url)
+        refreshing = True
+    elif row is not None and row["unviewed"]:
+        # Keeps the row out of the idle_days cut-off
+        cursor.execute(
+            "UPDATE repo_cache SET viewed_at = NOW() WHERE user_id = %s AND platform = %s AND repo_url = %s",
+            (user_id, platform, repo_url)
+        )
+
+    sync = {
+        "synced_at": row["synced_at"] if row else None,
+        "age_seconds": row["age"] if row else None,
+        "stale": stale,
+        "refreshing": refreshing,
+        "complete": bool(row["complete"]) if row else False,
+        "error": row["error"] if row else None,
+    }
+    data = json.loads(row["data"]) if row and row["data"] else None
+    return data, sync
+
+
+def add_new_integrations(cursor):
+    """Listing rows for integrations the worker has not seen yet"""
+    cursor.execute("""
+        INSERT IGNORE INTO repo_cache (user_id, platform, repo_url)
+        SELECT user_id, platform, '' FROM integrations WHERE access_token <> ''
+    """)
+
+
+def claim_due(cursor, limit, conf):
+    """Lease up to `limit` due rows to this worker; returns them with their tokens"""
+    cursor.execute("""
+        SELECT c.user_id, c.platform, c.repo_url, i.access_token
+        FROM repo_cache c
+        JOIN integrations i ON i.user_id = c.user_id AND i.platform = c.platform
+        WHERE (c.leased_until IS NULL OR c.leased_until < NOW())
+          AND i.access_token <> ''
+          AND (c.refresh_requested_at IS NOT NULL
+               OR c.synced_at IS NULL
+               OR (c.synced_at < NOW() - INTERVAL %s SECOND
+                   AND (c.repo_url = '' OR c.viewed_at > NOW() - INTERVAL %s DAY)))
+        ORDER BY c.refresh_requested_at IS NULL, c.refresh_requested_at, c.synced_at
+        LIMIT %s
+        FOR UPDATE OF c SKIP LOCKED
+    """, (conf["refresh_interval"], conf["idle_days"], limit))
+    rows = cursor.fetchall()
+    if rows:
+        cursor.executemany("""
+            UPDATE repo_cache SET leased_until = NOW() + INTERVAL %s SECOND
+            WHERE user_id = %s AND platform = %s AND repo_url = %s
+        """, [(conf["lease_seconds"], r["user_id"], r["platform"], r["repo_url"]) for r in rows])
+    return rows
+
+
+def fetch(row):
+    """(data, complete) for one repo_cache row, from the host's API"""
+    if row["repo_url"] == LISTING:
+        listing = RepoListing(row["platform"], row["access_token"])
+        repos = [repo for page in listing.pages() for repo in page]
+        return repos, listing.complete
+    data = fetch_repo_data(row["platform"], row["access_token"], row["repo_url"])
+    return data, not data["partial"]
+
+
+def store(cursor, row, data=None, complete=True, error=None, retry_after=0):
+    key = (row["user_id"], row["platform"], row["repo_url"])
+    if error is None:
+        cursor.execute("""
+            UPDATE repo_cache
+            SET data = %s, complete = %s, error = NULL, synced_at = NOW(),
+                refresh_requested_at = NULL, leased_until = NULL
+            WHERE user_id = %s AND platform = %s AND repo_url = %s
+        """, (json.dumps(data), complete) + key)
+    else:
+        # Old data stays; the lease doubles as the retry delay
+        cursor.execute("""
+            UPDATE repo_cache
+            SET error = %s, refresh_requested_at = NULL, leased_until = NOW() + INTERVAL %s SECOND
+            WHERE user_id = %s AND platform = %s AND repo_url = %s
+        """, (error[:512], retry_after) + key)
+
+
+def refresh_row(row, conf):
+    """Fetch and store one claimed row on its own connection; returns the error, if any"""
+    retry_after = conf["refresh_interval"]
+    try:
+        data, complete = fetch(row)
+        error = None
+    except Unavailable as e:
+        # Nothing was sent, so it can be retried as soon as the host accepts calls
+        data, complete, error = None, False, str(e)
+        retry_after = math.ceil(e.retry_after)
+    except RepoDataUnavailable as e:
+        # Say which part failed how; the old snapshot stays
+        data, complete = None, False
+        error = "; ".join(f"{part}: {reason}" for part, reason in sorted(e.errors.items()))
+    except Exception as e:
+        data, complete, error = None, False, str(e) or type(e).__name__
+
+    db = get_db()
+    cursor = db.cursor()
+    try:
+        store(cursor, row, data, complete, error, retry_after)
+        db.commit()
+    finally:
+        db.close()
+    return error
+
+
+def sync_once(conf=None, log=print):
+    """One worker pass; returns the number of rows refreshed"""
+    conf = conf or config()
+    db = get_db()
+    cursor = db.cursor()
+    try:
+        add_new_integrations(cursor)
+        rows = claim_due(cursor, conf["sync_batch"], conf)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    if not rows:
+        return 0
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=conf["sync_workers"]) as executor:
+        errors = list(executor.map(lambda row: refresh_row(row, conf), rows))
+    for row, error in zip(rows, errors):
+        if error:
+            log(f"  {row['platform']} user {row['user_id']} {row['repo_url'] or '(listing)'}: {error}")
+    log(f"Refreshed {len(rows)} rows ({errors.count(None)} ok) in {time.perf_counter() - started:.1f}s")
+    return len(rows)
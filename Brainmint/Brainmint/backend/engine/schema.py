@@ -0,0 +1,184 @@
+"""
+Versioned MySQL schema for the engine tables.
+
+The engine talks to MySQL through engine.db (not the Django ORM), so
+these migrations are applied by `manage.py migrate_schema` and recorded
+in schema_migrations. Steps are SQL strings, Index entries or callables
+taking a cursor. Tables use CREATE TABLE IF NOT EXISTS and indexes
+are only added when no index with the same leading columns exists yet
+(for unique ones: no unique index on exactly those columns). That lets
+the migrations adopt a database whose tables were created by hand.
+"""
+from collections import namedtuple
+
+from .changes import TASK_TOMBSTONES_DDL
+from .reposync import REPO_CACHE_DDL
+from .stats import create_sprint_stats, create_user_counters
+
+Index = namedtuple("Index", ["table", "name", "columns", "unique"], defaults=[False])
+
+SCHEMA_MIGRATIONS_DDL = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version VARCHAR(32) NOT NULL PRIMARY KEY,
+        description VARCHAR(255) NOT NULL,
+        applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+BASE_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS users (
+        id INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+        full_name VARCHAR(255) NOT NULL,
+        email VARCHAR(255) NOT NULL,
+        password CHAR(64) NOT NULL,
+        UNIQUE KEY uq_users_email (email)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS sprints (
+        id INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+        user_id INT NOT NULL,
+        project_title VARCHAR(255) NOT NULL DEFAULT 'My Project',
+        title VARCHAR(255) NOT NULL,
+        start_date DATE NULL,
+        end_date DATE NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS tasks (
+        id INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+        user_id INT NOT NULL,
+        title VARCHAR(255) NOT NULL,
+        priority VARCHAR(16) NOT NULL DEFAULT 'Medium',
+        status VARCHAR(16) NOT NULL DEFAULT 'todo',
+        previous_status VARCHAR(16) NULL,
+        due_date VARCHAR(32) NOT NULL DEFAULT '',
+        subtasks_total INT NOT NULL DEFAULT 0,
+        subtasks_completed INT NOT NULL DEFAULT 0,
+        sprint_id INT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS pages (
+        id INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+        user_id INT NOT NULL,
+        title VARCHAR(255) NOT NULL,
+        body MEDIUMTEXT NULL,
+        created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS integrations (
+        id INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+        user_id INT NOT NULL,
+        platform VARCHAR(16) NOT NULL,
+        repo_url VARCHAR(512) NOT NULL,
+        access_token VARCHAR(512) NOT NULL DEFAULT '',
+        connected_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+]
+
+MIGRATIONS = [
+    ("0001", "base engine tables", BASE_TABLES),
+    # Filled from existing rows on creation: writes only apply deltas
+    ("0002", "sprint_stats and user_counters rollups", [create_sprint_stats, create_user_counters]),
+    ("0003", "indexes for engine queries", [
+        Index("tasks", "idx_tasks_user_status", ["user_id", "status"]),
+        Index("tasks", "idx_tasks_user_due", ["user_id", "due_date"]),
+        Index("tasks", "idx_tasks_sprint", ["sprint_id"]),
+        Index("sprints", "idx_sprints_user", ["user_id"]),
+        Index("pages", "idx_pages_user_updated", ["user_id", "updated_at"]),
+        Index("integrations", "uq_integrations_user_platform", ["user_id", "platform"], unique=True),
+    ]),
+    ("0004", "tasks.due_date as nullable DATE", [
+        "ALTER TABLE tasks MODIFY due_date VARCHAR(32) NULL DEFAULT NULL",
+        # ISO datetimes keep their date part
+        "UPDATE tasks SET due_date = LEFT(due_date, 10) "
+        "WHERE due_date REGEXP '^[0-9]{4}-[0-9]{2}-[0-9]{2}.'",
+        # 'Mar 14' as sent by the dashboard forms, read as the current year.
+        # IGNORE: in strict mode STR_TO_DATE's warning on 'Feb 30' would abort the UPDATE
+        "UPDATE IGNORE tasks SET due_date = DATE_FORMAT(STR_TO_DATE("
+        "CONCAT(due_date, ' ', YEAR(CURDATE())), '%b %e %Y'), '%Y-%m-%d') "
+        "WHERE due_date REGEXP '^[A-Za-z]{3} [0-9]{1,2}$'",
+        "UPDATE tasks SET due_date = NULL "
+        "WHERE due_date NOT REGEXP '^[0-9]{4}-[0-9]{2}-[0-9]{2}$'",
+        # Well-formed but impossible dates ('2025-02-30') would fail the MODIFY halfway
+        "UPDATE IGNORE tasks SET due_date = NULL "
+        "WHERE due_date IS NOT NULL AND STR_TO_DATE(due_date, '%Y-%m-%d') IS NULL",
+        "ALTER TABLE tasks MODIFY due_date DATE NULL DEFAULT NULL",
+    ]),
+    ("0005", "change sequence and tombstones for delta sync", [
+        "ALTER TABLE user_counters ADD COLUMN change_seq BIGINT NOT NULL DEFAULT 0",
+        "ALTER TABLE tasks ADD COLUMN change_seq BIGINT NOT NULL DEFAULT 0",
+        Index("tasks", "idx_tasks_user_change", ["user_id", "change_seq"]),
+        TASK_TOMBSTONES_DDL,
+    ]),
+    ("0006", "repo_cache for the repo sync worker", [REPO_CACHE_DDL]),
+]
+
+
+def applied_versions(cursor):
+    cursor.execute(SCHEMA_MIGRATIONS_DDL)
+    cursor.execute("SELECT version FROM schema_migrations")
+    return {row["version"] for row in cursor.fetchall()}
+
+
+def pending_migrations(cursor):
+    applied = applied_versions(cursor)
+    return [m for m in MIGRATIONS if m[0] not in applied]
+
+
+def migrate(cursor, log=print):
+    """Apply every pending migration in order; returns the versions applied"""
+    done = []
+    for version, description, steps in pending_migrations(cursor):
+        log(f"Applying {version} {description}")
+        for step in steps:
+            if isinstance(step, Index):
+                _add_index(cursor, step, log)
+            elif callable(step):
+                step(cursor)
+            else:
+                cursor.execute(step)
+        cursor.execute(
+            "INSERT INTO schema_migrations (version, description) VALUES (%s, %s)",
+            (version, description)
+        )
+        cursor.connection.commit()
+        done.append(version)
+    return done
+
+
+def _add_index(cursor, index, log):
+    if _has_index(cursor, index.table, index.columns, index.unique):
+        log(f"  {index.table}({', '.join(index.columns)}) already indexed")
+        return
+    kind = "UNIQUE INDEX" if index.unique else "INDEX"
+    cursor.execute(
+        f"ALTER TABLE {index.table} ADD {kind} {index.name} ({', '.join(index.columns)})"
+    )
+
+
+def _has_index(cursor, table, columns, unique=False):
+    """
+    True if some index on `table` starts with exactly these columns. A
+    unique index only counts as unique on exactly these columns (a
+    non-unique or wider one does not enforce it).
+    """
+    cursor.execute("""
+        SELECT index_name, column_name, non_unique
+        FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = %s
+        ORDER BY index_name, seq_in_index
+    """, (table,))
+    indexes = {}
+    for row in cursor.fetchall():
+        row = {key.lower(): value for key, value in row.items()}
+        cols, _ = indexes.setdefault(row["index_name"], ([], not int(row["non_unique"])))
+        cols.append(row["column_name"])
+    if unique:
+        return any(is_unique and cols == list(columns) for cols, is_unique in indexes.values())
+    return any(cols[:len(columns)] == list(columns) for cols, _ in indexes.values())
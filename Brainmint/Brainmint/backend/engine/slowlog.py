@@ -0,0 +1,168 @@
+"""
+Slow-query log keyed by statement fingerprint.
+
+Every statement run through an InstrumentedCursor is fingerprinted
+(literals, placeholders and IN lists replaced by ?) and its time added
+to a rolling window per fingerprint, from which top() reports count,
+total, p95 and max. Executions slower than the threshold are logged on
+the "engine.slow_queries" logger together with their EXPLAIN (at most
+once per fingerprint per window).
+
+Configured with settings.SLOW_QUERY_LOG; the numbers are per process.
+Read them with `manage.py slow_queries` or /api/admin/slow-queries/.
+"""
+import json
+import logging
+import re
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+
+from django.conf import settings
+
+logger = logging.getLogger("engine.slow_queries")
+
+DEFAULTS = {
+    "threshold_ms": 200,     # log executions slower than this
+    "window_seconds": 300,   # rolling window for the aggregates
+    "max_samples": 1000,     # per fingerprint and window
+    "explain": True,         # attach EXPLAIN to logged slow statements
+}
+
+EXPLAINABLE = ("SELECT", "UPDATE", "DELETE", "INSERT", "REPLACE")
+
+_STRING = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%s|%\(\w+\)s")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_SPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(sql):
+    """Statement shape with literals stripped: "... WHERE id IN (?+) AND title LIKE ?" """
+    sql = _STRING.sub("?", sql)
+    sql = _PLACEHOLDER.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _IN_LIST.sub("IN (?+)", sql)
+    return _SPACE.sub(" ", sql).strip()
+
+
+def _config():
+    return {**DEFAULTS, **getattr(settings, "SLOW_QUERY_LOG", {})}
+
+
+def _percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class SlowQueryLog:
+    def __init__(self, window_seconds=300, max_samples=1000):
+        self.window_seconds = window_seconds
+        self.max_samples = max_samples
+        self._lock = threading.Lock()
+        self._samples = {}    # fingerprint -> deque of (timestamp, seconds)
+        self._explained = {}  # fingerprint -> when it was last EXPLAINed
+
+    def record(self, fp, seconds, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            samples = self._samples.get(fp)
+            if samples is None:
+                samples = self._samples[fp] = deque(maxlen=self.max_samples)
+            samples.append((now, seconds))
+            self._prune(samples, now)
+
+    def _prune(self, samples, now):
+        cutoff = now - self.window_seconds
+        while samples and samples[0][0] < cutoff:
+            samples.popleft()
+
+    def should_explain(self, fp, now=None):
+        """True at most once per fingerprint per window"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            last = self._explained.get(fp)
+            if last is not None and now - last < self.window_seconds:
+                return False
+            self._explained[fp] = now
+            return True
+
+    def top(self, n=10, order="total", now=None):
+        """Fingerprints in the window, heaviest first (order: total, p95, count or max)"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            snapshot = []
+            for fp, samples in list(self._samples.items()):
+                self._prune(samples, now)
+                if not samples:
+                    del self._samples[fp]
+                    continue
+                snapshot.append((fp, [seconds for _, seconds in samples]))
+
+        rows = []
+        for fp, times in snapshot:
+            times.sort()
+            rows.append({
+                "fingerprint": fp,
+                "count": len(times),
+                "total_ms": round(sum(times) * 1000, 2),
+                "avg_ms": round(sum(times) / len(times) * 1000, 2),
+                "p95_ms": round(_percentile(times, 0.95) * 1000, 2),
+                "max_ms": round(times[-1] * 1000, 2),
+            })
+        key = {"total": "total_ms", "p95": "p95_ms", "count": "count", "max": "max_ms"}[order]
+        rows.sort(key=lambda row: row[key], reverse=True)
+        return rows[:n]
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+            self._explained.clear()
+
+
+_log = None
+_log_lock = threading.Lock()
+
+
+def get_log():
+    global _log
+    if _log is None:
+        with _log_lock:
+            if _log is None:
+                config = _config()
+                _log = SlowQueryLog(config["window_seconds"], config["max_samples"])
+    return _log
+
+
+def observe(cursor, sql, args, seconds):
+    """Called by InstrumentedCursor after each statement, on the raw cursor"""
+    fp = fingerprint(sql)
+    log = get_log()
+    log.record(fp, seconds)
+
+    config = _config()
+    if seconds * 1000 < config["threshold_ms"]:
+        return
+
+    entry = {"ms": round(seconds * 1000, 2), "fingerprint": fp}
+    if config["explain"] and log.should_explain(fp):
+        entry["explain"] = _explain(cursor, sql, args)
+    logger.warning(json.dumps(entry, default=str))
+
+
+def _explain(cursor, sql, args):
+    if not sql.lstrip().upper().startswith(EXPLAINABLE):
+        return None
+    if isinstance(args, list):
+        # executemany: explain the first row
+        args = args[0] if args else None
+    try:
+        # A separate cursor, so the caller's buffered result is left alone
+        explain_cursor = cursor.connection.cursor()
+        explain_cursor.execute("EXPLAIN " + sql, args)
+        return explain_cursor.fetchall()
+    except Exception as e:
+        return f"EXPLAIN failed: {e}"
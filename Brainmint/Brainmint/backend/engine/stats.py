@@ -0,0 +1,240 @@
+"""
+Rollups kept in step with tasks/sprints by the write endpoints:
+
+- sprint_stats: one row per sprint, read by sprint listings and reports
+- user_counters: one row per user, read by the dashboard summary
+
+Every counter is the number of rows matching a predicate. Writes
+describe a task before and after the change and apply_task_change adds
+the difference inside the caller's transaction. Because writes only add
+differences, the tables must start out matching the source tables:
+create them with create_sprint_stats / create_user_counters (manage.py
+rebuild_sprint_stats / reconcile_user_counters), which fill them from
+the existing rows.
+"""
+
+SPRINT_STATS_DDL = """
+    CREATE TABLE IF NOT EXISTS sprint_stats (
+        sprint_id INT NOT NULL PRIMARY KEY,
+        user_id INT NOT NULL,
+        total_tasks INT NOT NULL DEFAULT 0,
+        completed_tasks INT NOT NULL DEFAULT 0,
+        high_open_tasks INT NOT NULL DEFAULT 0,
+        tech_debt_items INT NOT NULL DEFAULT 0,
+        type_bugs INT NOT NULL DEFAULT 0,
+        type_tech_debt INT NOT NULL DEFAULT 0,
+        type_research INT NOT NULL DEFAULT 0,
+        KEY idx_sprint_stats_user (user_id)
+    )
+"""
+
+USER_COUNTERS_DDL = """
+    CREATE TABLE IF NOT EXISTS user_counters (
+        user_id INT NOT NULL PRIMARY KEY,
+        total_tasks INT NOT NULL DEFAULT 0,
+        done_tasks INT NOT NULL DEFAULT 0,
+        open_tasks INT NOT NULL DEFAULT 0,
+        total_sprints INT NOT NULL DEFAULT 0
+    )
+"""
+
+USER_TASK_COUNTERS = ("total_tasks", "done_tasks", "open_tasks")
+
+COUNTERS = (
+    "total_tasks",
+    "completed_tasks",
+    "high_open_tasks",
+    "tech_debt_items",
+    "type_bugs",
+    "type_tech_debt",
+    "type_research",
+)
+
+# Columns a write must read to describe a task for apply_task_change
+TASK_STATS_COLUMNS = "user_id, sprint_id, status, priority, title"
+
+# Same keywords as the report's LIKE classification (case-insensitive)
+BUG_WORDS = ("bug", "fix", "error")
+TECH_DEBT_WORDS = ("refactor", "tech debt", "clean")
+RESEARCH_WORDS = ("research", "spike")
+
+
+def _mentions(title, words):
+    return any(word in title for word in words)
+
+
+def task_contribution(task):
+    """Counter values a single task adds to its sprint's row"""
+    title = (task.get("title") or "").lower()
+    done = task.get("status") == "done"
+    is_bug = _mentions(title, BUG_WORDS)
+    is_tech_debt = not is_bug and _mentions(title, TECH_DEBT_WORDS)
+    return {
+        "total_tasks": 1,
+        "completed_tasks": int(done),
+        "high_open_tasks": int(task.get("priority") == "High" and not done),
+        "tech_debt_items": int("refactor" in title or "tech debt" in title),
+        "type_bugs": int(is_bug),
+        "type_tech_debt": int(is_tech_debt),
+        "type_research": int(not is_bug and not is_tech_debt and _mentions(title, RESEARCH_WORDS)),
+    }
+
+
+def user_contribution(task):
+    """Counter values a single task adds to its owner's user_counters row"""
+    done = task.get("status") == "done"
+    return {"total_tasks": 1, "done_tasks": int(done), "open_tasks": int(not done)}
+
+
+def apply_task_change(cursor, before, after):
+    """
+    Adjust sprint_stats and user_counters for a task going from `before`
+    to `after`. Either side may be None (insert / delete). Runs in the
+    caller's transaction; commit together with the task write.
+    """
+    deltas = {}
+    user_deltas = {}
+    for task, sign in ((before, -1), (after, 1)):
+        if not task:
+            continue
+        if task.get("user_id"):
+            delta = user_deltas.setdefault(task["user_id"], dict.fromkeys(USER_TASK_COUNTERS, 0))
+            for name, value in user_contribution(task).items():
+                delta[name] += sign * value
+        if not task.get("sprint_id"):
+            continue
+        delta = deltas.setdefault(task["sprint_id"], dict.fromkeys(COUNTERS, 0))
+        for name, value in task_contribution(task).items():
+            delta[name] += sign * value
+
+    for user_id, delta in user_deltas.items():
+        if not any(delta.values()):
+            continue
+        values = [delta[name] for name in USER_TASK_COUNTERS]
+        cursor.execute(f"""
+            INSERT INTO user_counters (user_id, {", ".join(USER_TASK_COUNTERS)})
+            VALUES (%s, {", ".join(["%s"] * len(USER_TASK_COUNTERS))})
+            ON DUPLICATE KEY UPDATE {", ".join(f"{name} = {name} + %s" for name in USER_TASK_COUNTERS)}
+        """, (user_id, *values, *values))
+
+    for sprint_id, delta in deltas.items():
+        if not any(delta.values()):
+            continue
+        values = [delta[name] for name in COUNTERS]
+        # INSERT ... SELECT skips sprint ids that no longer exist
+        cursor.execute(f"""
+            INSERT INTO sprint_stats (sprint_id, user_id, {", ".join(COUNTERS)})
+            SELECT id, user_id, {", ".join(["%s"] * len(COUNTERS))}
+            FROM sprints WHERE id = %s
+            ON DUPLICATE KEY UPDATE {", ".join(f"{name} = {name} + %s" for name in COUNTERS)}
+        """, (*values, sprint_id, *values))
+
+
+def clear_user_stats(cursor, user_id):
+    cursor.execute("DELETE FROM sprint_stats WHERE user_id = %s", (user_id,))
+
+
+def create_sprint_stats(cursor):
+    """
+    Create sprint_stats filled from the existing tasks, if it is missing.
+    Returns the number of sprints filled in, or None if it already existed.
+    """
+    cursor.execute("SHOW TABLES LIKE 'sprint_stats'")
+    if cursor.fetchone():
+        return None
+    cursor.execute(SPRINT_STATS_DDL)
+    return rebuild_sprint_stats(cursor)
+def create_user_counters(cursor):
+    """
+    Create user_counters filled from the existing tasks and sprints, if it
+    is missing. Returns the number of users filled in, or None if it
+    already existed.
+    """
+    cursor.execute("SHOW TABLES LIKE 'user_counters'")
+    if cursor.fetchone():
+        return None
+    cursor.execute(USER_COUNTERS_DDL)
+    return reconcile_user_counters(cursor)
+
+
+def set_sprint_count(cursor, user_id, total_sprints):
+    """Record a user's sprint count after their plan was replaced or deleted"""
+    cursor.execute("""
+        INSERT INTO user_counters (user_id, total_sprints) VALUES (%s, %s)
+        ON DUPLICATE KEY UPDATE total_sprints = %s
+    """, (user_id, total_sprints, total_sprints))
+
+
+def rebuild_sprint_stats(cursor, user_id=None):
+    """Recompute sprint_stats from tasks (all users, or one) to repair drift"""
+    user_filter = "WHERE s.user_id = %s" if user_id else ""
+    params = (user_id,) if user_id else ()
+
+    cursor.execute(
+        "DELETE FROM sprint_stats" + (" WHERE user_id = %s" if user_id else ""),
+        params
+    )
+    cursor.execute(f"""
+        INSERT INTO sprint_stats (sprint_id, user_id, {", ".join(COUNTERS)})
+        SELECT
+            s.id, s.user_id,
+            COUNT(t.id),
+            COALESCE(SUM(t.status = 'done'), 0),
+            COALESCE(SUM(t.priority = 'High' AND t.status != 'done'), 0),
+            COALESCE(SUM(t.title LIKE '%%refactor%%' OR t.title LIKE '%%tech debt%%'), 0),
+            COALESCE(SUM({_like_any(BUG_WORDS)}), 0),
+            COALESCE(SUM(NOT ({_like_any(BUG_WORDS)}) AND ({_like_any(TECH_DEBT_WORDS)})), 0),
+            COALESCE(SUM(NOT ({_like_any(BUG_WORDS)}) AND NOT ({_like_any(TECH_DEBT_WORDS)})
+                         AND ({_like_any(RESEARCH_WORDS)})), 0)
+        FROM sprints s
+        LEFT JOIN tasks t ON t.sprint_id = s.id
+        {user_filter}
+        GROUP BY s.id, s.user_id
+    """, params)
+    return cursor.rowcount
+
+
+def _like_any(words):
+    return " OR ".join(f"t.title LIKE '%%{word}%%'" for word in words)
+
+
+def reconcile_user_counters(cursor, user_id=None):
+    """Recompute user_counters from tasks and sprints (all users, or one); returns the users reconciled"""
+    params = (user_id,) if user_id else ()
+
+    def filter_for(column):
+        return f"WHERE {column} = %s" if user_id else ""
+
+    # Upsert rather than delete and re-insert: the row also holds change_seq
+    cursor.execute(f"""
+        INSERT INTO user_counters (user_id, total_tasks, done_tasks, open_tasks, total_sprints)
+        SELECT
+            u.id,
+            COALESCE(t.total_tasks, 0),
+            COALESCE(t.done_tasks, 0),
+            COALESCE(t.open_tasks, 0),
+            COALESCE(s.total_sprints, 0)
+        FROM users u
+        LEFT JOIN (
+            SELECT user_id,
+                   COUNT(*) AS total_tasks,
+                   SUM(status = 'done') AS done_tasks,
+                   SUM(status != 'done') AS open_tasks
+            FROM tasks {filter_for("user_id")}
+            GROUP BY user_id
+        ) t ON t.user_id = u.id
+        LEFT JOIN (
+            SELECT user_id, COUNT(*) AS total_sprints
+            FROM sprints {filter_for("user_id")}
+            GROUP BY user_id
+        ) s ON s.user_id = u.id
+        {filter_for("u.id")}
+        ON DUPLICATE KEY UPDATE
+            total_tasks = VALUES(total_tasks),
+            done_tasks = VALUES(done_tasks),
+            open_tasks = VALUES(open_tasks),
+            total_sprints = VALUES(total_sprints)
+    """, params * 3)
+    # The upsert's rowcount counts updated rows twice and unchanged ones not at all
+    cursor.execute(f"SELECT COUNT(*) AS users FROM users {filter_for('id')}", params)
+    return cursor.fetchone()["users"]
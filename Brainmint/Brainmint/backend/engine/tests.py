@@ -1,3 +1,1332 @@
-from django.test import TestCase
+import datetime
+import decimal
+import gc
+import gzip
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.core.management.base import CommandError
+from django.http import JsonResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from . import db as engine_db, events, httpclient, instrumentation, integrations, metrics, renderers, reposync, schema, slowlog, stats, urls, versions, views, workload
+from .management.commands import benchmark_endpoints, check_query_plans
+
+
+class FakeCursor:
+    def __init__(self, db):
+        self.db = db
+        self.rows = []
+        self.rowcount = 0
+        self.lastrowid = None
+
+    def execute(self, query, params=None):
+        self.db.queries.append((" ".join(query.split()), params))
+        self.rows = list(self.db.results.pop(0)) if self.db.results else []
+        self.rowcount = len(self.rows)
+
+    def executemany(self, query, seq_of_params):
+        self.db.queries.append((" ".join(query.split()), list(seq_of_params)))
+        self.rows = []
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchall(self):
+        return self.rows
+
+
+class FakeDB:
+    """Stands in for engine.db.get_db(); each execute() consumes one result set"""
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.queries = []
+
+    def cursor(self):
+        # Wrapped like engine.db cursors, so assert_num_queries sees these statements
+        return instrumentation.InstrumentedCursor(FakeCursor(self))
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, n, ping_fails=False, rollback_fails=False):
+        self.n = n
+        self.ping_fails = ping_fails
+        self.rollback_fails = rollback_fails
+        self.closed = False
+
+    def ping(self, reconnect=False):
+        if self.ping_fails:
+            raise ConnectionError("gone away")
+
+    def rollback(self):
+        if self.rollback_fails:
+            raise ConnectionError("gone away")
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    def setUp(self):
+        self.connections = []
+        self.now = 1000.0
+        clock = mock.patch.object(engine_db.time, "monotonic", side_effect=lambda: self.now)
+        clock.start()
+        self.addCleanup(clock.stop)
+
+    def _pool(self, *flags, **options):
+        """Pool over FakeConnections; `flags` configure the first connections made"""
+        flags = list(flags)
+
+        def connect():
+            self.connections.append(FakeConnection(len(self.connections), **(flags.pop(0) if flags else {})))
+            return self.connections[-1]
+        return engine_db.ConnectionPool(connect=connect, **options)
+
+    def test_max_size_and_wait_timeout(self):
+        pool = self._pool(max_size=2, wait_timeout=0)
+        first, second = pool.acquire(), pool.acquire()
+
+        with self.assertRaises(engine_db.PoolTimeout):
+            pool.acquire()
+        stats_ = pool.stats()
+        self.assertEqual((stats_["size"], stats_["in_use"], stats_["created"]), (2, 2, 2))
+        self.assertEqual((stats_["waits"], stats_["timeouts"]), (1, 1))
+
+        first.close()
+        self.assertIs(pool.acquire()._conn, self.connections[0])
+        second.close()
+
+    def test_idle_and_recycled_connections_are_replaced(self):
+        pool = self._pool(idle_timeout=10, recycle=100, ping_interval=1000)
+        pool.acquire().close()
+        self.now += 11
+        pool.acquire().close()
+        self.assertTrue(self.connections[0].closed)
+
+        # Used often enough never to idle out, but older than recycle
+        for _ in range(12):
+            self.now += 9
+            conn = pool.acquire()
+            conn.close()
+        self.assertTrue(self.connections[1].closed)
+        self.assertEqual(len(self.connections), 3)
+        self.assertEqual(pool.stats()["size"], 1)
+
+    def test_failed_ping_discards_and_reconnects(self):
+        pool = self._pool({"ping_fails": True}, ping_interval=1)
+        pool.acquire().close()
+        self.now += 5
+
+        conn = pool.acquire()
+        self.assertIs(conn._conn, self.connections[1])
+        self.assertTrue(self.connections[0].closed)
+        self.assertEqual((pool.stats()["discarded"], pool.stats()["size"]), (1, 1))
+
+    def test_release_after_failed_rollback_closes_the_connection(self):
+        pool = self._pool()
+        conn = pool.acquire()
+        conn._conn.rollback_fails = True
+        conn.close()
+
+        self.assertTrue(self.connections[0].closed)
+        stats_ = pool.stats()
+        self.assertEqual((stats_["size"], stats_["in_use"], stats_["idle"], stats_["discarded"]), (0, 0, 0, 1))
+
+    def test_pool_rebuilt_after_fork(self):
+        with mock.patch.object(engine_db, "_pool", None), mock.patch.object(engine_db, "_pool_pid", None), \
+                mock.patch.object(engine_db.os, "getpid", return_value=100) as getpid:
+            parent = engine_db.get_pool()
+            self.assertIs(engine_db.get_pool(), parent)
+            getpid.return_value = 101
+            self.assertIsNot(engine_db.get_pool(), parent)
+
+    def test_pool_stats_endpoint_is_staff_only(self):
+        response = self.client.get("/api/db/pool-stats/")
+        self.assertEqual(response.status_code, 302)
+        self.assertIn("/admin/login/", response["Location"])
+
+
+class MigrationTests(SimpleTestCase):
+    def _cursor(self, *results):
+        db = FakeDB(*results)
+        cursor = FakeCursor(db)
+        cursor.connection = db
+        return cursor, db
+
+    def test_pending_migrations_applied_in_order_and_recorded(self):
+        backfill = mock.Mock()
+        migrations = [
+            ("0001", "first", ["CREATE TABLE a (id INT)"]),
+            ("0002", "second", [backfill]),
+            ("0003", "third", ["CREATE TABLE c (id INT)", backfill]),
+        ]
+        cursor, db = self._cursor([], [{"version": "0002"}])
+        with mock.patch.object(schema, "MIGRATIONS", migrations):
+            done = schema.migrate(cursor, log=lambda line: None)
+
+        self.assertEqual(done, ["0001", "0003"])
+        self.assertEqual([q for q, _ in db.queries[2:]], [
+            "CREATE TABLE a (id INT)",
+            "INSERT INTO schema_migrations (version, description) VALUES (%s, %s)",
+            "CREATE TABLE c (id INT)",
+            "INSERT INTO schema_migrations (version, description) VALUES (%s, %s)",
+        ])
+        self.assertEqual([p for _, p in db.queries[2:] if p], [("0001", "first"), ("0003", "third")])
+        backfill.assert_called_once_with(cursor)
+
+    def test_applied_migrations_are_skipped(self):
+        cursor, db = self._cursor([], [{"version": version} for version, _, _ in schema.MIGRATIONS])
+        self.assertEqual(schema.migrate(cursor, log=lambda line: None), [])
+        self.assertEqual(len(db.queries), 2)
+
+    def test_due_date_migration_clears_impossible_dates_before_modify(self):
+        steps = dict((version, steps) for version, _, steps in schema.MIGRATIONS)["0004"]
+        cleanup = next(i for i, step in enumerate(steps) if "STR_TO_DATE(due_date, '%Y-%m-%d') IS NULL" in step)
+        self.assertTrue(steps[cleanup].startswith("UPDATE IGNORE"))
+        self.assertEqual(steps[-1], "ALTER TABLE tasks MODIFY due_date DATE NULL DEFAULT NULL")
+        self.assertLess(cleanup, len(steps) - 1)
+
+    def test_existing_indexes_are_detected(self):
+        def statistics(*indexes):
+            return [
+                {"INDEX_NAME": name, "COLUMN_NAME": column, "NON_UNIQUE": int(not unique)}
+                for name, columns, unique in indexes for column in columns
+            ]
+
+        unique = schema.Index("integrations", "uq_integrations_user_platform", ["user_id", "platform"], unique=True)
+        plain = schema.Index("tasks", "idx_tasks_user_status", ["user_id", "status"])
+        cases = [
+            # A plain index on the same columns does not enforce uniqueness
+            (unique, [("idx_ip", ["user_id", "platform"], False)], True),
+            (unique, [("uq_ipr", ["user_id", "platform", "repo_url"], True)], True),
+            (unique, [("uq_ip", ["user_id", "platform"], True)], False),
+            (plain, [("idx_wide", ["user_id", "status", "due_date"], False)], False),
+            (plain, [("idx_user", ["user_id"], False)], True),
+        ]
+        for index, existing, added in cases:
+            cursor, db = self._cursor(statistics(*existing))
+            schema._add_index(cursor, index, log=lambda line: None)
+            self.assertEqual(len(db.queries) == 2, added, (index.name, existing))
+        self.assertEqual(
+            db.queries[-1][0], "ALTER TABLE tasks ADD INDEX idx_tasks_user_status (user_id, status)"
+        )
+
+
+class GetSprintsTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def _sprint_rows(self, count):
+        today = datetime.date.today()
+        rows = []
+        for i in range(count):
+            start = today + datetime.timedelta(days=14 * (i - count // 2))
+            rows.append({
+                "id": i + 1,
+                "project_title": "Apollo",
+                "title": f"Sprint {i + 1}",
+                "start_date": start,
+                "end_date": start + datetime.timedelta(days=13),
+                "task_count": 3,
+                "completed_count": 1,
+            })
+        return rows
+
+    def test_single_query_regardless_of_sprint_count(self):
+        for count in (1, 40):
+            db = FakeDB(self._sprint_rows(count))
+            with mock.patch.object(views, "get_db", return_value=db), instrumentation.assert_num_queries(1):
+                response = views.get_sprints(self.factory.get("/api/sprints/", {"user_id": 1}))
+
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(json.loads(response.content)["sprints"]), count)
+
+    def test_current_sprint_and_counts(self):
+        db = FakeDB(self._sprint_rows(5))
+        with mock.patch.object(views, "get_db", return_value=db):
+            response = views.get_sprints(self.factory.get("/api/sprints/", {"user_id": 1}))
+
+        data = json.loads(response.content)
+        self.assertEqual(data["project_title"], "Apollo")
+        self.assertEqual(data["current_sprint"]["id"], 3)
+        self.assertEqual(data["sprints"][0]["task_count"], 3)
+        self.assertEqual(data["sprints"][0]["completed_count"], 1)
+
+    def test_no_sprints(self):
+        db = FakeDB([])
+        with mock.patch.object(views, "get_db", return_value=db):
+            response = views.get_sprints(self.factory.get("/api/sprints/", {"user_id": 1}))
+
+        self.assertEqual(json.loads(response.content)["sprints"], [])
+
+
+class QueryInstrumentationTests(SimpleTestCase):
+    def test_assert_num_queries_lists_statements(self):
+        db = FakeDB()
+        with self.assertRaisesRegex(AssertionError, "2 queries executed, 1 expected\n  1. SELECT 1"):
+            with instrumentation.assert_num_queries(1):
+                cursor = db.cursor()
+                cursor.execute("SELECT 1")
+                cursor.execute("SELECT 2")
+
+    def test_middleware_adds_server_timing(self):
+        db = FakeDB([{"id": 1}, {"id": 2}])
+
+        def view(request):
+            cursor = db.cursor()
+            cursor.execute("SELECT id FROM tasks")
+            cursor.fetchall()
+            return JsonResponse({})
+
+        with self.assertLogs("engine.queries") as logs:
+            response = instrumentation.QueryInstrumentationMiddleware(view)(RequestFactory().get("/api/tasks/"))
+
+        self.assertRegex(response["Server-Timing"], r'^db;dur=[\d.]+;desc="1 queries, 2 rows", db-slowest;dur=')
+        self.assertEqual(json.loads(logs.records[0].getMessage())["slowest_sql"], "SELECT id FROM tasks")
+
+
+class MetricsTests(SimpleTestCase):
+    def test_histogram_buckets_are_cumulative(self):
+        registry = metrics.Registry()
+        for seconds in (0.004, 0.02, 0.02, 30):
+            registry.observe("engine_http_request_duration_seconds", {"view": "summary"}, seconds)
+        with mock.patch.object(metrics, "registry", registry):
+            text = metrics.render({"in_use": 2, "checkouts": 9})
+
+        labels = f'pid="{os.getpid()}",view="summary"'
+        self.assertIn(f'engine_http_request_duration_seconds_bucket{{{labels},le="0.005"}} 1', text)
+        self.assertIn(f'engine_http_request_duration_seconds_bucket{{{labels},le="0.025"}} 3', text)
+        self.assertIn(f'engine_http_request_duration_seconds_bucket{{{labels},le="+Inf"}} 4', text)
+        self.assertIn(f"engine_http_request_duration_seconds_count{{{labels}}} 4", text)
+        self.assertIn("# TYPE engine_db_pool_checkouts_total counter", text)
+        self.assertIn("# TYPE engine_db_pool_in_use gauge", text)
+
+    def test_finished_threads_fold_into_the_base_totals(self):
+        registry = metrics.Registry()
+        for _ in range(50):
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                list(executor.map(lambda _: registry.inc("engine_outbound_refused_total", {"host": "h"}), range(4)))
+        gc.collect()
+
+        # At most the last pool's threads, which `executor` still references
+        self.assertLessEqual(len(registry._shards), 2)
+        self.assertEqual(registry.collect(), {("engine_outbound_refused_total", (("host", "h"),)): 200})
+
+    def test_requests_counted_per_url_name(self):
+        registry = metrics.Registry()
+        with mock.patch.object(metrics, "registry", registry), override_settings(METRICS_TOKENS=["scraper"]):
+            self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer scraper")
+            response = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer scraper")
+
+        self.assertEqual(response["Content-Type"], "text/plain; version=0.0.4; charset=utf-8")
+        self.assertIn(
+            f'engine_http_requests_total{{pid="{os.getpid()}",method="GET",status="200",view="metrics"}} 1',
+            response.content.decode()
+        )
+
+
+    @override_settings(METRICS_TOKENS=["scraper"])
+    def test_scrape_needs_staff_or_allowed_token(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+        self.assertEqual(self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer other").status_code, 403)
+        self.assertEqual(self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer scraper").status_code, 200)
+
+
+class SlowQueryLogTests(SimpleTestCase):
+    def test_fingerprint_strips_literals(self):
+        self.assertEqual(
+            slowlog.fingerprint("""
+                SELECT * FROM tasks WHERE user_id = %s AND (title LIKE '%%refactor%%' OR id IN (%s, %s, 7))
+                LIMIT 10
+            """),
+            "SELECT * FROM tasks WHERE user_id = ? AND (title LIKE ? OR id IN (?+)) LIMIT ?"
+        )
+
+    def test_rolling_window_aggregates(self):
+        log = slowlog.SlowQueryLog(window_seconds=60)
+        for i in range(20):
+            log.record("SELECT ?", (i + 1) / 1000, now=100)
+        log.record("UPDATE tasks SET status = ?", 0.5, now=10)
+        log.record("UPDATE tasks SET status = ?", 0.002, now=100)
+
+        top = log.top(now=100)
+        self.assertEqual([row["fingerprint"] for row in top], ["SELECT ?", "UPDATE tasks SET status = ?"])
+        self.assertEqual((top[0]["count"], top[0]["p95_ms"], top[0]["max_ms"]), (20, 19.0, 20.0))
+        self.assertEqual(top[1]["count"], 1)
+
+    @override_settings(SLOW_QUERY_LOG={"threshold_ms": 0})
+    def test_slow_statement_logged_with_explain(self):
+        cursor = mock.Mock()
+        cursor.connection.cursor.return_value.fetchall.return_value = [{"type": "ALL", "table": "tasks"}]
+        with mock.patch.object(slowlog, "_log", slowlog.SlowQueryLog()), self.assertLogs("engine.slow_queries") as logs:
+            slowlog.observe(cursor, "SELECT * FROM tasks WHERE title LIKE %s", ("%fix%",), 0.3)
+            slowlog.observe(cursor, "SELECT * FROM tasks WHERE title LIKE %s", ("%bug%",), 0.3)
+
+        entries = [json.loads(record.getMessage()) for record in logs.records]
+        self.assertEqual(entries[0]["explain"], [{"type": "ALL", "table": "tasks"}])
+        self.assertNotIn("explain", entries[1])
+        cursor.connection.cursor.return_value.execute.assert_called_once_with(
+            "EXPLAIN SELECT * FROM tasks WHERE title LIKE %s", ("%fix%",)
+        )
+
+
+class RendererTests(SimpleTestCase):
+    payload = {
+        "due": datetime.date(2025, 3, 14),
+        "at": datetime.datetime(2025, 3, 14, 9, 30, 5),
+        "ratio": decimal.Decimal("2.50"),
+        "by_id": {7: "Sprint 7"},
+        "title": "Caf\u00e9",
+    }
+
+    def test_stdlib_handles_mysql_types(self):
+        expected = {
+            "due": "2025-03-14", "at": "2025-03-14T09:30:05", "ratio": "2.50",
+            "by_id": {"7": "Sprint 7"}, "title": "Caf\u00e9",
+        }
+        self.assertEqual(json.loads(renderers.stdlib_dumps(self.payload)), expected)
+
+    @skipUnless(renderers.orjson, "orjson not installed")
+    def test_orjson_matches_stdlib(self):
+        self.assertEqual(renderers.orjson_dumps(self.payload), renderers.stdlib_dumps(self.payload))
+
+    @override_settings(JSON_RENDERER="engine.renderers.stdlib_dumps")
+    def test_json_response_uses_configured_renderer(self):
+        with mock.patch.object(renderers, "stdlib_dumps", return_value=b"{}") as dumps:
+            renderers._load.cache_clear()
+            response = renderers.JsonResponse({"ok": True}, status=201)
+        renderers._load.cache_clear()
+
+        dumps.assert_called_once_with({"ok": True})
+        self.assertEqual((response.status_code, response["Content-Type"]), (201, "application/json"))
+
+
+class BenchmarkTests(SimpleTestCase):
+    def test_summarize_percentiles_and_queries(self):
+        samples = {"get_tasks": [((i + 1) / 1000, 2, i != 0) for i in range(100)]}
+        report = benchmark_endpoints.summarize(samples, elapsed=2.0)
+
+        endpoint = report["endpoints"]["get_tasks"]
+        self.assertEqual((endpoint["requests"], endpoint["errors"], endpoint["rps"]), (100, 1, 50.0))
+        self.assertEqual((endpoint["p50_ms"], endpoint["p95_ms"], endpoint["p99_ms"]), (51.0, 95.0, 99.0))
+        self.assertEqual(endpoint["queries_per_request"], 2)
+
+    def test_compare_fails_on_regression(self):
+        baseline = {"endpoints": {
+            "get_tasks": {"p95_ms": 10.0, "queries_per_request": 2},
+            "summary": {"p95_ms": 10.0, "queries_per_request": 1},
+        }}
+        report = {"endpoints": {
+            "get_tasks": {"p95_ms": 11.0, "queries_per_request": 2},
+            "summary": {"p95_ms": 10.0, "queries_per_request": 3},
+        }}
+        command = benchmark_endpoints.Command(stdout=io.StringIO())
+
+        with self.assertRaisesMessage(CommandError, "summary: queries/request 1->3"):
+            command._compare(baseline, report, tolerance=0.15)
+        report["endpoints"]["summary"]["queries_per_request"] = 1
+        command._compare(baseline, report, tolerance=0.15)
+        with self.assertRaisesMessage(CommandError, "get_tasks: p95 10.0 -> 11.0 ms"):
+            command._compare(baseline, report, tolerance=0.05)
+
+    def test_compare_needs_the_same_setup(self):
+        meta = {"host": "bench-1", "manifest": {"users": 10, "tasks": 1000}, "concurrency": 4}
+        baseline = {"endpoints": {}, "meta": meta}
+        report = {"endpoints": {}, "meta": {**meta, "host": "laptop"}}
+        command = benchmark_endpoints.Command(stdout=io.StringIO())
+
+        with self.assertRaisesMessage(CommandError, "different setup (host)"):
+            command._compare(baseline, report, tolerance=0.15)
+        command._compare(baseline, {**report, "meta": meta}, tolerance=0.15)
+
+
+class QueryPlanCheckTests(SimpleTestCase):
+    def test_workload_covers_every_data_view(self):
+        seed = {"user_id": 1, "email": "seed@example.com", "sprint_ids": [1, 2], "task_ids": [3, 4], "page_ids": [5]}
+        requests = workload.dashboard_reads(seed) + workload.dashboard_writes(seed) + workload.maintenance_writes(seed)
+        diagnostics = {"db_pool_stats", "slow_queries", "task_events"}
+
+        self.assertEqual({p.name for p in urls.urlpatterns} - diagnostics - {name for name, _, _ in requests}, set())
+        self.assertIn("fix_completed_tasks", {name for name, _, _ in requests})
+
+    def test_recording_cursor_captures_executemany(self):
+        cursor = mock.Mock(mogrify=lambda query, params: query % params)
+        statements = []
+        recording = check_query_plans.RecordingCursor(cursor, statements)
+
+        recording.execute("SELECT %s", (1,))
+        recording.executemany("UPDATE sprints SET title = '%s' WHERE id = %s", [("a", 1), ("b", 2)])
+
+        self.assertEqual(statements, ["SELECT 1", "UPDATE sprints SET title = 'a' WHERE id = 1",
+                                      "UPDATE sprints SET title = 'b' WHERE id = 2"])
+        self.assertEqual(cursor.executemany.call_args.args[1], [("a", 1), ("b", 2)])
+
+
+class SaveSprintPlanTests(SimpleTestCase):
+    def test_saves_only_the_diff(self):
+        existing = [
+            {"id": i, "project_title": "Plan", "title": f"Sprint {i}",
+             "start_date": datetime.date(2025, 1, 7 * i), "end_date": datetime.date(2025, 1, 7 * i + 6)}
+            for i in (1, 2, 3)
+        ]
+        db = FakeDB(existing)
+        with mock.patch.object(views, "get_db", return_value=db):
+            response = views.create_sprints(RequestFactory().post("/api/sprints/create/", json.dumps({
+                "user_id": 4, "project_title": "Plan", "sprints": [
+                    {"id": 1, "title": "Sprint 1", "start_date": "2025-01-07", "end_date": "2025-01-13"},
+                    {"title": "Sprint 2", "start_date": "2025-01-15", "end_date": "2025-01-28"},
+                    {"title": "Sprint 4", "start_date": "2025-01-29", "end_date": "2025-02-11"},
+                ],
+            }), content_type="application/json"))
+
+        data = json.loads(response.content)
+        self.assertEqual((data["created"], data["updated"], data["deleted"]), (1, 1, 1))
+
+        def params(prefix):
+            return next(p for q, p in db.queries if q.startswith(prefix))
+
+        self.assertEqual(params("UPDATE sprints"), [
+            ("Plan", "Sprint 2", datetime.date(2025, 1, 15), datetime.date(2025, 1, 28), 2)
+        ])
+        self.assertEqual(len(params("INSERT INTO sprints")), 1)
+        self.assertEqual(params("DELETE FROM sprints"), (3,))
+        # Tasks of the removed sprint go back to the backlog
+        self.assertEqual(params("UPDATE tasks SET sprint_id = NULL")[1:], (4, 3))
+
+
+class SprintReportTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def _report_rows(self, count):
+        return [{
+            "id": count - i,
+            "title": f"Sprint {count - i}",
+            "start_date": datetime.date(2024, 1, 1),
+            "end_date": datetime.date(2024, 1, 14),
+            "total_tasks": 10,
+            "completed_tasks": 6,
+            "open_bugs_estimate": 2,
+            "tech_debt_items": 1,
+            "type_bugs": 3,
+            "type_tech_debt": 1,
+            "type_research": 1,
+        } for i in range(count)]
+
+    def test_one_query_for_long_history(self):
+        db = FakeDB(self._report_rows(200))
+        with mock.patch.object(views, "get_db", return_value=db):
+            response = views.get_sprint_report(self.factory.get(
+                "/api/sprint-report/", {"user_id": 1, "limit": 200, "since": "2023-06-01"}
+            ))
+
+        data = json.loads(response.content)
+        self.assertEqual(len(db.queries), 1)
+        self.assertEqual(db.queries[0][1], ("1", datetime.date(2023, 6, 1), 200))
+        self.assertEqual(len(data["historical"]), 200)
+        self.assertEqual(data["summary"]["total_tasks"], 2000)
+        self.assertEqual(data["historical"][0]["techDebt"], 10.0)
+        self.assertEqual(
+            {d["name"]: d["value"] for d in data["task_distribution"]},
+            {"Features": 50, "Bugs": 30, "Tech Debt": 10, "Research": 10},
+        )
+
+    def test_invalid_limit(self):
+        response = views.get_sprint_report(self.factory.get(
+            "/api/sprint-report/", {"user_id": 1, "limit": "lots"}
+        ))
+        self.assertEqual(response.status_code, 400)
+
+
+class SprintStatsTests(SimpleTestCase):
+    def test_status_change_updates_one_sprint(self):
+        db = FakeDB()
+        task = {"sprint_id": 7, "status": "todo", "priority": "High", "title": "Fix login bug"}
+        stats.apply_task_change(db.cursor(), task, {**task, "status": "done"})
+
+        self.assertEqual(len(db.queries), 1)
+        deltas = dict(zip(stats.COUNTERS, db.queries[0][1]))
+        self.assertEqual(deltas["completed_tasks"], 1)
+        self.assertEqual(deltas["high_open_tasks"], -1)
+        self.assertEqual(deltas["total_tasks"], 0)
+        self.assertEqual(db.queries[0][1][len(stats.COUNTERS)], 7)
+
+    def test_sprint_move_and_noop(self):
+        db = FakeDB()
+        task = {"sprint_id": 1, "status": "todo", "priority": "Low", "title": "Research caching"}
+        stats.apply_task_change(db.cursor(), task, {**task, "sprint_id": 2})
+        stats.apply_task_change(db.cursor(), task, dict(task))
+        stats.apply_task_change(db.cursor(), {**task, "sprint_id": None}, None)
+
+        self.assertEqual([q[1][len(stats.COUNTERS)] for q in db.queries], [1, 2])
+        self.assertEqual(db.queries[0][1][stats.COUNTERS.index("type_research")], -1)
+        self.assertEqual(db.queries[1][1][stats.COUNTERS.index("type_research")], 1)
+
+    def test_new_table_is_filled_from_tasks(self):
+        db = FakeDB([])
+        stats.create_sprint_stats(db.cursor())
+        self.assertTrue(db.queries[1][0].startswith("CREATE TABLE IF NOT EXISTS sprint_stats"))
+        self.assertTrue(db.queries[3][0].startswith("INSERT INTO sprint_stats"))
+
+        db = FakeDB([{"Tables_in_brainmint": "sprint_stats"}])
+        self.assertIsNone(stats.create_sprint_stats(db.cursor()))
+        self.assertEqual(len(db.queries), 1)
+
+        db = FakeDB([], [], [], [{"users": 4}])
+        self.assertEqual(stats.create_user_counters(db.cursor()), 4)
+        self.assertTrue(db.queries[1][0].startswith("CREATE TABLE IF NOT EXISTS user_counters"))
+        self.assertTrue(db.queries[2][0].startswith("INSERT INTO user_counters"))
+        self.assertEqual(db.queries[3][0], "SELECT COUNT(*) AS users FROM users")
+
+    def test_user_counters_follow_status(self):
+        db = FakeDB()
+        task = {"user_id": 3, "sprint_id": None, "status": "todo", "priority": "Low", "title": "Docs"}
+        stats.apply_task_change(db.cursor(), None, task)
+        stats.apply_task_change(db.cursor(), task, {**task, "status": "done"})
+        stats.apply_task_change(db.cursor(), task, {**task, "priority": "High"})
+
+        self.assertEqual(len(db.queries), 2)
+        self.assertEqual(db.queries[0][1][:4], (3, 1, 0, 1))
+        self.assertEqual(db.queries[1][1][:4], (3, 0, 1, -1))
+
+
+class SummaryTests(SimpleTestCase):
+    def test_two_round_trips(self):
+        counts = {
+            "total_tasks": 4, "done_tasks": 1, "open_tasks": 3, "overdue": 1,
+            "completed_this_week": 1, "total_sprints": 2, "sprints_active": 1,
+        }
+        recent = [{"title": "Ship it", "status": "done"}, {"title": "Write docs", "status": "todo"}]
+        db = FakeDB([counts], recent)
+        with mock.patch.object(views, "get_db", return_value=db):
+            response = views.get_summary(RequestFactory().get("/api/summary/", {"user_id": 1}))
+
+        data = json.loads(response.content)
+        self.assertEqual(len(db.queries), 2)
+        self.assertEqual(data["stats"]["open_tasks"], 3)
+        self.assertEqual(data["stats"]["completion_rate"], 25)
+        self.assertEqual(data["recent_activity"][0]["message"], 'Completed "Ship it"')
+
+
+class DueDateTests(SimpleTestCase):
+    def test_parse_due_date_formats(self):
+        year = datetime.date.today().year
+        self.assertIsNone(views._parse_due_date(""))
+        self.assertEqual(views._parse_due_date("2025-03-14"), datetime.date(2025, 3, 14))
+        self.assertEqual(views._parse_due_date("2025-03-14T09:30:00Z"), datetime.date(2025, 3, 14))
+        self.assertEqual(views._parse_due_date("Mar 14"), datetime.date(year, 3, 14))
+        with self.assertRaises(ValueError):
+            views._parse_due_date("next tuesday")
+
+    def test_range_query_uses_window(self):
+        row = {
+            "id": 1, "title": "Demo", "priority": "High", "status": "todo",
+            "due_date": datetime.date(2025, 3, 14), "subtasks_completed": 0,
+            "subtasks_total": 0, "sprint_id": None, "sprint_name": None,
+        }
+        db = FakeDB([row])
+        with mock.patch.object(views, "get_db", return_value=db):
+            response = views.get_tasks_in_range(RequestFactory().get(
+                "/api/tasks/range/", {"user_id": 1, "from": "2025-03-01", "to": "2025-04-11"}
+            ))
+
+        data = json.loads(response.content)
+        self.assertEqual(db.queries[0][1], ("1", datetime.date(2025, 3, 1), datetime.date(2025, 4, 11)))
+        self.assertEqual(data["tasks"][0]["dueDate"], "2025-03-14")
+        self.assertEqual(data["tasks"][0]["status"], "todo")
+
+    def test_range_rejects_reversed_window(self):
+        response = views.get_tasks_in_range(RequestFactory().get(
+            "/api/tasks/range/", {"user_id": 1, "from": "2025-04-01", "to": "2025-03-01"}
+        ))
+        self.assertEqual(response.status_code, 400)
+
+
+class BoardPaginationTests(SimpleTestCase):
+    def _task(self, task_id, status):
+        return {
+            "id": task_id, "title": f"Task {task_id}", "priority": "Low", "status": status,
+            "due_date": None, "subtasks_completed": 0, "subtasks_total": 0,
+            "sprint_id": None, "sprint_name": None,
+        }
+
+    def test_page_and_cursor(self):
+        rows = [self._task(i, "todo") for i in (11, 12, 13)] + [self._task(20, "done")]
+        db = FakeDB([{"change_seq": 42}], rows)
+        with mock.patch.object(views, "get_db", return_value=db):
+            response = views.get_tasks(RequestFactory().get(
+                "/api/tasks/", {"user_id": 1, "limit": 2, "cursor": "todo.10"}
+            ))
+
+        data = json.loads(response.content)
+        self.assertEqual(len(db.queries), 2)
+        self.assertEqual(db.queries[1][1][:4], ("1", "todo", 10, 3))
+        self.assertEqual(data["sync_version"], 42)
+        self.assertEqual([t["id"] for t in data["todo"]], ["11", "12"])
+        self.assertEqual(data["next_cursor"]["todo"], "todo.12")
+        self.assertIsNone(data["next_cursor"]["done"])
+        self.assertTrue(data["has_more"])
+
+    def test_filters_and_projection(self):
+        db = FakeDB([], [self._task(5, "review")])
+        with mock.patch.object(views, "get_db", return_value=db):
+            response = views.get_tasks(RequestFactory().get("/api/tasks/", {
+                "user_id": 1, "status": "review", "priority": "High,Low",
+                "q": "50%_off", "fields": "title,dueDate",
+            }))
+
+        data = json.loads(response.content)
+        query, params = db.queries[1]
+        self.assertNotIn("sprints", query)
+        self.assertEqual(params, ("1", "review", 0, "High", "Low", "50\\%\\_off%", views.BOARD_PAGE_SIZE + 1))
+        self.assertIn("LIMIT %s", query)
+        self.assertFalse(data["has_more"])
+        self.assertEqual(data["review"], [{"id": "5", "title": "Task 5", "dueDate": ""}])
+        self.assertNotIn("todo", data)
+
+    def test_following_cursors_returns_every_row_once(self):
+        table = [self._task(i, "todo") for i in range(1, 6)] + [self._task(i, "done") for i in (6, 7)]
+
+        class KeysetCursor(FakeCursor):
+            # Answers each UNION branch (user_id, status, after id, limit) from `table`
+            def execute(self, query, params=None):
+                self.db.queries.append((query, params))
+                if "change_seq" in query:
+                    self.rows = [{"change_seq": 9}]
+                    return
+                self.rows = []
+                for _, st, after, limit in zip(*[iter(params)] * 4):
+                    self.rows += [t for t in table if t["status"] == st and t["id"] > after][:limit]
+
+        db = FakeDB()
+        db.cursor = lambda: KeysetCursor(db)
+        seen = {"todo": [], "done": []}
+        query = {"user_id": 1, "limit": 3, "status": "todo,done"}
+        with mock.patch.object(views, "get_db", return_value=db):
+            for _ in range(2):
+                data = json.loads(views.get_tasks(RequestFactory().get("/api/tasks/", query)).content)
+                for st in seen:
+                    seen[st] += [t["id"] for t in data.get(st, [])]
+                cursors = {st: c for st, c in data["next_cursor"].items() if c}
+                query = {"user_id": 1, "limit": 3, "status": ",".join(cursors), "cursor": list(cursors.values())}
+
+        self.assertEqual(cursors, {})
+        self.assertEqual(seen["todo"], ["1", "2", "3", "4", "5"])
+        self.assertEqual(seen["done"], ["6", "7"])
+
+    def test_rejects_unknown_field(self):
+        response = views.get_tasks(RequestFactory().get("/api/tasks/", {"user_id": 1, "fields": "secret"}))
+        self.assertEqual(response.status_code, 400)
+
+
+class TaskChangesTests(SimpleTestCase):
+    def _get(self, db, since):
+        with mock.patch.object(views, "get_db", return_value=db):
+            response = views.get_task_changes(RequestFactory().get(
+                "/api/tasks/changes/", {"user_id": 1, "since": since}
+            ))
+        return json.loads(response.content)
+
+    def test_changed_and_deleted_since_version(self):
+        task = {
+            "id": 8, "title": "Ship it", "priority": "High", "status": "done",
+            "due_date": None, "subtasks_completed": 1, "subtasks_total": 1,
+            "sprint_id": None, "sprint_name": None,
+        }
+        db = FakeDB([{"change_seq": 12}], [task], [{"task_id": 3}])
+        data = self._get(db, 10)
+
+        self.assertEqual(db.queries[1][1], ("1", 10, 12, views.MAX_CHANGES + 1))
+        self.assertEqual(data["version"], 12)
+        self.assertEqual([(t["id"], t["status"]) for t in data["changed"]], [("8", "done")])
+        self.assertEqual(data["deleted"], ["3"])
+        self.assertFalse(data["full_resync"])
+
+    def test_version_from_the_future_needs_resync(self):
+        db = FakeDB([{"change_seq": 4}])
+        data = self._get(db, 9)
+
+        self.assertEqual(len(db.queries), 1)
+        self.assertTrue(data["full_resync"])
+
+    def test_write_stamps_next_change_seq(self):
+        db = FakeDB([{"user_id": 1, "sprint_id": None, "status": "todo", "priority": "Low", "title": "Docs"}])
+        with mock.patch.object(views, "get_db", return_value=db):
+            views.update_priority(RequestFactory().post(
+                "/api/tasks/update-priority/", json.dumps({"task_id": 8, "priority": "High"}),
+                content_type="application/json"
+            ))
+
+        self.assertIn("LAST_INSERT_ID(change_seq + 1)", db.queries[1][0])
+        self.assertEqual(db.queries[2][0], "UPDATE tasks SET priority = %s, change_seq = %s WHERE id = %s")
+
+
+class TaskEventsTests(SimpleTestCase):
+    def test_hub_fans_out_per_user(self):
+        hub = events.LocalHub()
+        mine, theirs = events.Subscription(1), events.Subscription(2)
+        hub.subscribe(mine)
+        hub.subscribe(theirs)
+        hub.publish(1, {"type": "task", "version": 3})
+        hub.unsubscribe(mine)
+        hub.publish(1, {"type": "task", "version": 4})
+
+        self.assertEqual(mine.get(0), {"type": "task", "version": 3})
+        self.assertIsNone(mine.get(0))
+        self.assertIsNone(theirs.get(0))
+        self.assertEqual(hub.subscriber_count(), 1)
+
+    def test_failing_subscriber_is_dropped_and_others_still_get_the_event(self):
+        hub = events.LocalHub()
+        dead, alive = events.Subscription(1), events.Subscription(1)
+        dead.put = mock.Mock(side_effect=RuntimeError("Event loop is closed"))
+        hub.subscribe(dead)
+        hub.subscribe(alive)
+
+        with self.assertLogs("engine.events", "WARNING"):
+            hub.publish(1, {"type": "task", "version": 3})
+
+        self.assertEqual(alive.get(0), {"type": "task", "version": 3})
+        self.assertEqual(hub.subscriber_count(), 1)
+        self.assertTrue(dead.closed and not alive.closed)
+
+    def test_dropped_subscriber_ends_its_stream(self):
+        hub = events.LocalHub()
+        with mock.patch.object(events, "get_hub", return_value=hub), \
+                mock.patch.object(events.Subscription, "put", side_effect=RuntimeError("gone")):
+            chunks = events.stream(1)
+            next(chunks)
+            with self.assertLogs("engine.events", "WARNING"):
+                hub.publish(1, {"type": "task", "version": 3})
+
+            self.assertEqual(list(chunks), [])
+        self.assertEqual(hub.subscriber_count(), 0)
+
+    def test_slow_subscriber_gets_resync(self):
+        subscription = events.Subscription(1)
+        for version in range(events.QUEUE_SIZE + 1):
+            subscription.put({"type": "task", "version": version})
+
+        self.assertEqual(subscription.get(0), events.RESYNC)
+        self.assertIsNone(subscription.get(0))
+
+    def test_concurrent_overflows_never_raise(self):
+        subscription = events.Subscription(1)
+        errors = []
+
+        def publish():
+            try:
+                for version in range(events.QUEUE_SIZE * 5):
+                    subscription.put({"type": "task", "version": version})
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=publish) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertIn(events.RESYNC, [subscription.get(0) for _ in range(events.QUEUE_SIZE)])
+
+    def test_stream_after_commit(self):
+        hub = events.LocalHub()
+        with mock.patch.object(events, "get_hub", return_value=hub):
+            response = views.task_events(RequestFactory().get("/api/tasks/events/", {"user_id": 5}))
+            chunks = iter(response.streaming_content)
+            self.assertEqual(next(chunks), b"retry: 3000\n\n")
+
+            db = FakeDB([{"user_id": 5, "sprint_id": None, "status": "todo", "priority": "Low", "title": "Docs"}])
+            with mock.patch.object(views, "get_db", return_value=db):
+                views.update_task_status(RequestFactory().post(
+                    "/api/tasks/update-status/", json.dumps({"task_id": 8, "status": "done"}),
+                    content_type="application/json"
+                ))
+            frame = next(chunks).decode()
+
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        self.assertIn("event: task", frame)
+        self.assertIn('"op":"status","task_id":"8"', frame)
+        self.assertIn('"fields":{"status":"done"}', frame)
+
+
+class LastInsertIdCursor(FakeCursor):
+    """Reports db.insert_ids in turn as each statement's LAST_INSERT_ID(expr), like PyMySQL's lastrowid"""
+
+    def execute(self, query, params=None):
+        super().execute(query, params)
+        self.lastrowid = self.db.insert_ids.pop(0) if self.db.insert_ids else 0
+
+
+class IncrementSubtaskTests(SimpleTestCase):
+    def _post(self, body, task, auto_done=False):
+        db = FakeDB([], [], [task])
+        # The change seq comes from LAST_INSERT_ID, and so does the guarded UPDATE's auto-done flag
+        db.insert_ids = [41 if task else 0, int(auto_done)]
+        db.cursor = lambda: instrumentation.InstrumentedCursor(LastInsertIdCursor(db))
+        with mock.patch.object(views, "get_db", return_value=db):
+            response = views.increment_subtask(RequestFactory().post(
+                "/api/tasks/increment-subtask/", json.dumps(body), content_type="application/json"
+            ))
+        return json.loads(response.content), db
+
+    def _task(self, completed, total=3, status="progress"):
+        return {
+            "subtasks_total": total, "subtasks_completed": completed, "user_id": 2,
+            "sprint_id": None, "status": status, "priority": "Low", "title": "Docs",
+        }
+
+    def test_delta_completes_task_in_one_guarded_update(self):
+        data, db = self._post({"task_id": 8, "delta": 1}, self._task(3, status="done"), auto_done=True)
+
+        self.assertTrue(data["auto_completed"])
+        self.assertEqual(data["subtasks"], {"completed": 3, "total": 3})
+        self.assertEqual(data["status"], "done")
+        (seq_query, seq_params), (query, params), (read_back, _) = db.queries[:3]
+        self.assertTrue(seq_query.startswith("INSERT INTO user_counters (user_id, change_seq) SELECT user_id"))
+        self.assertEqual(seq_params, (8,))
+        self.assertTrue(query.startswith("UPDATE tasks SET subtasks_completed = GREATEST("))
+        self.assertIn("subtasks_completed + %s", query)
+        self.assertIn("status NOT IN ('done', 'archived')", query)
+        self.assertEqual(params, (1, 1, 41, 8))
+        self.assertTrue(read_back.startswith("SELECT subtasks_total"))
+        self.assertFalse(any(q.startswith("SELECT") and "FOR UPDATE" in q for q, _ in db.queries))
+        self.assertFalse(any("SET change_seq" in q for q, _ in db.queries))
+        rollup = [p for q, p in db.queries if q.startswith("INSERT INTO user_counters (user_id, total_tasks")]
+        self.assertEqual(rollup[0][:4], (2, 0, 1, -1))
+
+    def test_set_mode_and_no_auto_done(self):
+        data, db = self._post({"task_id": 8, "subtasks_completed": 5}, self._task(3, status="archived"))
+
+        self.assertFalse(data["auto_completed"])
+        self.assertEqual(data["status"], "archived")
+        query, params = db.queries[1]
+        self.assertNotIn("subtasks_completed + %s", query)
+        self.assertEqual(params, (5, 5, 41, 8))
+        self.assertEqual(len(db.queries), 3)
+
+    def test_missing_task(self):
+        data, db = self._post({"task_id": 8, "delta": 1}, None)
+        self.assertEqual(data, {"error": "Task not found"})
+        self.assertEqual(len(db.queries), 1)
+
+
+class BatchTests(SimpleTestCase):
+    def _post(self, db, operations):
+        with mock.patch.object(views, "get_db", return_value=db) as get_db:
+            response = views.batch_tasks(RequestFactory().post(
+                "/api/tasks/batch/", json.dumps({"operations": operations}), content_type="application/json"
+            ))
+        return response, get_db.called
+
+    def test_validates_everything_first(self):
+        response, touched_db = self._post(FakeDB(), [
+            {"op": "update-status", "task_id": 1, "status": "done"},
+            {"op": "update-priority", "task_id": 1, "priority": "Urgent"},
+            {"op": "rename", "task_id": 2},
+        ])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([e["index"] for e in json.loads(response.content)["operations"]], [1, 2])
+        self.assertFalse(touched_db)
+
+    def test_one_transaction_with_per_op_results(self):
+        rows = [
+            {"id": i, "user_id": 4, "sprint_id": None, "status": "todo", "previous_status": None,
+             "priority": "Low", "title": f"Task {i}", "due_date": None}
+            for i in (1, 2)
+        ]
+        db = FakeDB(rows)
+        response, _ = self._post(db, [
+            {"op": "update-status", "task_id": 1, "status": "review"},
+            {"op": "update-priority", "task_id": 1, "priority": "High"},
+            {"op": "delete", "task_id": 2},
+            {"op": "archive", "task_id": 2},
+            {"op": "update-status", "task_id": 3, "status": "done"},
+        ])
+
+        data = json.loads(response.content)
+        self.assertEqual([r["ok"] for r in data["results"]], [True, True, True, False, False])
+        self.assertEqual(data["changed"], 2)
+        queries = [q for q, _ in db.queries]
+        self.assertEqual(sum("LAST_INSERT_ID" in q for q in queries), 1)
+        update = next(params for q, params in db.queries if q.startswith("UPDATE tasks"))
+        self.assertEqual(update[0][:3], ("review", None, "High"))
+        self.assertIn("DELETE FROM tasks WHERE id IN (%s)", queries)
+
+
+@override_settings(CACHES={
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "versions": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "etag-tests"},
+})
+class ConditionalGetTests(SimpleTestCase):
+    def _get(self, **headers):
+        db = FakeDB([])
+        with mock.patch.object(views, "get_db", return_value=db) as get_db:
+            response = views.get_pages(RequestFactory().get("/api/pages/", {"user_id": 9}, **headers))
+        return response, get_db.called
+
+    def test_not_modified_skips_database(self):
+        response, _ = self._get()
+        etag = response["ETag"]
+
+        response, touched_db = self._get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+        self.assertFalse(touched_db)
+
+    def test_mutation_changes_etag(self):
+        etag = self._get()[0]["ETag"]
+        versions.bump_data_version(9)
+
+        response, touched_db = self._get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertTrue(touched_db)
+
+        versions.bump_data_version()
+        self.assertNotEqual(self._get()[0]["ETag"], response["ETag"])
+
+
+class FakeHTTPServer:
+    """
+    Local HTTP/1.1 server (keep-alive) for the integration client.
+    respond(path, headers) returns (status, headers, body bytes, delay).
+    """
+
+    def __init__(self, respond):
+        server = self
+        self.requests = []  # (path, request headers, client port)
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                server.requests.append((self.path, dict(self.headers), self.client_address[1]))
+                status, headers, body, delay = respond(self.path, self.headers)
+                if delay:
+                    time.sleep(delay)
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                try:
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # the client gave up (timeout tests)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.server.block_on_close = False
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class FakeGitHostAPI(FakeHTTPServer):
+    """
+    A git host's API. `pages` maps (path, page number) to (json body,
+    extra headers, delay seconds); "{base}" in them is the server URL.
+    """
+
+    def __init__(self, pages):
+        self.pages_requested = []
+
+        def respond(path, _):
+            parts = urllib.parse.urlsplit(path)
+            page = int(dict(urllib.parse.parse_qsl(parts.query)).get("page", 1))
+            self.pages_requested.append((parts.path, page))
+            body, headers, delay = pages[(parts.path, page)]
+            headers = {name: value.replace("{base}", self.url) for name, value in headers.items()}
+            body = json.dumps(body).replace("{base}", self.url).encode()
+            return 200, {"Content-Type": "application/json", **headers}, body, delay
+
+        super().__init__(respond)
+
+
+class HTTPClientTests(SimpleTestCase):
+    def _serve(self, *responses):
+        responses = list(responses)
+        api = FakeHTTPServer(lambda path, headers: responses.pop(0))
+        self.addCleanup(api.close)
+        return api
+
+    def test_revalidates_over_one_connection(self):
+        api = self._serve(
+            (200, {"ETag": '"v1"', "Link": '<next>; rel="next"', "Content-Encoding": "gzip"},
+             gzip.compress(b'[{"id": 1}]'), 0),
+            (304, {"ETag": '"v1"', "X-RateLimit-Remaining": "4999"}, b"", 0),
+        )
+        client = httpclient.HTTPClient(cache="default")
+
+        first, _ = client.get_json(f"{api.url}/user/repos", {"Authorization": "Bearer a"})
+        second, headers = client.get_json(f"{api.url}/user/repos", {"Authorization": "Bearer a"})
+
+        self.assertEqual(first, second)
+        self.assertEqual((headers["Link"], headers["X-RateLimit-Remaining"]), ('<next>; rel="next"', "4999"))
+        (_, sent_first, port_first), (_, sent_second, port_second) = api.requests
+        self.assertEqual(sent_first["Accept-Encoding"], "gzip")
+        self.assertNotIn("If-None-Match", sent_first)
+        self.assertEqual(sent_second["If-None-Match"], '"v1"')
+        self.assertEqual(port_first, port_second)
+
+    def test_retries_5xx_and_secondary_rate_limit(self):
+        api = self._serve(
+            (502, {}, b"", 0),
+            (403, {}, b'{"message": "You have exceeded a secondary rate limit"}', 0),
+            (200, {}, b'{"ok": true}', 0),
+        )
+        client = httpclient.HTTPClient(retries=2, cache="default")
+
+        with mock.patch.object(httpclient.time, "sleep") as sleep:
+            data, _ = client.get_json(f"{api.url}/x")
+
+        self.assertEqual(data, {"ok": True})
+        self.assertEqual((len(api.requests), sleep.call_count), (3, 2))
+
+    def test_long_retry_after_is_not_waited_for(self):
+        api = self._serve((429, {"Retry-After": "60"}, b"", 0))
+        client = httpclient.HTTPClient(max_retry_wait=10, cache="default")
+
+        with self.assertRaises(httpclient.HTTPError) as raised:
+            client.get_json(f"{api.url}/x")
+        self.assertEqual((raised.exception.status, len(api.requests)), (429, 1))
+
+    def test_retry_wait_past_deadline_is_not_made(self):
+        api = self._serve(
+            (503, {"Retry-After": "2"}, b"", 0),
+            (503, {"Retry-After": "2"}, b"", 0),
+            (200, {}, b'{"ok": true}', 0),
+        )
+        client = httpclient.HTTPClient(retries=2, cache="default")
+
+        with mock.patch.object(httpclient.time, "sleep") as sleep, self.assertRaises(httpclient.HTTPError):
+            client.get_json(f"{api.url}/x", deadline=time.monotonic() + 1)
+        self.assertEqual((len(api.requests), sleep.call_count), (1, 0))
+
+        with mock.patch.object(httpclient.time, "sleep") as sleep:
+            self.assertEqual(client.get_json(f"{api.url}/x", deadline=time.monotonic() + 5)[0], {"ok": True})
+        self.assertEqual((len(api.requests), sleep.call_count), (3, 1))
+
+    def test_breaker_opens_after_consecutive_failures(self):
+        api = self._serve((500, {}, b"", 0), (503, {}, b"", 0), (200, {}, b'{"ok": true}', 0))
+        client = httpclient.HTTPClient(retries=0, breaker_threshold=2, breaker_cooldown=0.2, cache="default")
+
+        for _ in range(2):
+            with self.assertRaises(httpclient.HTTPError):
+                client.get_json(f"{api.url}/x")
+        with self.assertRaises(httpclient.CircuitOpen) as raised:
+            client.get_json(f"{api.url}/x")
+        self.assertEqual(len(api.requests), 2)
+        self.assertGreater(raised.exception.retry_after, 0)
+
+        time.sleep(0.25)
+        self.assertEqual(client.get_json(f"{api.url}/x")[0], {"ok": True})
+        self.assertEqual(client._breaker("127.0.0.1").state, httpclient.CircuitBreaker.CLOSED)
+
+    def test_spent_quota_refuses_calls_until_reset(self):
+        reset = str(int(time.time()) + 120)
+        api = self._serve(
+            (200, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": reset}, b"{}", 0),
+            (200, {"X-RateLimit-Remaining": "4999", "X-RateLimit-Reset": reset}, b"{}", 0),
+        )
+        client = httpclient.HTTPClient(cache="default")
+
+        client.get_json(f"{api.url}/x", {"Authorization": "Bearer a"})
+        with self.assertRaises(httpclient.RateLimited) as raised:
+            client.get_json(f"{api.url}/x", {"Authorization": "Bearer a"})
+        client.get_json(f"{api.url}/x", {"Authorization": "Bearer b"})
+
+        self.assertEqual(len(api.requests), 2)
+        self.assertGreater(raised.exception.retry_after, 100)
+        text = metrics.render(gauges=client.gauges())
+        self.assertIn(f'engine_outbound_ratelimit_remaining{{pid="{os.getpid()}",host="127.0.0.1"}} 0', text)
+        self.assertIn(f'engine_outbound_circuit_state{{pid="{os.getpid()}",host="127.0.0.1",scope="host"}} 0', text)
+        self.assertNotIn(hashlib.sha1(b"Bearer a").hexdigest()[:8], text)
+
+
+class RepoListingTests(SimpleTestCase):
+    def _list(self, platform, pages, **settings):
+        api = FakeGitHostAPI(pages)
+        self.addCleanup(api.close)
+        with override_settings(INTEGRATIONS={f"{platform}_url": api.url, **settings}):
+            repos, complete = reposync.fetch({"platform": platform, "access_token": "user:secret", "repo_url": ""})
+        return [repo["name"] for repo in repos], complete, api
+
+    def _github(self, n):
+        return {"full_name": f"me/r{n}", "html_url": f"https://github.com/me/r{n}", "updated_at": "2025-03-14T10:00:00Z"}
+
+    def test_github_fetches_remaining_pages_in_order(self):
+        last = {"Link": '<{base}/user/repos?page=2>; rel="next", <{base}/user/repos?page=3>; rel="last"'}
+        names, complete, api = self._list("github", {
+            ("/user/repos", 1): ([self._github(1), self._github(2)], last, 0),
+            ("/user/repos", 2): ([self._github(3)], {}, 0.1),
+            ("/user/repos", 3): ([self._github(4)], {}, 0),
+        })
+
+        self.assertEqual(names, ["me/r1", "me/r2", "me/r3", "me/r4"])
+        self.assertTrue(complete)
+        self.assertEqual(sorted(api.pages_requested), [("/user/repos", 1), ("/user/repos", 2), ("/user/repos", 3)])
+
+    def test_gitlab_total_pages_header(self):
+        project = lambda n: {"path_with_namespace": f"g/p{n}", "web_url": "", "last_activity_at": "2025-03-14"}
+        names, _, _ = self._list("gitlab", {
+            ("/projects", 1): ([project(1)], {"X-Total-Pages": "2"}, 0),
+            ("/projects", 2): ([project(2)], {}, 0),
+        })
+        self.assertEqual(names, ["g/p1", "g/p2"])
+
+    def test_bitbucket_follows_next_links(self):
+        repo = lambda n: {"full_name": f"w/b{n}", "links": {"html": {"href": ""}}, "updated_on": "2025-03-14"}
+        names, _, api = self._list("bitbucket", {
+            ("/repositories", 1): ({"values": [repo(1)], "next": "{base}/repositories?page=2"}, {}, 0),
+            ("/repositories", 2): ({"values": [repo(2)]}, {}, 0),
+        })
+        self.assertEqual(names, ["w/b1", "w/b2"])
+        self.assertEqual(api.pages_requested, [("/repositories", 1), ("/repositories", 2)])
+
+    def test_pages_past_the_deadline_are_dropped(self):
+        last = {"Link": '<{base}/user/repos?page=3>; rel="last"'}
+        names, complete, _ = self._list("github", {
+            ("/user/repos", 1): ([self._github(1)], last, 0),
+            ("/user/repos", 2): ([self._github(2)], {}, 0),
+            ("/user/repos", 3): ([self._github(3)], {}, 2),
+        }, listing_budget=0.5)
+
+        self.assertEqual(names, ["me/r1", "me/r2"])
+        self.assertFalse(complete)
+
+
+class RepoDataTests(SimpleTestCase):
+    def test_parts_fetched_in_parallel_and_partial_on_timeout(self):
+        repo = "/repos/me/r1"
+        api = FakeGitHostAPI({
+            (repo, 1): ({"full_name": "me/r1", "default_branch": "main", "stargazers_count": 3}, {}, 0.2),
+            (f"{repo}/commits", 1): ([{
+                "sha": "abcdef123", "commit": {"message": "Fix\n\nbody", "author": {"name": "Ann", "date": "2025-03-14T10:00:00Z"}},
+            }], {}, 0.2),
+            (f"{repo}/pulls", 1): ([], {}, 0.2),
+            (f"{repo}/branches", 1): ([{"name": "main"}, {"name": "dev"}], {}, 0.2),
+            (f"{repo}/contributors", 1): ([], {}, 2),
+        })
+        self.addCleanup(api.close)
+
+        started = time.monotonic()
+        with override_settings(INTEGRATIONS={"github_url": api.url, "repo_data_budget": 0.6}):
+            data = integrations.fetch_repo_data("github", "t", "https://github.com/me/r1")
+        elapsed = time.monotonic() - started
+
+        self.assertLess(elapsed, 0.8)
+        self.assertEqual(data["stats"]["stars"], 3)
+        self.assertEqual(data["commits"], [{"sha": "abcdef1", "message": "Fix", "author": "Ann", "date": "2025-03-14"}])
+        self.assertEqual(data["branches"], ["main", "dev"])
+        self.assertNotIn("contributors", data)
+        self.assertEqual((data["errors"], data["partial"]), ({"contributors": "timed out"}, True))
+        self.assertGreaterEqual(data["timings"]["branches"], 200)
+
+
+    def test_every_part_failing_raises_repo_data_unavailable(self):
+        missing = httpclient.HTTPError(404, "Not Found")
+        with mock.patch.object(integrations, "fetch_json", side_effect=missing), \
+                self.assertRaises(integrations.RepoDataUnavailable) as raised:
+            integrations.fetch_repo_data("github", "t", "https://github.com/me/r1")
+
+        self.assertEqual(set(raised.exception.errors), set(integrations.REPO_RESOURCES["github"]))
+        self.assertEqual(str(raised.exception), "Every repo data request failed: HTTP 404: Not Found")
+
+
+class RepoSyncTests(SimpleTestCase):
+    def test_serves_repos_from_cache(self):
+        cached = {
+            "data": json.dumps([{"name": "me/r1"}]), "complete": 1, "error": None,
+            "synced_at": datetime.datetime(2025, 3, 14, 9, 0), "refresh_requested_at": None, "age": 60, "unviewed": 0,
+        }
+        db = FakeDB([{"access_token": "t"}], [cached])
+        with mock.patch.object(views, "get_db", return_value=db), instrumentation.assert_num_queries(2):
+            response = views.get_all_repos(RequestFactory().get("/", {"user_id": 3, "platform": "github"}))
+
+        body = json.loads(response.content)
+        self.assertEqual(body["repos"], [{"name": "me/r1"}])
+        self.assertEqual(
+            (body["sync"]["stale"], body["sync"]["refreshing"], body["sync"]["synced_at"]),
+            (False, False, "2025-03-14T09:00:00")
+        )
+
+    def test_cache_miss_queues_a_refresh(self):
+        db = FakeDB([{"access_token": "t"}], [], [])
+        with mock.patch.object(views, "get_db", return_value=db):
+            response = views.get_repo_data(RequestFactory().get(
+                "/", {"user_id": 3, "platform": "github", "repo_url": "https://github.com/me/r1"}
+            ))
+
+        body = json.loads(response.content)
+        self.assertIsNone(body["data"])
+        self.assertTrue(body["sync"]["stale"] and body["sync"]["refreshing"])
+        query, params = db.queries[-1]
+        self.assertTrue(query.startswith("INSERT INTO repo_cache"))
+        self.assertEqual(params, ("3", "github", "https://github.com/me/r1"))
+
+    def test_worker_stores_claimed_rows(self):
+        due = {"user_id": 3, "platform": "github", "repo_url": "", "access_token": "t"}
+        claim_db, store_db = FakeDB([], [due]), FakeDB()
+        with mock.patch.object(reposync, "get_db", side_effect=[claim_db, store_db]), \
+                mock.patch.object(reposync, "fetch", return_value=([{"name": "me/r1"}], True)):
+            refreshed = reposync.sync_once(log=lambda line: None)
+
+        self.assertEqual(refreshed, 1)
+        self.assertTrue(claim_db.queries[1][0].endswith("FOR UPDATE OF c SKIP LOCKED"))
+        self.assertEqual(claim_db.queries[2][1][0][1:], (3, "github", ""))
+        query, params = store_db.queries[0]
+        self.assertIn("synced_at = NOW()", query)
+        self.assertEqual(params, ('[{"name": "me/r1"}]', True, 3, "github", ""))
+
+    def test_refused_refresh_is_retried_when_the_host_accepts_calls(self):
+        row = {"user_id": 3, "platform": "github", "repo_url": "", "access_token": "t"}
+        db = FakeDB()
+        refused = httpclient.CircuitOpen("api.github.com failing, circuit open for 12s", 12.2)
+        with mock.patch.object(reposync, "get_db", return_value=db), \
+                mock.patch.object(reposync, "fetch", side_effect=refused):
+            error = reposync.refresh_row(row, {"refresh_interval": 900})
+
+        self.assertIn("circuit open", error)
+        query, params = db.queries[0]
+        self.assertIn("leased_until = NOW() + INTERVAL %s SECOND", query)
+        self.assertEqual(params[1], 13)
+
+    def test_failed_repo_data_records_each_part(self):
+        row = {"user_id": 3, "platform": "github", "repo_url": "https://github.com/me/r1", "access_token": "t"}
+        db = FakeDB()
+        failed = integrations.RepoDataUnavailable({"stats": "HTTP 404: Not Found", "branches": "timed out"})
+        with mock.patch.object(reposync, "get_db", return_value=db), \
+                mock.patch.object(reposync, "fetch", side_effect=failed):
+            error = reposync.refresh_row(row, {"refresh_interval": 900})
+
+        self.assertEqual(error, "branches: timed out; stats: HTTP 404: Not Found")
+        self.assertEqual(db.queries[0][1][1], 900)
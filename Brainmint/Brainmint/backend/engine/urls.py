@@ -14,6 +14,10 @@ urlpatterns = [
     path("tasks/delete/", views.delete_task, name="delete_task"),
     path("tasks/update-priority/", views.update_priority, name="update_priority"),
     path("tasks/assign-sprint/", views.assign_task_to_sprint, name="assign_task_to_sprint"),
+    path("tasks/range/", views.get_tasks_in_range, name="get_tasks_in_range"),
+    path("tasks/changes/", views.get_task_changes, name="get_task_changes"),
+    path("tasks/events/", views.task_events, name="task_events"),
+    path("tasks/batch/", views.batch_tasks, name="batch_tasks"),
 
     # Sprints Endpoints
     path("sprints/", views.get_sprints, name="get_sprints"),
@@ -26,6 +30,10 @@ urlpatterns = [
 
     path('summary/', views.get_summary, name='summary'),
 
+    # Diagnostics
+    path("db/pool-stats/", views.db_pool_stats, name="db_pool_stats"),
+    path("admin/slow-queries/", views.slow_queries, name="slow_queries"),
+
 
     # ADD THESE 3 lines inside your urlpatterns list in urls.py
 
@@ -48,6 +56,7 @@ urlpatterns = [
     path("integrations/delete/", views.delete_integration, name="delete_integration"),
     path("integrations/repo-data/", views.get_repo_data, name="get_repo_data"),
     path("integrations/repos/", views.get_all_repos, name="get_all_repos"),
+    path("integrations/refresh/", views.refresh_integration, name="refresh_integration"),
 
     
 ]
\ No newline at end of file
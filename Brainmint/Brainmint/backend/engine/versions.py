@@ -0,0 +1,80 @@
+"""
+Per-user data versions for conditional GETs.
+
+Every mutation endpoint calls bump_data_version(user_id) after it
+commits. Read endpoints decorated with @etag_by_data_version tag their
+responses with the version they started from. A matching If-None-Match
+gets 304 Not Modified before the view (and MySQL) is touched.
+
+Versions live in the "versions" cache (settings.CACHES). It must be
+shared by every worker that serves the API: a file cache covers one
+host, memcached/redis covers several. Each bump stores a fresh random
+token rather than incrementing, so concurrent bumps can never leave
+the version at a value some reader has already seen.
+"""
+import datetime
+import hashlib
+import uuid
+from functools import wraps
+
+from django.core.cache import caches
+from django.http import HttpResponseNotModified
+from django.utils.http import parse_etags
+
+VERSION_CACHE = "versions"
+GLOBAL_KEY = "data_version:*"
+
+
+def _cache():
+    return caches[VERSION_CACHE]
+
+
+def _key(user_id):
+    return f"data_version:{user_id}"
+
+
+def _get_or_create(key):
+    cache = _cache()
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+def get_data_version(user_id):
+    """Version token covering everything a user can read"""
+    return f"{_get_or_create(GLOBAL_KEY)}.{_get_or_create(_key(user_id))}"
+
+
+def bump_data_version(user_id=None):
+    """Invalidate a user's cached reads (every user's when user_id is None)"""
+    _cache().set(GLOBAL_KEY if user_id is None else _key(user_id), uuid.uuid4().hex, None)
+
+
+def etag_by_data_version(view):
+    """Strong ETag from the user's data version, the query string and today's date"""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        user_id = request.GET.get("user_id")
+        if request.method != "GET" or not user_id:
+            return view(request, *args, **kwargs)
+
+        # Read before the view runs so the tag can only be older than the data
+        version = get_data_version(user_id)
+        digest = hashlib.sha1("|".join([
+            view.__name__, user_id, version, request.GET.urlencode(), str(datetime.date.today())
+        ]).encode()).hexdigest()
+        etag = f'"{digest[:32]}"'
+
+        if etag in parse_etags(request.headers.get("If-None-Match", "")):
+            response = HttpResponseNotModified()
+        else:
+            response = view(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+        response["ETag"] = etag
+        response["Cache-Control"] = "private, no-cache"
+        return response
+
+    return wrapper
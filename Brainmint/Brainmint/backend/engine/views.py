@@ -1,9 +1,30 @@
-from django.http import JsonResponse
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
-import json, hashlib
-from .db import get_db
+import json, hashlib, hmac, logging
+from .changes import (
+    MAX_CHANGES, current_change_seq, next_change_seq, next_task_change_seq, record_task_deletion,
+    record_task_deletions,
+)
+from .db import get_db, pool_stats
+from .events import astream, publish_task_event, stream
+from .integrations import get_client as get_integration_client
+from .metrics import render as render_metrics
+from .renderers import JsonResponse
+from .reposync import LISTING, clear_integration, read_cached, request_refresh
+from .slowlog import get_log as get_slow_query_log
+from .versions import bump_data_version, etag_by_data_version
+from .stats import (
+    TASK_STATS_COLUMNS, apply_task_change, clear_user_stats, rebuild_sprint_stats,
+    reconcile_user_counters, set_sprint_count,
+)
 import datetime
-import urllib.parse
+import os
+
+logger = logging.getLogger("engine.views")
+
 
 @csrf_exempt
 def signup(request):
@@ -68,57 +89,306 @@ def login(request):
         return JsonResponse({"error": "Invalid credentials"}, status=401)
 
 
+DUE_DATE_FORMATS = ("%Y-%m-%d", "%b %d, %Y", "%B %d, %Y", "%m/%d/%Y")
+MAX_RANGE_DAYS = 400
+
+
+def _parse_due_date(value):
+    """Normalize a client due date to a date (None when empty); raises ValueError"""
+    if value is None or str(value).strip() == "":
+        return None
+    value = str(value).strip()
+    if value[:4].isdigit():
+        # ISO date or datetime ("2025-03-14", "2025-03-14T00:00:00Z")
+        return datetime.date.fromisoformat(value[:10])
+    for fmt in DUE_DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(value, fmt).date()
+        except ValueError:
+            pass
+    try:
+        # Dashboard and Backlog send "Mar 14" (no year): assume the current year
+        today = datetime.date.today()
+        return datetime.datetime.strptime(f"{value} {today.year}", "%b %d %Y").date()
+    except ValueError:
+        raise ValueError(f"Invalid due_date: {value}")
+
+
+# Board card fields: name -> (tasks columns it needs, value builder)
+TASK_FIELDS = {
+    "id": (("id",), lambda t: str(t["id"])),
+    "title": (("title",), lambda t: t["title"]),
+    "priority": (("priority",), lambda t: t["priority"]),
+    "dueDate": (("due_date",), lambda t: t["due_date"] or ""),
+    "avatar": ((), lambda t: "https://placehold.co/32x32"),
+    "subtasks": (("subtasks_completed", "subtasks_total"), lambda t: {
+        "completed": t["subtasks_completed"],
+        "total": t["subtasks_total"]
+    }),
+    "progress": (("subtasks_completed", "subtasks_total"), lambda t: (
+        int((t["subtasks_completed"] / t["subtasks_total"]) * 100)
+        if t["subtasks_total"] > 0 else 0
+    )),
+    "isWIP": (("status",), lambda t: t["status"] == "progress"),
+    "sprint_id": (("sprint_id",), lambda t: t["sprint_id"]),
+    "sprint_name": (("sprint_id",), lambda t: t.get("sprint_name")),
+}
+
+BOARD_STATUSES = ["todo", "progress", "review", "done"]
+PRIORITIES = ["High", "Medium", "Low"]
+BOARD_PAGE_SIZE = 500
+
+
+def _task_to_dict(t, fields=None):
+    """Board card for a tasks row (plus sprint_name, when joined)"""
+    return {name: TASK_FIELDS[name][1](t) for name in (fields or TASK_FIELDS)}
+
+
+def _parse_board_query(params):
+    """Validate get_tasks paging/filter params; raises ValueError"""
+    statuses = params.get("status", "").split(",") if params.get("status") else BOARD_STATUSES
+    if any(st not in BOARD_STATUSES for st in statuses):
+        raise ValueError(f"status must be among {', '.join(BOARD_STATUSES)}")
+
+    fields = params.get("fields", "").split(",") if params.get("fields") else list(TASK_FIELDS)
+    unknown = [f for f in fields if f not in TASK_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    if "id" not in fields:
+        fields.insert(0, "id")
+
+    # Every response is bounded; the dashboard follows next_cursor (src/pages/boardApi.js)
+    limit = int(params.get("limit", BOARD_PAGE_SIZE))
+    if not 1 <= limit <= BOARD_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {BOARD_PAGE_SIZE}")
+
+    # Cursors are "<status>.<last id>" as returned in next_cursor
+    after = {}
+    for token in params.getlist("cursor"):
+        st, _, last_id = token.partition(".")
+        if st not in BOARD_STATUSES or not last_id.isdigit():
+            raise ValueError(f"Invalid cursor: {token}")
+        after[st] = int(last_id)
+
+    filters = []
+    values = []
+    if params.get("priority"):
+        priorities = params["priority"].split(",")
+        filters.append(f"t.priority IN ({', '.join(['%s'] * len(priorities))})")
+        values.extend(priorities)
+    if params.get("sprint_id"):
+        if params["sprint_id"] == "none":
+            filters.append("t.sprint_id IS NULL")
+        else:
+            filters.append("t.sprint_id = %s")
+            values.append(int(params["sprint_id"]))
+    if params.get("due_from"):
+        filters.append("t.due_date >= %s")
+        values.append(_to_date(params["due_from"]))
+    if params.get("due_to"):
+        filters.append("t.due_date <= %s")
+        values.append(_to_date(params["due_to"]))
+    if params.get("q"):
+        prefix = params["q"].replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        filters.append("t.title LIKE %s")
+        values.append(prefix + "%")
+
+    return statuses, fields, limit, after, filters, values
+
+
+@etag_by_data_version
 def get_tasks(request):
+    """
+    Board columns, keyset-paginated per status (ordered by id).
+
+    Optional params: status (comma list), limit (per column, default and
+    max 500), cursor (repeatable, from next_cursor; request only the
+    statuses being paged), priority, sprint_id ("none" for unassigned),
+    due_from/due_to, q (title prefix), fields (comma list). has_more is
+    true when some column has a next_cursor. sync_version is the since=
+    value for /tasks/changes/.
+    """
     user_id = request.GET.get("user_id")
     if not user_id:
         return JsonResponse({"error": "user_id required"}, status=400)
 
+    try:
+        statuses, fields, limit, after, filters, values = _parse_board_query(request.GET)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    columns = {"id", "status"}
+    for name in fields:
+        columns.update(TASK_FIELDS[name][0])
+    select = ", ".join(f"t.{c}" for c in sorted(columns))
+    join = ""
+    if "sprint_name" in fields:
+        select += ", s.title AS sprint_name"
+        join = "LEFT JOIN sprints s ON s.id = t.sprint_id"
+    extra = "".join(f" AND {f}" for f in filters)
+
+    # OPTIMIZED: One round trip, one bounded index range scan per column
+    branches = []
+    params = []
+    for st in statuses:
+        branches.append(f"""
+            (SELECT {select} FROM tasks t {join}
+             WHERE t.user_id = %s AND t.status = %s AND t.id > %s{extra}
+             ORDER BY t.id LIMIT %s)
+        """)
+        params.extend([user_id, st, after.get(st, 0), *values, limit + 1])
+
     db = get_db()
     cursor = db.cursor()
 
-    # OPTIMIZED: Fetch sprints first for O(1) lookup
-    cursor.execute("SELECT id, title FROM sprints WHERE user_id = %s", (user_id,))
-    sprint_map = {row["id"]: row["title"] for row in cursor.fetchall()}
-
-    # OPTIMIZED: Simple query without JOIN (faster)
-    cursor.execute("SELECT * FROM tasks WHERE user_id = %s", (user_id,))
-    rows = cursor.fetchall()
-    db.close()
-
-    data = {
-        "todo": [],
-        "progress": [],
-        "review": [],
-        "done": []
-    }
-
-    for t in rows:
-        task = {
-            "id": str(t["id"]),
-            "title": t["title"],
-            "priority": t["priority"],
-            "dueDate": t["due_date"],
-            "avatar": "https://placehold.co/32x32",
-            "subtasks": {
-                "completed": t["subtasks_completed"],
-                "total": t["subtasks_total"]
-            },
-            "progress": (
-                int((t["subtasks_completed"] / t["subtasks_total"]) * 100)
-                if t["subtasks_total"] > 0 else 0
-            ),
-            "isWIP": t["status"] == "progress",
-            "sprint_id": t["sprint_id"],
-            "sprint_name": sprint_map.get(t["sprint_id"])  # O(1) lookup
-        }
+    try:
+        # Same snapshot as the board rows, so no change can fall in between
+        sync_version = current_change_seq(cursor, user_id)
+        cursor.execute(" UNION ALL ".join(branches), tuple(params))
+        rows = cursor.fetchall()
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=500)
+    finally:
+        db.close()
 
-        if t["status"] not in data:
+    data = {st: [] for st in statuses}
+    next_cursor = {st: None for st in statuses}
+    for t in sorted(rows, key=lambda row: row["id"]):
+        column = data[t["status"]]
+        if len(column) == limit:
+            next_cursor[t["status"]] = f"{t['status']}.{column[-1]['id']}"
             continue
-        data[t["status"]].append(task)
+        column.append(_task_to_dict(t, fields))
 
+    data["next_cursor"] = next_cursor
+    data["has_more"] = any(next_cursor.values())
+    data["sync_version"] = sync_version
     return JsonResponse(data)
 
 
+@etag_by_data_version
+def get_tasks_in_range(request):
+    """Tasks due between from and to (inclusive), for the calendar and timeline"""
+    if request.method != "GET":
+        return JsonResponse({"error": "GET only"}, status=405)
+
+    user_id = request.GET.get("user_id")
+    if not user_id or not request.GET.get("from") or not request.GET.get("to"):
+        return JsonResponse({"error": "user_id, from and to required"}, status=400)
+
+    try:
+        start = _to_date(request.GET["from"])
+        end = _to_date(request.GET["to"])
+    except ValueError:
+        return JsonResponse({"error": "from and to must be YYYY-MM-DD"}, status=400)
+    if end < start or (end - start).days > MAX_RANGE_DAYS:
+        return JsonResponse({"error": f"to must be on or after from, at most {MAX_RANGE_DAYS} days"}, status=400)
+
+    db = get_db()
+    cursor = db.cursor()
+
+    try:
+        # Range scan on (user_id, due_date)
+        cursor.execute("""
+            SELECT t.*, s.title AS sprint_name
+            FROM tasks t
+            LEFT JOIN sprints s ON s.id = t.sprint_id
+            WHERE t.user_id = %s AND t.due_date BETWEEN %s AND %s AND t.status != 'archived'
+            ORDER BY t.due_date, t.id
+        """, (user_id, start, end))
+        rows = cursor.fetchall()
+
+        tasks = []
+        for t in rows:
+            task = _task_to_dict(t)
+            task["status"] = t["status"]
+            tasks.append(task)
+
+        return JsonResponse({"from": start, "to": end, "tasks": tasks})
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=500)
+    finally:
+        db.close()
+
+
+@etag_by_data_version
+def get_task_changes(request):
+    """
+    Tasks changed or deleted since a sync version (from get_tasks or a
+    previous call). Archived tasks come back with status "archived".
+    full_resync means the client should reload the board instead.
+    """
+    if request.method != "GET":
+        return JsonResponse({"error": "GET only"}, status=405)
+
+    user_id = request.GET.get("user_id")
+    if not user_id:
+        return JsonResponse({"error": "user_id required"}, status=400)
+    try:
+        since = int(request.GET.get("since", 0))
+    except ValueError:
+        return JsonResponse({"error": "since must be an integer"}, status=400)
+
+    db = get_db()
+    cursor = db.cursor()
+
+    try:
+        # Read the version first; the rows below come from the same snapshot
+        version = current_change_seq(cursor, user_id)
+        if since > version:
+            return JsonResponse({"version": version, "changed": [], "deleted": [], "full_resync": True})
+
+        # Range scan on (user_id, change_seq)
+        cursor.execute("""
+            SELECT t.*, s.title AS sprint_name
+            FROM tasks t
+            LEFT JOIN sprints s ON s.id = t.sprint_id
+            WHERE t.user_id = %s AND t.change_seq > %s AND t.change_seq <= %s
+            ORDER BY t.change_seq
+            LIMIT %s
+        """, (user_id, since, version, MAX_CHANGES + 1))
+        rows = cursor.fetchall()
+
+        cursor.execute("""
+            SELECT task_id FROM task_tombstones
+            WHERE user_id = %s AND change_seq > %s AND change_seq <= %s
+            LIMIT %s
+        """, (user_id, since, version, MAX_CHANGES + 1))
+        deleted = [str(row["task_id"]) for row in cursor.fetchall()]
+
+        if len(rows) + len(deleted) > MAX_CHANGES:
+            return JsonResponse({"version": version, "changed": [], "deleted": [], "full_resync": True})
+
+        changed = []
+        for t in rows:
+            task = _task_to_dict(t)
+            task["status"] = t["status"]
+            changed.append(task)
+
+        return JsonResponse({"version": version, "changed": changed, "deleted": deleted, "full_resync": False})
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=500)
+    finally:
+        db.close()
+
+
+def task_events(request):
+    """Server-sent events for a user's task changes (see engine/events.py)"""
+    if request.method != "GET":
+        return JsonResponse({"error": "GET only"}, status=405)
+
+    user_id = request.GET.get("user_id")
+    if not user_id:
+        return JsonResponse({"error": "user_id required"}, status=400)
+
+    # Async under ASGI so an open stream does not pin a worker thread
+    events = astream(user_id) if isinstance(request, ASGIRequest) else stream(user_id)
+    response = StreamingHttpResponse(events, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
 @csrf_exempt
 def create_task(request):
     if request.method != "POST":
@@ -130,21 +400,32 @@ def create_task(request):
         title = data.get("title", "").strip()
         priority = data.get("priority", "Medium")
         status = data.get("status", "todo")
-        due_date = data.get("due_date", "")
         subtasks_total = int(data.get("subtasks_total", 0))
         sprint_id = int(data["sprint_id"]) if data.get("sprint_id") else None
 
+        try:
+            due_date = _parse_due_date(data.get("due_date"))
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+
         db = get_db()
         cursor = db.cursor()
 
+        seq = next_change_seq(cursor, user_id)
         cursor.execute("""
             INSERT INTO tasks 
-            (user_id, title, priority, status, due_date, subtasks_total, subtasks_completed, sprint_id)
-            VALUES (%s, %s, %s, %s, %s, %s, 0, %s)
-        """, (user_id, title, priority, status, due_date, subtasks_total, sprint_id))
+            (user_id, title, priority, status, due_date, subtasks_total, subtasks_completed, sprint_id, change_seq)
+            VALUES (%s, %s, %s, %s, %s, %s, 0, %s, %s)
+        """, (user_id, title, priority, status, due_date, subtasks_total, sprint_id, seq))
+        task_id = cursor.lastrowid
 
+        apply_task_change(cursor, None, {
+            "user_id": user_id, "sprint_id": sprint_id,
+            "status": status, "priority": priority, "title": title
+        })
         db.commit()
-        task_id = cursor.lastrowid
+        bump_data_version(user_id)
+        publish_task_event(user_id, "create", task_id, seq)
         
         sprint_name = None
         if sprint_id:
@@ -159,7 +440,7 @@ def create_task(request):
             "id": str(task_id),
             "title": title,
             "priority": priority,
-            "dueDate": due_date,
+            "dueDate": due_date or "",
             "avatar": "https://placehold.co/32x32",
             "subtasks": {"completed": 0, "total": subtasks_total},
             "progress": 0,
@@ -187,63 +468,100 @@ def update_task_status(request):
     cursor = db.cursor()
 
     cursor.execute(
-        "UPDATE tasks SET status = %s WHERE id = %s",
-        (data["status"], data["task_id"])
+        f"SELECT {TASK_STATS_COLUMNS} FROM tasks WHERE id = %s FOR UPDATE",
+        (data["task_id"],)
     )
+    before = cursor.fetchone()
 
+    if before:
+        seq = next_change_seq(cursor, before["user_id"])
+        cursor.execute(
+            "UPDATE tasks SET status = %s, change_seq = %s WHERE id = %s",
+            (data["status"], seq, data["task_id"])
+        )
+        apply_task_change(cursor, before, {**before, "status": data["status"]})
     db.commit()
     db.close()
 
+    if before:
+        bump_data_version(before["user_id"])
+        publish_task_event(before["user_id"], "status", data["task_id"], seq, status=data["status"])
+
     return JsonResponse({"message": "Task status updated"})
 
 
 @csrf_exempt
 def increment_subtask(request):
+    """
+    Set (subtasks_completed) or change (delta, e.g. 1 or -1) a task's completed
+    subtask count, moving it to done once every subtask is complete. Returns
+    the new state. Prefer delta: concurrent clicks then all count.
+    """
     if request.method != "POST":
         return JsonResponse({"error": "POST only"}, status=400)
 
     data = json.loads(request.body)
     task_id = data.get("task_id")
     subtasks_completed = data.get("subtasks_completed")
+    delta = data.get("delta")
 
-    if not task_id or subtasks_completed is None:
-        return JsonResponse({"error": "task_id and subtasks_completed required"}, status=400)
+    if not task_id or (subtasks_completed is None and delta is None):
+        return JsonResponse({"error": "task_id and subtasks_completed or delta required"}, status=400)
+    try:
+        value = int(delta if delta is not None else subtasks_completed)
+    except (TypeError, ValueError):
+        return JsonResponse({"error": "subtasks_completed and delta must be integers"}, status=400)
+
+    # Delta mode builds on the stored count; either way it is clamped to [0, subtasks_total]
+    base = "subtasks_completed + %s" if delta is not None else "%s"
 
     db = get_db()
     cursor = db.cursor()
 
     try:
+        seq = next_task_change_seq(cursor, task_id)
+        if seq is None:
+            return JsonResponse({"error": "Task not found"}, status=404)
+
+        # OPTIMIZED: One guarded UPDATE computes the count from the current row, so
+        # concurrent clicks all count without reading it first. SET runs left to
+        # right: status sees the new count. LAST_INSERT_ID(1) flags auto-done.
+        cursor.execute(f"""
+            UPDATE tasks
+            SET subtasks_completed = GREATEST(
+                    IF(subtasks_total > 0, LEAST({base}, subtasks_total), {base}), 0),
+                status = IF(subtasks_total > 0 AND subtasks_completed >= subtasks_total
+                            AND status NOT IN ('done', 'archived'),
+                            IF(LAST_INSERT_ID(1), 'done', 'done'), status),
+                change_seq = %s
+            WHERE id = %s
+        """, (value, value, seq, task_id))
+        auto_completed = cursor.lastrowid == 1
+
+        # Our own row version, under the lock the UPDATE took
         cursor.execute(
-            "SELECT subtasks_total, subtasks_completed FROM tasks WHERE id = %s",
+            f"SELECT subtasks_total, subtasks_completed, {TASK_STATS_COLUMNS} FROM tasks WHERE id = %s",
             (task_id,)
         )
         task = cursor.fetchone()
-        
-        if not task:
-            return JsonResponse({"error": "Task not found"}, status=404)
-        
-        cursor.execute(
-            "UPDATE tasks SET subtasks_completed = %s WHERE id = %s",
-            (subtasks_completed, task_id)
-        )
-        
-        # Auto-move to done when complete
-        auto_completed = False
-        if task["subtasks_total"] > 0 and subtasks_completed >= task["subtasks_total"]:
-            cursor.execute(
-                "UPDATE tasks SET status = 'done' WHERE id = %s",
-                (task_id,)
-            )
-            auto_completed = True
-        
+        if auto_completed:
+            # The rollups only tell done from open, so any open status stands for the old one
+            apply_task_change(cursor, {**task, "status": "todo"}, task)
+
         db.commit()
+        completed, total, status = task["subtasks_completed"], task["subtasks_total"], task["status"]
+        bump_data_version(task["user_id"])
+        publish_task_event(
+            task["user_id"], "subtasks", task_id, seq, subtasks_completed=completed, status=status
+        )
         return JsonResponse({
             "message": "Subtask incremented successfully",
-            "auto_completed": auto_completed
+            "auto_completed": auto_completed,
+            "subtasks": {"completed": completed, "total": total},
+            "status": status,
         })
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        logger.exception("increment_subtask failed for task %s", task_id)
         return JsonResponse({"error": str(e)}, status=500)
     finally:
         db.close()
@@ -264,8 +582,21 @@ def delete_task(request):
     cursor = db.cursor()
 
     try:
+        cursor.execute(
+            f"SELECT {TASK_STATS_COLUMNS} FROM tasks WHERE id = %s FOR UPDATE",
+            (task_id,)
+        )
+        before = cursor.fetchone()
+
         cursor.execute("DELETE FROM tasks WHERE id = %s", (task_id,))
+        if before:
+            seq = next_change_seq(cursor, before["user_id"])
+            record_task_deletion(cursor, before["user_id"], task_id, seq)
+        apply_task_change(cursor, before, None)
         db.commit()
+        if before:
+            bump_data_version(before["user_id"])
+            publish_task_event(before["user_id"], "delete", task_id, seq)
         return JsonResponse({"message": "Task deleted successfully"})
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=500)
@@ -286,16 +617,29 @@ def update_task_due_date(request):
     if not task_id or not due_date:
         return JsonResponse({"error": "task_id and due_date required"}, status=400)
 
+    try:
+        due_date = _parse_due_date(due_date)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
     db = get_db()
     cursor = db.cursor()
 
     try:
-        cursor.execute(
-            "UPDATE tasks SET due_date = %s WHERE id = %s",
-            (due_date, task_id)
-        )
+        cursor.execute("SELECT user_id FROM tasks WHERE id = %s", (task_id,))
+        row = cursor.fetchone()
+
+        if row:
+            seq = next_change_seq(cursor, row["user_id"])
+            cursor.execute(
+                "UPDATE tasks SET due_date = %s, change_seq = %s WHERE id = %s",
+                (due_date, seq, task_id)
+            )
         db.commit()
-        return JsonResponse({"message": "Task due date updated successfully"})
+        if row:
+            bump_data_version(row["user_id"])
+            publish_task_event(row["user_id"], "due_date", task_id, seq, due_date=due_date)
+        return JsonResponse({"message": "Task due date updated successfully", "due_date": due_date})
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=500)
     finally:
@@ -314,7 +658,7 @@ def update_priority(request):
     if not task_id or not priority:
         return JsonResponse({"error": "task_id and priority required"}, status=400)
 
-    if priority not in ["High", "Medium", "Low"]:
+    if priority not in PRIORITIES:
         return JsonResponse({"error": "Invalid priority"}, status=400)
 
     db = get_db()
@@ -322,10 +666,22 @@ def update_priority(request):
 
     try:
         cursor.execute(
-            "UPDATE tasks SET priority = %s WHERE id = %s",
-            (priority, task_id)
+            f"SELECT {TASK_STATS_COLUMNS} FROM tasks WHERE id = %s FOR UPDATE",
+            (task_id,)
         )
+        before = cursor.fetchone()
+
+        if before:
+            seq = next_change_seq(cursor, before["user_id"])
+            cursor.execute(
+                "UPDATE tasks SET priority = %s, change_seq = %s WHERE id = %s",
+                (priority, seq, task_id)
+            )
+            apply_task_change(cursor, before, {**before, "priority": priority})
         db.commit()
+        if before:
+            bump_data_version(before["user_id"])
+            publish_task_event(before["user_id"], "priority", task_id, seq, priority=priority)
         return JsonResponse({"message": "Priority updated successfully"})
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=500)
@@ -333,7 +689,170 @@ def update_priority(request):
         db.close()
 
 
+BATCH_MAX_OPS = 500
+
+
+def _parse_batch_op(op):
+    """Validate one /tasks/batch/ operation; returns (op, task_id, values) or raises ValueError"""
+    if not isinstance(op, dict):
+        raise ValueError("operation must be an object")
+    kind = op.get("op")
+    try:
+        task_id = int(op.get("task_id"))
+    except (TypeError, ValueError):
+        raise ValueError("task_id must be an integer")
+
+    if kind == "update-status":
+        if op.get("status") not in BOARD_STATUSES:
+            raise ValueError(f"status must be among {', '.join(BOARD_STATUSES)}")
+        return kind, task_id, {"status": op["status"]}
+    if kind == "update-priority":
+        if op.get("priority") not in PRIORITIES:
+            raise ValueError("Invalid priority")
+        return kind, task_id, {"priority": op["priority"]}
+    if kind == "update-due-date":
+        due_date = _parse_due_date(op.get("due_date"))
+        if due_date is None:
+            raise ValueError("due_date required")
+        return kind, task_id, {"due_date": due_date}
+    if kind in ("archive", "delete"):
+        return kind, task_id, {}
+    raise ValueError("op must be update-status, update-priority, update-due-date, archive or delete")
+
+
 @csrf_exempt
+def batch_tasks(request):
+    """
+    Apply an ordered list of task operations in one transaction.
+
+    Body: {"operations": [{"op": "update-status", "task_id": 1, "status": "done"}, ...]}
+    with op one of update-status, update-priority, update-due-date, archive
+    or delete. Everything is validated before anything runs (400 lists the
+    bad operations). An operation on a missing or already deleted task fails
+    on its own; results come back in request order.
+    """
+    if request.method != "POST":
+        return JsonResponse({"error": "POST only"}, status=400)
+
+    try:
+        operations = json.loads(request.body).get("operations")
+    except (ValueError, AttributeError):
+        return JsonResponse({"error": "Invalid JSON"}, status=400)
+    if not isinstance(operations, list) or not operations:
+        return JsonResponse({"error": "operations required"}, status=400)
+    if len(operations) > BATCH_MAX_OPS:
+        return JsonResponse({"error": f"At most {BATCH_MAX_OPS} operations per batch"}, status=400)
+
+    parsed = []
+    errors = []
+    for index, op in enumerate(operations):
+        try:
+            parsed.append(_parse_batch_op(op))
+        except ValueError as e:
+            errors.append({"index": index, "error": str(e)})
+    if errors:
+        return JsonResponse({"error": "Invalid operations", "operations": errors}, status=400)
+
+    task_ids = sorted({task_id for _, task_id, _ in parsed})
+    placeholders = ",".join(["%s"] * len(task_ids))
+
+    db = get_db()
+    cursor = db.cursor()
+
+    try:
+        # OPTIMIZED: One locking read, set-based writes and a single commit
+        cursor.execute(
+            f"SELECT id, previous_status, due_date, {TASK_STATS_COLUMNS} "
+            f"FROM tasks WHERE id IN ({placeholders}) FOR UPDATE",
+            tuple(task_ids)
+        )
+        before = {row["id"]: row for row in cursor.fetchall()}
+
+        # Play the operations against the rows in memory; None marks a deleted task
+        after = {task_id: dict(row) for task_id, row in before.items()}
+        results = []
+        for kind, task_id, values in parsed:
+            task = after.get(task_id)
+            if task is None:
+                results.append({"op": kind, "task_id": str(task_id), "ok": False, "error": "Task not found"})
+                continue
+            if kind == "delete":
+                after[task_id] = None
+            elif kind == "archive":
+                if task["status"] != "archived":
+                    task["previous_status"], task["status"] = task["status"], "archived"
+            else:
+                task.update(values)
+            results.append({"op": kind, "task_id": str(task_id), "ok": True})
+
+        changed = {task_id: row for task_id, row in after.items() if row != before[task_id]}
+        seqs = {}
+        for task_id in changed:
+            user_id = before[task_id]["user_id"]
+            if user_id not in seqs:
+                seqs[user_id] = next_change_seq(cursor, user_id)
+
+        updates = [
+            (row["status"], row["previous_status"], row["priority"], row["due_date"],
+             seqs[row["user_id"]], task_id)
+            for task_id, row in changed.items() if row is not None
+        ]
+        if updates:
+            cursor.executemany("""
+                UPDATE tasks
+                SET status = %s, previous_status = %s, priority = %s, due_date = %s, change_seq = %s
+                WHERE id = %s
+            """, updates)
+
+        deleted = [task_id for task_id, row in changed.items() if row is None]
+        if deleted:
+            cursor.execute(
+                f"DELETE FROM tasks WHERE id IN ({','.join(['%s'] * len(deleted))})",
+                tuple(deleted)
+            )
+            record_task_deletions(cursor, [
+                (task_id, before[task_id]["user_id"], seqs[before[task_id]["user_id"]])
+                for task_id in deleted
+            ])
+
+        # Net effect per task, so rollups see one delta however many ops touched it
+        for task_id, row in changed.items():
+            apply_task_change(cursor, before[task_id], row)
+        db.commit()
+
+        for user_id in seqs:
+            bump_data_version(user_id)
+        for task_id, row in changed.items():
+            user_id = before[task_id]["user_id"]
+            if row is None:
+                publish_task_event(user_id, "delete", task_id, seqs[user_id])
+            else:
+                publish_task_event(
+                    user_id, "update", task_id, seqs[user_id],
+                    status=row["status"], priority=row["priority"], due_date=row["due_date"]
+                )
+
+        return JsonResponse({"results": results, "changed": len(changed)})
+    except Exception as e:
+        db.rollback()
+        return JsonResponse({"error": str(e)}, status=500)
+    finally:
+        db.close()
+
+
+def _to_date(value):
+    """Normalize a DATE column (date object or 'YYYY-MM-DD' string) to a date"""
+    if not value:
+        return None
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    return datetime.datetime.strptime(str(value), "%Y-%m-%d").date()
+
+
+@csrf_exempt
+@etag_by_data_version
 def get_sprints(request):
     user_id = request.GET.get("user_id")
     if not user_id:
@@ -343,10 +862,16 @@ def get_sprints(request):
     cursor = db.cursor()
 
     try:
-        cursor.execute(
-            "SELECT * FROM sprints WHERE user_id = %s ORDER BY id",
-            (user_id,)
-        )
+        # OPTIMIZED: Counts come from the sprint_stats rollup (primary-key join)
+        cursor.execute("""
+            SELECT s.id, s.project_title, s.title, s.start_date, s.end_date,
+                   ss.total_tasks AS task_count,
+                   ss.completed_tasks AS completed_count
+            FROM sprints s
+            LEFT JOIN sprint_stats ss ON ss.sprint_id = s.id
+            WHERE s.user_id = %s
+            ORDER BY s.id
+        """, (user_id,))
         rows = cursor.fetchall()
         
         if not rows:
@@ -361,28 +886,19 @@ def get_sprints(request):
             if not project_title:
                 project_title = row.get("project_title", "My Project")
             
-            sprint_id = row["id"]
-            
-            cursor.execute(
-                "SELECT COUNT(*) as total, SUM(CASE WHEN status='done' THEN 1 ELSE 0 END) as completed FROM tasks WHERE sprint_id = %s",
-                (sprint_id,)
-            )
-            task_stats = cursor.fetchone()
-            
             sprint_data = {
-                "id": sprint_id,
+                "id": row["id"],
                 "title": row["title"],
                 "start_date": row["start_date"],
                 "end_date": row["end_date"],
-                "task_count": task_stats["total"] or 0,
-                "completed_count": task_stats["completed"] or 0
+                "task_count": int(row["task_count"] or 0),
+                "completed_count": int(row["completed_count"] or 0)
             }
             
-            if row["start_date"] and row["end_date"]:
-                start = datetime.datetime.strptime(str(row["start_date"]), "%Y-%m-%d").date()
-                end = datetime.datetime.strptime(str(row["end_date"]), "%Y-%m-%d").date()
-                if start <= today <= end:
-                    current_sprint = sprint_data
+            start = _to_date(row["start_date"])
+            end = _to_date(row["end_date"])
+            if start and end and start <= today <= end:
+                current_sprint = sprint_data
             
             sprints.append(sprint_data)
         
@@ -399,6 +915,14 @@ def get_sprints(request):
 
 @csrf_exempt
 def create_sprints(request):
+    """
+    Save the user's sprint plan as a diff against the stored one.
+
+    Sprints are matched by id, then (entries without one) by title. Matched
+    sprints are only updated when something changed, new ones go in with
+    one multi-row INSERT and sprints left out of the plan are deleted, their
+    tasks going back to the backlog. Ids stay stable across saves.
+    """
     if request.method != "POST":
         return JsonResponse({"error": "POST only"}, status=400)
 
@@ -410,21 +934,97 @@ def create_sprints(request):
     if not user_id or not sprints:
         return JsonResponse({"error": "user_id and sprints required"}, status=400)
 
+    try:
+        plan = [
+            (int(s["id"]) if s.get("id") else None, str(s["title"]).strip(),
+             _to_date(s.get("start_date")), _to_date(s.get("end_date")))
+            for s in sprints
+        ]
+    except (KeyError, TypeError, ValueError):
+        return JsonResponse({"error": "Each sprint needs a title and YYYY-MM-DD dates"}, status=400)
+
     db = get_db()
     cursor = db.cursor()
 
     try:
-        cursor.execute("DELETE FROM sprints WHERE user_id = %s", (user_id,))
-        
-        for sprint in sprints:
-            cursor.execute(
+        cursor.execute(
+            "SELECT id, project_title, title, start_date, end_date FROM sprints WHERE user_id = %s FOR UPDATE",
+            (user_id,)
+        )
+        existing = {row["id"]: row for row in cursor.fetchall()}
+
+        # Match by id first so a renamed sprint is not claimed by its old title
+        matched = []
+        kept = set()
+        for sprint_id, *_ in plan:
+            match = sprint_id if sprint_id in existing and sprint_id not in kept else None
+            matched.append(match)
+            if match:
+                kept.add(match)
+        for i, (_, title, _, _) in enumerate(plan):
+            if matched[i] is None:
+                match = next((sid for sid, row in existing.items() if row["title"] == title and sid not in kept), None)
+                matched[i] = match
+                if match:
+                    kept.add(match)
+
+        updates = []
+        inserts = []
+        renamed = []
+        for match, (_, title, start, end) in zip(matched, plan):
+            if match is None:
+                inserts.append((user_id, project_title, title, start, end))
+                continue
+            row = existing[match]
+            stored = (row["project_title"], row["title"], _to_date(row["start_date"]), _to_date(row["end_date"]))
+            if stored != (project_title, title, start, end):
+                updates.append((project_title, title, start, end, match))
+            if row["title"] != title:
+                renamed.append(match)
+        removed = [sprint_id for sprint_id in existing if sprint_id not in kept]
+
+        if updates:
+            cursor.executemany(
+                "UPDATE sprints SET project_title = %s, title = %s, start_date = %s, end_date = %s WHERE id = %s",
+                updates
+            )
+        if inserts:
+            # pymysql sends this as one multi-row INSERT
+            cursor.executemany(
                 """INSERT INTO sprints (user_id, project_title, title, start_date, end_date)
                    VALUES (%s, %s, %s, %s, %s)""",
-                (user_id, project_title, sprint["title"], sprint["start_date"], sprint["end_date"])
+                inserts
             )
-        
+        if removed:
+            placeholders = ",".join(["%s"] * len(removed))
+            cursor.execute(
+                f"UPDATE tasks SET sprint_id = NULL, change_seq = %s "
+                f"WHERE user_id = %s AND sprint_id IN ({placeholders})",
+                (next_change_seq(cursor, user_id), user_id, *removed)
+            )
+            cursor.execute(f"DELETE FROM sprint_stats WHERE sprint_id IN ({placeholders})", tuple(removed))
+            cursor.execute(f"DELETE FROM sprints WHERE id IN ({placeholders})", tuple(removed))
+        if renamed:
+            _mark_sprint_tasks_changed(cursor, user_id, renamed)
+        if inserts or removed:
+            set_sprint_count(cursor, user_id, len(plan))
+
+        cursor.execute(
+            "SELECT id, title, start_date, end_date FROM sprints WHERE user_id = %s ORDER BY id",
+            (user_id,)
+        )
+        saved = cursor.fetchall()
+
         db.commit()
-        return JsonResponse({"message": "Sprints created successfully"})
+        if updates or inserts or removed:
+            bump_data_version(user_id)
+        return JsonResponse({
+            "message": "Sprints saved successfully",
+            "sprints": saved,
+            "created": len(inserts),
+            "updated": len(updates),
+            "deleted": len(removed),
+        })
     except Exception as e:
         db.rollback()
         return JsonResponse({"error": str(e)}, status=500)
@@ -448,7 +1048,11 @@ def delete_sprints(request):
 
     try:
         cursor.execute("DELETE FROM sprints WHERE user_id = %s", (user_id,))
+        clear_user_stats(cursor, user_id)
+        set_sprint_count(cursor, user_id, 0)
+        _mark_sprint_tasks_changed(cursor, user_id)
         db.commit()
+        bump_data_version(user_id)
         return JsonResponse({"message": "Sprints deleted successfully"})
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=500)
@@ -456,6 +1060,19 @@ def delete_sprints(request):
         db.close()
 
 
+def _mark_sprint_tasks_changed(cursor, user_id, sprint_ids=None):
+    """Tasks in these sprints (default: any sprint) now show a different sprint name"""
+    if sprint_ids is None:
+        sprint_filter, params = "sprint_id IS NOT NULL", ()
+    else:
+        sprint_filter = f"sprint_id IN ({','.join(['%s'] * len(sprint_ids))})"
+        params = tuple(sprint_ids)
+    cursor.execute(
+        f"UPDATE tasks SET change_seq = %s WHERE user_id = %s AND {sprint_filter}",
+        (next_change_seq(cursor, user_id), user_id, *params)
+    )
+
+
 @csrf_exempt
 def assign_task_to_sprint(request):
     if request.method != "POST":
@@ -481,10 +1098,24 @@ def assign_task_to_sprint(request):
                 sprint_name = sprint_row["title"]
         
         cursor.execute(
-            "UPDATE tasks SET sprint_id = %s WHERE id = %s",
-            (sprint_id, task_id)
+            f"SELECT {TASK_STATS_COLUMNS} FROM tasks WHERE id = %s FOR UPDATE",
+            (task_id,)
         )
+        before = cursor.fetchone()
+
+        if before:
+            seq = next_change_seq(cursor, before["user_id"])
+            cursor.execute(
+                "UPDATE tasks SET sprint_id = %s, change_seq = %s WHERE id = %s",
+                (sprint_id, seq, task_id)
+            )
+            apply_task_change(cursor, before, {**before, "sprint_id": sprint_id})
         db.commit()
+        if before:
+            bump_data_version(before["user_id"])
+            publish_task_event(
+                before["user_id"], "sprint", task_id, seq, sprint_id=sprint_id, sprint_name=sprint_name
+            )
         
         return JsonResponse({
             "message": "Task assigned to sprint successfully",
@@ -496,6 +1127,54 @@ def assign_task_to_sprint(request):
         db.close()
 
 
+@staff_member_required
+def db_pool_stats(request):
+    """Connection pool usage for this worker process (for sizing DB_POOL)"""
+    if request.method != "GET":
+        return JsonResponse({"error": "GET only"}, status=405)
+
+    return JsonResponse({"pid": os.getpid(), "pool": pool_stats()})
+
+
+def _may_scrape(request):
+    """Django staff, or a bearer token listed in settings.METRICS_TOKENS"""
+    if request.user.is_active and request.user.is_staff:
+        return True
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    return scheme.lower() == "bearer" and any(
+        hmac.compare_digest(token.encode(), allowed.encode()) for allowed in settings.METRICS_TOKENS
+    )
+
+
+def metrics(request):
+    """Prometheus scrape endpoint for this worker process (staff or an allowed scraper token)"""
+    if request.method != "GET":
+        return JsonResponse({"error": "GET only"}, status=405)
+    if not _may_scrape(request):
+        return JsonResponse({"error": "Forbidden"}, status=403)
+
+    return HttpResponse(render_metrics(pool_stats(), get_integration_client().gauges()), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@staff_member_required
+def slow_queries(request):
+    """Heaviest statement fingerprints in this worker's window (Django staff only)"""
+    try:
+        limit = min(int(request.GET.get("limit", 20)), 200)
+    except ValueError:
+        return JsonResponse({"error": "limit must be an integer"}, status=400)
+    order = request.GET.get("order", "total")
+    if order not in ("total", "p95", "count", "max"):
+        return JsonResponse({"error": "order must be total, p95, count or max"}, status=400)
+
+    log = get_slow_query_log()
+    return JsonResponse({
+        "pid": os.getpid(),
+        "window_seconds": log.window_seconds,
+        "queries": log.top(limit, order),
+    })
+
+
 @csrf_exempt
 def fix_completed_tasks(request):
     """Run this ONCE to move all 100% completed tasks to done column"""
@@ -504,15 +1183,31 @@ def fix_completed_tasks(request):
     
     try:
         cursor.execute("""
-            UPDATE tasks 
-            SET status = 'done' 
+            SELECT id, user_id FROM tasks 
             WHERE subtasks_total > 0 
             AND subtasks_completed >= subtasks_total 
             AND status != 'done'
+            FOR UPDATE
         """)
-        
-        affected = cursor.rowcount
+        by_user = {}
+        for row in cursor.fetchall():
+            by_user.setdefault(row["user_id"], []).append(row["id"])
+
+        # One change_seq per user so delta-sync clients pick the moves up
+        for user_id, task_ids in by_user.items():
+            placeholders = ",".join(["%s"] * len(task_ids))
+            cursor.execute(
+                f"UPDATE tasks SET status = 'done', change_seq = %s WHERE id IN ({placeholders})",
+                (next_change_seq(cursor, user_id), *task_ids)
+            )
+
+        affected = sum(len(task_ids) for task_ids in by_user.values())
+        if affected:
+            rebuild_sprint_stats(cursor)
+            reconcile_user_counters(cursor)
         db.commit()
+        if affected:
+            bump_data_version()
         
         return JsonResponse({
             "message": f"Fixed {affected} completed tasks",
@@ -524,13 +1219,28 @@ def fix_completed_tasks(request):
         db.close()
 
 
+REPORT_DEFAULT_LIMIT = 10
+REPORT_MAX_LIMIT = 500
+
+TASK_TYPE_COLORS = {
+    "Features": "#7c3aed",
+    "Bugs": "#ef4444",
+    "Tech Debt": "#f59e0b",
+    "Research": "#10b981"
+}
+
+
 @csrf_exempt
+@etag_by_data_version
 def get_sprint_report(request):
     """
     Returns aggregated sprint report data for retrospectives:
     - Historical sprint stats (velocity, bugs, tech debt)
     - Current sprint burn-down (simplified)
     - Task type distribution
+
+    Optional params: limit (newest N sprints, default 10) and
+    since (YYYY-MM-DD, only sprints ending on or after that date).
     """
     if request.method != "GET":
         return JsonResponse({"error": "GET only"}, status=405)
@@ -539,18 +1249,37 @@ def get_sprint_report(request):
     if not user_id:
         return JsonResponse({"error": "user_id required"}, status=400)
 
+    try:
+        limit = int(request.GET.get("limit", REPORT_DEFAULT_LIMIT))
+        since = _to_date(request.GET.get("since"))
+    except ValueError:
+        return JsonResponse({"error": "limit must be an integer and since YYYY-MM-DD"}, status=400)
+    limit = max(1, min(limit, REPORT_MAX_LIMIT))
+
     db = get_db()
     cursor = db.cursor()
 
     try:
-        # 1. Get all sprints for this user (newest first)
-        cursor.execute("""
-            SELECT id, title, start_date, end_date 
-            FROM sprints 
-            WHERE user_id = %s 
-            ORDER BY id DESC 
-            LIMIT 10
-        """, (user_id,))
+        # 1 + 2. Newest sprints joined to their sprint_stats rollup rows
+        sprint_filter = "s.user_id = %s"
+        params = [user_id]
+        if since:
+            sprint_filter += " AND s.end_date >= %s"
+            params.append(since)
+        params.append(limit)
+
+        cursor.execute(f"""
+            SELECT
+                s.id, s.title, s.start_date, s.end_date,
+                ss.total_tasks, ss.completed_tasks,
+                ss.high_open_tasks as open_bugs_estimate,
+                ss.tech_debt_items, ss.type_bugs, ss.type_tech_debt, ss.type_research
+            FROM sprints s
+            LEFT JOIN sprint_stats ss ON ss.sprint_id = s.id
+            WHERE {sprint_filter}
+            ORDER BY s.id DESC
+            LIMIT %s
+        """, tuple(params))
         sprints = cursor.fetchall()
 
         if not sprints:
@@ -561,36 +1290,26 @@ def get_sprint_report(request):
                 "summary": {"avg_velocity": 0, "completion_rate": 0, "total_tasks": 0, "bug_ratio": 0}
             })
 
-        sprint_ids = [s["id"] for s in sprints]
-
-        # 2. Get task stats per sprint
+        today = datetime.date.today()
         sprint_stats = []
+        type_counts = {"Features": 0, "Bugs": 0, "Tech Debt": 0, "Research": 0}
         for sprint in sprints:
-            sprint_id = sprint["id"]
-
-            cursor.execute("""
-                SELECT 
-                    COUNT(*) as total_tasks,
-                    SUM(CASE WHEN status = 'done' THEN 1 ELSE 0 END) as completed_tasks,
-                    SUM(CASE WHEN priority = 'High' AND status != 'done' THEN 1 ELSE 0 END) as open_bugs_estimate,
-                    SUM(CASE WHEN title LIKE '%%refactor%%' OR title LIKE '%%tech debt%%' THEN 1 ELSE 0 END) as tech_debt_items
-                FROM tasks 
-                WHERE sprint_id = %s
-            """, (sprint_id,))
-            stats = cursor.fetchone() or {}
-
-            committed = stats["total_tasks"] or 0
-            completed = stats["completed_tasks"] or 0
-            bugs = stats["open_bugs_estimate"] or 0
-            tech_debt = round((stats["tech_debt_items"] or 0) / max(committed, 1) * 100, 1)
-
-            # Check if current sprint
-            is_current = False
-            if sprint["start_date"] and sprint["end_date"]:
-                today = datetime.date.today()
-                start = datetime.datetime.strptime(str(sprint["start_date"]), "%Y-%m-%d").date()
-                end = datetime.datetime.strptime(str(sprint["end_date"]), "%Y-%m-%d").date()
-                is_current = start <= today <= end
+            committed = int(sprint["total_tasks"] or 0)
+            completed = int(sprint["completed_tasks"] or 0)
+            bugs = int(sprint["open_bugs_estimate"] or 0)
+            tech_debt = round(int(sprint["tech_debt_items"] or 0) / max(committed, 1) * 100, 1)
+
+            type_bugs = int(sprint["type_bugs"] or 0)
+            type_tech_debt = int(sprint["type_tech_debt"] or 0)
+            type_research = int(sprint["type_research"] or 0)
+            type_counts["Bugs"] += type_bugs
+            type_counts["Tech Debt"] += type_tech_debt
+            type_counts["Research"] += type_research
+            type_counts["Features"] += committed - type_bugs - type_tech_debt - type_research
+
+            start = _to_date(sprint["start_date"])
+            end = _to_date(sprint["end_date"])
+            is_current = bool(start and end and start <= today <= end)
 
             sprint_stats.append({
                 "name": sprint["title"],
@@ -624,45 +1343,22 @@ def get_sprint_report(request):
                     "remaining": 0
                 })
 
-        # 4. Task type distribution
+        # 4. Task type distribution (accumulated from the same scan)
         task_distribution = []
-        if sprint_ids:
-            placeholders = ','.join(['%s'] * len(sprint_ids))
-            query = f"""
-                SELECT 
-                    CASE 
-                        WHEN title LIKE '%%bug%%' OR title LIKE '%%fix%%' OR title LIKE '%%error%%' THEN 'Bugs'
-                        WHEN title LIKE '%%refactor%%' OR title LIKE '%%tech debt%%' OR title LIKE '%%clean%%' THEN 'Tech Debt'
-                        WHEN title LIKE '%%research%%' OR title LIKE '%%spike%%' THEN 'Research'
-                        ELSE 'Features'
-                    END as type,
-                    COUNT(*) as count
-                FROM tasks
-                WHERE sprint_id IN ({placeholders})
-                GROUP BY type
-            """
-            cursor.execute(query, tuple(sprint_ids))
-            dist_rows = cursor.fetchall()
-
-            if dist_rows:
-                total = sum(r["count"] for r in dist_rows)
-                colors = {
-                    "Features": "#7c3aed",
-                    "Bugs": "#ef4444",
-                    "Tech Debt": "#f59e0b",
-                    "Research": "#10b981"
-                }
-                for row in dist_rows:
+        total = sum(type_counts.values())
+        if total:
+            for name, count in type_counts.items():
+                if count:
                     task_distribution.append({
-                        "name": row["type"],
-                        "value": round((row["count"] / total) * 100),
-                        "color": colors.get(row["type"], "#6b7280")
+                        "name": name,
+                        "value": round((count / total) * 100),
+                        "color": TASK_TYPE_COLORS.get(name, "#6b7280")
                     })
-            else:
-                # Default distribution if no tasks
-                task_distribution = [
-                    {"name": "Features", "value": 100, "color": "#7c3aed"}
-                ]
+        else:
+            # Default distribution if no tasks
+            task_distribution = [
+                {"name": "Features", "value": 100, "color": "#7c3aed"}
+            ]
 
         # 5. Summary stats
         total_committed = sum(s["committed"] for s in sprint_stats)
@@ -693,7 +1389,30 @@ def get_sprint_report(request):
 
 
 
+RECENT_ACTIVITY_LIMIT = 5
+
+SUMMARY_COUNTS_QUERY = """
+    SELECT
+        uc.total_tasks, uc.done_tasks, uc.open_tasks, uc.total_sprints,
+        t.overdue, t.completed_this_week, s.sprints_active
+    FROM (
+        SELECT
+            SUM(CASE WHEN status != 'done' AND due_date < %s THEN 1 ELSE 0 END) as overdue,
+            SUM(CASE WHEN status = 'done' AND due_date >= %s THEN 1 ELSE 0 END) as completed_this_week
+        FROM tasks
+        WHERE user_id = %s AND due_date IS NOT NULL
+    ) t
+    CROSS JOIN (
+        SELECT SUM(CASE WHEN start_date <= %s AND end_date >= %s THEN 1 ELSE 0 END) as sprints_active
+        FROM sprints
+        WHERE user_id = %s
+    ) s
+    LEFT JOIN user_counters uc ON uc.user_id = %s
+"""
+
+
 @csrf_exempt
+@etag_by_data_version
 def get_summary(request):
     """Get dashboard summary stats"""
     if request.method != "GET":
@@ -707,56 +1426,44 @@ def get_summary(request):
     cursor = db.cursor()
 
     try:
-        # Open tasks
-        cursor.execute("SELECT COUNT(*) as count FROM tasks WHERE user_id = %s AND status != 'done'", (user_id,))
-        open_tasks = cursor.fetchone()["count"]
-
-        # Overdue tasks
         today = datetime.date.today()
-        cursor.execute("""
-            SELECT COUNT(*) as count FROM tasks 
-            WHERE user_id = %s AND status != 'done' AND due_date < %s AND due_date != ''
-        """, (user_id, today))
-        overdue = cursor.fetchone()["count"]
+        week_ago = today - datetime.timedelta(days=7)
 
-        # Active sprints
-        cursor.execute("""
-            SELECT COUNT(*) as count FROM sprints 
-            WHERE user_id = %s AND start_date <= %s AND end_date >= %s
-        """, (user_id, today, today))
-        sprints_active = cursor.fetchone()["count"]
+        # OPTIMIZED: Counters from the user_counters row, date-based stats in the same round trip
+        params = (today, week_ago, user_id, today, today, user_id, user_id)
+        cursor.execute(SUMMARY_COUNTS_QUERY, params)
+        counts = cursor.fetchone()
 
-        # Completed this week
-        week_ago = today - datetime.timedelta(days=7)
-        cursor.execute("""
-            SELECT COUNT(*) as count FROM tasks 
-            WHERE user_id = %s AND status = 'done' AND due_date >= %s
-        """, (user_id, week_ago))
-        completed_this_week = cursor.fetchone()["count"]
+        if counts["total_tasks"] is None:
+            # No counters row yet for this user: seed it from the source tables
+            reconcile_user_counters(cursor, user_id)
+            db.commit()
+            cursor.execute(SUMMARY_COUNTS_QUERY, params)
+            counts = cursor.fetchone()
 
-        # Total sprints
-        cursor.execute("SELECT COUNT(*) as count FROM sprints WHERE user_id = %s", (user_id,))
-        total_sprints = cursor.fetchone()["count"]
+        open_tasks = int(counts["open_tasks"] or 0)
+        overdue = int(counts["overdue"] or 0)
+        sprints_active = int(counts["sprints_active"] or 0)
+        completed_this_week = int(counts["completed_this_week"] or 0)
+        total_sprints = int(counts["total_sprints"] or 0)
 
         # Completion rate
-        cursor.execute("SELECT COUNT(*) as total FROM tasks WHERE user_id = %s", (user_id,))
-        total_tasks = cursor.fetchone()["total"]
-        cursor.execute("SELECT COUNT(*) as done FROM tasks WHERE user_id = %s AND status = 'done'", (user_id,))
-        done_tasks = cursor.fetchone()["done"]
+        total_tasks = int(counts["total_tasks"] or 0)
+        done_tasks = int(counts["done_tasks"] or 0)
         completion_rate = round((done_tasks / total_tasks) * 100) if total_tasks > 0 else 0
 
-        # Recent activity (last 10 task changes)
+        # Recent activity (only the rows the dashboard renders)
         cursor.execute("""
-            SELECT id, title, status, priority, due_date 
+            SELECT title, status
             FROM tasks 
             WHERE user_id = %s 
             ORDER BY id DESC 
-            LIMIT 10
-        """, (user_id,))
+            LIMIT %s
+        """, (user_id, RECENT_ACTIVITY_LIMIT))
         recent_tasks = cursor.fetchall()
 
         recent_activity = []
-        for task in recent_tasks[:5]:
+        for task in recent_tasks:
             time_diff = datetime.datetime.now() - datetime.datetime.now()
             days_ago = abs(time_diff.days) if time_diff.days != 0 else 0
             
@@ -817,18 +1524,22 @@ def archive_task(request):
 
     try:
         # Save current status before archiving
-        cursor.execute("SELECT status FROM tasks WHERE id = %s", (task_id,))
+        cursor.execute(f"SELECT {TASK_STATS_COLUMNS} FROM tasks WHERE id = %s FOR UPDATE", (task_id,))
         row = cursor.fetchone()
         if not row:
             return JsonResponse({"error": "Task not found"}, status=404)
 
         current_status = row["status"]
 
+        seq = next_change_seq(cursor, row["user_id"])
         cursor.execute(
-            "UPDATE tasks SET previous_status = %s, status = 'archived' WHERE id = %s",
-            (current_status, task_id)
+            "UPDATE tasks SET previous_status = %s, status = 'archived', change_seq = %s WHERE id = %s",
+            (current_status, seq, task_id)
         )
+        apply_task_change(cursor, row, {**row, "status": "archived"})
         db.commit()
+        bump_data_version(row["user_id"])
+        publish_task_event(row["user_id"], "status", task_id, seq, status="archived")
         return JsonResponse({"message": "Task archived successfully"})
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=500)
@@ -852,18 +1563,25 @@ def unarchive_task(request):
 
     try:
         # Get previous status, fall back to 'todo' if null
-        cursor.execute("SELECT previous_status FROM tasks WHERE id = %s", (task_id,))
+        cursor.execute(
+            f"SELECT previous_status, {TASK_STATS_COLUMNS} FROM tasks WHERE id = %s FOR UPDATE",
+            (task_id,)
+        )
         row = cursor.fetchone()
         if not row:
             return JsonResponse({"error": "Task not found"}, status=404)
 
         restore_status = row["previous_status"] or "todo"
 
+        seq = next_change_seq(cursor, row["user_id"])
         cursor.execute(
-            "UPDATE tasks SET status = %s, previous_status = NULL WHERE id = %s",
-            (restore_status, task_id)
+            "UPDATE tasks SET status = %s, previous_status = NULL, change_seq = %s WHERE id = %s",
+            (restore_status, seq, task_id)
         )
+        apply_task_change(cursor, row, {**row, "status": restore_status})
         db.commit()
+        bump_data_version(row["user_id"])
+        publish_task_event(row["user_id"], "status", task_id, seq, status=restore_status)
         return JsonResponse({
             "message": "Task unarchived successfully",
             "restored_to": restore_status
@@ -877,6 +1595,7 @@ def unarchive_task(request):
 # REPLACE your existing get_archived_tasks in views.py
 
 @csrf_exempt
+@etag_by_data_version
 def get_archived_tasks(request):
     if request.method != "GET":
         return JsonResponse({"error": "GET only"}, status=400)
@@ -904,7 +1623,7 @@ def get_archived_tasks(request):
                 "id": str(t["id"]),
                 "title": t["title"],
                 "priority": t["priority"],
-                "due_date": str(t["due_date"]) if t["due_date"] else "",
+                "due_date": t["due_date"] or "",
                 "sprint_id": t["sprint_id"],
                 "sprint_name": sprint_map.get(t["sprint_id"]),
                 "previous_status": t.get("previous_status") or "todo",
@@ -926,6 +1645,7 @@ def get_archived_tasks(request):
 
 
 @csrf_exempt
+@etag_by_data_version
 def get_pages(request):
     if request.method != "GET":
         return JsonResponse({"error": "GET only"}, status=405)
@@ -949,8 +1669,8 @@ def get_pages(request):
                 "id": row["id"],
                 "title": row["title"],
                 "body": row["body"] or "",
-                "created_at": str(row["created_at"]),
-                "updated_at": str(row["updated_at"]),
+                "created_at": row["created_at"],
+                "updated_at": row["updated_at"],
             })
         return JsonResponse({"pages": pages})
     except Exception as e:
@@ -981,6 +1701,7 @@ def create_page(request):
             (user_id, title, body)
         )
         db.commit()
+        bump_data_version(user_id)
         page_id = cursor.lastrowid
 
         cursor.execute("SELECT id, title, body, created_at, updated_at FROM pages WHERE id = %s", (page_id,))
@@ -992,8 +1713,8 @@ def create_page(request):
                 "id": row["id"],
                 "title": row["title"],
                 "body": row["body"] or "",
-                "created_at": str(row["created_at"]),
-                "updated_at": str(row["updated_at"]),
+                "created_at": row["created_at"],
+                "updated_at": row["updated_at"],
             }
         })
     except Exception as e:
@@ -1019,11 +1740,16 @@ def update_page(request):
     cursor = db.cursor()
 
     try:
+        cursor.execute("SELECT user_id FROM pages WHERE id = %s", (page_id,))
+        row = cursor.fetchone()
+
         cursor.execute(
             "UPDATE pages SET title = %s, body = %s WHERE id = %s",
             (title, body, page_id)
         )
         db.commit()
+        if row:
+            bump_data_version(row["user_id"])
         return JsonResponse({"message": "Page updated"})
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=500)
@@ -1046,8 +1772,13 @@ def delete_page(request):
     cursor = db.cursor()
 
     try:
+        cursor.execute("SELECT user_id FROM pages WHERE id = %s", (page_id,))
+        row = cursor.fetchone()
+
         cursor.execute("DELETE FROM pages WHERE id = %s", (page_id,))
         db.commit()
+        if row:
+            bump_data_version(row["user_id"])
         return JsonResponse({"message": "Page deleted"})
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=500)
@@ -1057,9 +1788,6 @@ def delete_page(request):
 
 # REPLACE your 3 integration views in views.py with these
 
-import urllib.request
-import urllib.error
-
 @csrf_exempt
 def get_integrations(request):
     if request.method != "GET":
@@ -1081,7 +1809,7 @@ def get_integrations(request):
         integrations = {
             row["platform"]: {
                 "repo_url": row["repo_url"],
-                "connected_at": str(row["connected_at"])
+                "connected_at": row["connected_at"]
             }
             for row in rows
         }
@@ -1118,7 +1846,11 @@ def save_integration(request):
             VALUES (%s, %s, %s, %s)
             ON DUPLICATE KEY UPDATE repo_url = %s, access_token = %s, connected_at = CURRENT_TIMESTAMP
         """, (user_id, platform, repo_url, access_token, repo_url, access_token))
+        # Cached repos may belong to the previous token's account
+        clear_integration(cursor, user_id, platform)
+        request_refresh(cursor, user_id, platform)
         db.commit()
+        bump_data_version(user_id)
         return JsonResponse({"message": f"{platform} connected successfully"})
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=500)
@@ -1146,7 +1878,9 @@ def delete_integration(request):
             "DELETE FROM integrations WHERE user_id = %s AND platform = %s",
             (user_id, platform)
         )
+        clear_integration(cursor, user_id, platform)
         db.commit()
+        bump_data_version(user_id)
         return JsonResponse({"message": f"{platform} disconnected"})
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=500)
@@ -1154,52 +1888,20 @@ def delete_integration(request):
         db.close()
 
 
-def _extract_github_repo(url):
-    """Extract owner/repo from GitHub URL"""
-    url = url.rstrip("/")
-    parts = url.replace("https://github.com/", "").replace("http://github.com/", "").split("/")
-    if len(parts) >= 2:
-        return f"{parts[0]}/{parts[1]}"
-    return None
-
-
-def _extract_gitlab_repo(url):
-    """Extract namespace/project from GitLab URL"""
-    url = url.rstrip("/")
-    path = url.replace("https://gitlab.com/", "").replace("http://gitlab.com/", "")
-    return path if path else None
-
-
-def _extract_bitbucket_repo(url):
-    """Extract workspace/repo from Bitbucket URL"""
-    url = url.rstrip("/")
-    parts = url.replace("https://bitbucket.org/", "").replace("http://bitbucket.org/", "").split("/")
-    if len(parts) >= 2:
-        return parts[0], parts[1]
-    return None, None
-
-
-def _fetch_json(url, headers=None):
-    """Simple HTTP GET returning parsed JSON"""
-    req = urllib.request.Request(url, headers=headers or {})
-    try:
-        with urllib.request.urlopen(req, timeout=8) as resp:
-            return json.loads(resp.read().decode())
-    except urllib.error.HTTPError as e:
-        raise Exception(f"HTTP {e.code}: {e.reason}")
-    except Exception as e:
-        raise Exception(str(e))
-
-
 @csrf_exempt
 def get_repo_data(request):
-    """Fetch live repo data (commits, PRs, branches, stats) for a specific repo URL"""
+    """
+    Repo panel data (commits, PRs, branches, stats) for a repo URL, from
+    the sync worker's cache. "sync" tells how old it is; a missing or
+    stale snapshot is queued for refresh ("data" is null until the first
+    one lands).
+    """
     if request.method != "GET":
         return JsonResponse({"error": "GET only"}, status=405)
 
     user_id = request.GET.get("user_id")
     platform = request.GET.get("platform")
-    repo_url = request.GET.get("repo_url")  # NEW: accept repo URL as param
+    repo_url = request.GET.get("repo_url")
 
     if not user_id or not platform or not repo_url:
         return JsonResponse({"error": "user_id, platform and repo_url required"}, status=400)
@@ -1212,27 +1914,14 @@ def get_repo_data(request):
             "SELECT access_token FROM integrations WHERE user_id = %s AND platform = %s",
             (user_id, platform)
         )
-        row = cursor.fetchone()
-        if not row:
+        if not cursor.fetchone():
             return JsonResponse({"error": "Integration not found"}, status=404)
 
-        token = row["access_token"] or ""
-        result = {}
-
-        # Rest of the code remains the same, but uses repo_url param
-        # instead of reading from integrations table
-        
-        if platform == "github":
-            repo = _extract_github_repo(repo_url)
-            # ... rest of GitHub logic
-        
-        # ... GitLab and Bitbucket logic
-
-        return JsonResponse({"data": result})
-
+        # OPTIMIZED: Served from repo_cache; the API calls happen in `manage.py sync_repos`
+        data, sync = read_cached(cursor, user_id, platform, repo_url)
+        db.commit()
+        return JsonResponse({"data": data, "sync": sync})
     except Exception as e:
-        import traceback
-        traceback.print_exc()
         return JsonResponse({"error": str(e)}, status=500)
     finally:
         db.close()
@@ -1240,7 +1929,11 @@ def get_repo_data(request):
 
 @csrf_exempt
 def get_all_repos(request):
-    """Fetch all repositories for a connected platform"""
+    """
+    All repositories for a connected platform, from the sync worker's
+    cache (see get_repo_data). "complete" is false when the last sync
+    had to drop pages.
+    """
     if request.method != "GET":
         return JsonResponse({"error": "GET only"}, status=405)
 
@@ -1262,77 +1955,44 @@ def get_all_repos(request):
         if not row or not row["access_token"]:
             return JsonResponse({"error": "Integration not found or no token"}, status=404)
 
-        token = row["access_token"]
-        repos = []
+        repos, sync = read_cached(cursor, user_id, platform)
+        db.commit()
+        return JsonResponse({"repos": repos or [], "complete": sync["complete"], "sync": sync})
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=500)
+    finally:
+        db.close()
 
-        if platform == "github":
-            headers = {
-                "Accept": "application/vnd.github+json",
-                "User-Agent": "BrainMint",
-                "Authorization": f"Bearer {token}"
-            }
-            
-            # Get user's repos
-            user_repos = _fetch_json("https://api.github.com/user/repos?per_page=100&sort=updated", headers)
-            
-            for repo in user_repos:
-                repos.append({
-                    "name": repo["full_name"],
-                    "url": repo["html_url"],
-                    "description": repo.get("description", ""),
-                    "stars": repo.get("stargazers_count", 0),
-                    "language": repo.get("language", ""),
-                    "updated_at": repo["updated_at"][:10],
-                    "is_private": repo.get("private", False)
-                })
 
-        elif platform == "gitlab":
-            headers = {
-                "User-Agent": "BrainMint",
-                "PRIVATE-TOKEN": token
-            }
-            
-            projects = _fetch_json("https://gitlab.com/api/v4/projects?membership=true&per_page=100&order_by=updated_at", headers)
-            
-            for proj in projects:
-                repos.append({
-                    "name": proj["path_with_namespace"],
-                    "url": proj["web_url"],
-                    "description": proj.get("description", ""),
-                    "stars": proj.get("star_count", 0),
-                    "language": "",
-                    "updated_at": proj["last_activity_at"][:10],
-                    "is_private": proj.get("visibility") != "public"
-                })
+@csrf_exempt
+def refresh_integration(request):
+    """Queue a refresh of a platform's repo listing, or of one repo with repo_url"""
+    if request.method != "POST":
+        return JsonResponse({"error": "POST only"}, status=400)
 
-        elif platform == "bitbucket":
-            # Bitbucket requires username:app_password format
-            import base64
-            encoded_token = base64.b64encode(token.encode()).decode()
-            headers = {
-                "User-Agent": "BrainMint",
-                "Authorization": f"Basic {encoded_token}"
-            }
-            
-            # Get workspace from first repo or use default
-            data = _fetch_json("https://api.bitbucket.org/2.0/repositories?role=member&pagelen=100", headers)
-            
-            for repo in data.get("values", []):
-                repos.append({
-                    "name": repo["full_name"],
-                    "url": repo["links"]["html"]["href"],
-                    "description": repo.get("description", ""),
-                    "stars": 0,
-                    "language": repo.get("language", ""),
-                    "updated_at": repo["updated_on"][:10],
-                    "is_private": repo.get("is_private", False)
-                })
+    data = json.loads(request.body)
+    user_id = data.get("user_id")
+    platform = data.get("platform")
+    repo_url = data.get("repo_url") or LISTING
+
+    if not user_id or not platform:
+        return JsonResponse({"error": "user_id and platform required"}, status=400)
+
+    db = get_db()
+    cursor = db.cursor()
 
-        return JsonResponse({"repos": repos})
+    try:
+        cursor.execute(
+            "SELECT 1 FROM integrations WHERE user_id = %s AND platform = %s",
+            (user_id, platform)
+        )
+        if not cursor.fetchone():
+            return JsonResponse({"error": "Integration not found"}, status=404)
 
+        request_refresh(cursor, user_id, platform, repo_url)
+        db.commit()
+        return JsonResponse({"message": "Refresh queued"}, status=202)
     except Exception as e:
-        import traceback
-        traceback.print_exc()
         return JsonResponse({"error": str(e)}, status=500)
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
@@ -0,0 +1,237 @@
+"""
+Synthetic data and a scripted request mix for the engine endpoints, used
+by the query-plan check and the benchmarks. Requests are resolved through
+engine/urls.py names so they exercise the same views the dashboard calls.
+"""
+import datetime
+import json
+import random
+import uuid
+
+from django.test import RequestFactory
+from django.urls import NoReverseMatch, resolve, reverse
+
+from . import views
+from .stats import rebuild_sprint_stats, reconcile_user_counters
+
+STATUSES = ["todo", "progress", "review", "done"]
+PRIORITIES = ["High", "Medium", "Low"]
+TITLE_WORDS = ["Fix", "Refactor", "Build", "Research", "Design", "Clean up", "Ship", "Test"]
+TITLE_NOUNS = ["login bug", "sprint board", "tech debt", "API client", "calendar", "reports", "spike"]
+
+_factory = RequestFactory()
+
+
+def seed_user(cursor, tasks=200, sprints=10, pages=5, integrations=True, rng=random):
+    """Insert one synthetic user with related rows; returns the new ids"""
+    email = f"seed-{uuid.uuid4().hex[:12]}@example.com"
+    cursor.execute(
+        "INSERT INTO users (full_name, email, password) VALUES (%s, %s, %s)",
+        ("Seed User", email, "0" * 64)
+    )
+    user_id = cursor.lastrowid
+
+    today = datetime.date.today()
+    first_start = today - datetime.timedelta(days=14 * (sprints - 1))
+    cursor.executemany(
+        """INSERT INTO sprints (user_id, project_title, title, start_date, end_date)
+           VALUES (%s, %s, %s, %s, %s)""",
+        [
+            (user_id, "Seed Project", f"Sprint {i + 1}",
+             first_start + datetime.timedelta(days=14 * i),
+             first_start + datetime.timedelta(days=14 * i + 13))
+            for i in range(sprints)
+        ]
+    )
+    cursor.execute("SELECT id FROM sprints WHERE user_id = %s ORDER BY id", (user_id,))
+    sprint_ids = [row["id"] for row in cursor.fetchall()]
+
+    task_rows = []
+    for i in range(tasks):
+        total = rng.randint(0, 5)
+        task_rows.append((
+            user_id,
+            f"{rng.choice(TITLE_WORDS)} {rng.choice(TITLE_NOUNS)} #{i}",
+            rng.choice(PRIORITIES),
+            rng.choice(STATUSES),
+            str(today + datetime.timedelta(days=rng.randint(-60, 60))),
+            total,
+            rng.randint(0, total),
+            rng.choice(sprint_ids + [None]) if sprint_ids else None,
+        ))
+    for offset in range(0, len(task_rows), 1000):
+        cursor.executemany(
+            """INSERT INTO tasks
+               (user_id, title, priority, status, due_date, subtasks_total, subtasks_completed, sprint_id)
+               VALUES (%s, %s, %s, %s, %s, %s, %s, %s)""",
+            task_rows[offset:offset + 1000]
+        )
+    cursor.execute("SELECT id FROM tasks WHERE user_id = %s ORDER BY id", (user_id,))
+    task_ids = [row["id"] for row in cursor.fetchall()]
+
+    cursor.executemany(
+        "INSERT INTO pages (user_id, title, body) VALUES (%s, %s, %s)",
+        [(user_id, f"Page {i + 1}", "Seed page body " * 20) for i in range(pages)]
+    )
+    cursor.execute("SELECT id FROM pages WHERE user_id = %s ORDER BY id", (user_id,))
+    page_ids = [row["id"] for row in cursor.fetchall()]
+
+    if integrations:
+        cursor.execute(
+            """INSERT INTO integrations (user_id, platform, repo_url, access_token)
+               VALUES (%s, 'github', 'https://github.com/brainmint/seed', 'seed-token')""",
+            (user_id,)
+        )
+
+    rebuild_sprint_stats(cursor, user_id)
+    reconcile_user_counters(cursor, user_id)
+
+    return {
+        "user_id": user_id,
+        "email": email,
+        "sprint_ids": sprint_ids,
+        "task_ids": task_ids,
+        "page_ids": page_ids,
+    }
+
+
+def delete_users(cursor, user_ids):
+    """Remove seeded users and every row they own"""
+    if not user_ids:
+        return
+    placeholders = ",".join(["%s"] * len(user_ids))
+    for table in ("tasks", "task_tombstones", "sprint_stats", "sprints", "pages", "integrations", "repo_cache", "user_counters"):
+        cursor.execute(f"DELETE FROM {table} WHERE user_id IN ({placeholders})", tuple(user_ids))
+    cursor.execute(f"DELETE FROM users WHERE id IN ({placeholders})", tuple(user_ids))
+
+
+def dashboard_reads(seed):
+    """GET requests the dashboard pages issue on load"""
+    user = {"user_id": seed["user_id"]}
+    return [
+        ("get_tasks", "GET", user),
+        ("get_tasks", "GET", {**user, "status": "todo", "limit": 50, "priority": "High"}),
+        ("get_tasks_in_range", "GET", {
+            **user,
+            "from": str(datetime.date.today().replace(day=1)),
+            "to": str(datetime.date.today().replace(day=1) + datetime.timedelta(days=41)),
+        }),
+        ("get_task_changes", "GET", {**user, "since": 0}),
+        ("get_sprints", "GET", user),
+        ("sprint_report", "GET", user),
+        ("summary", "GET", user),
+        ("get_archived_tasks", "GET", user),
+        ("get_pages", "GET", user),
+        ("get_integrations", "GET", user),
+        ("get_all_repos", "GET", {**user, "platform": "github"}),
+        ("get_repo_data", "GET", {**user, "platform": "github", "repo_url": "https://github.com/brainmint/seed"}),
+    ]
+
+
+def page_loads(seed):
+    """Requests each dashboard page issues when it opens (from the .jsx fetch calls)"""
+    user = {"user_id": seed["user_id"]}
+    return {
+        "app": [("get_tasks", "GET", user), ("get_sprints", "GET", user)],  # AppContext / Dashboard
+        "board": [("get_tasks", "GET", user)],
+        "backlog": [("get_tasks", "GET", user), ("get_sprints", "GET", user)],
+        "calendar": [("get_tasks", "GET", user), ("get_sprints", "GET", user)],
+        "report": [("sprint_report", "GET", user), ("get_tasks", "GET", user)],
+        "summary": [("summary", "GET", user)],
+        "archived": [("get_archived_tasks", "GET", user)],
+        "pages": [("get_pages", "GET", user)],
+        "code": [("get_integrations", "GET", user), ("get_all_repos", "GET", {**user, "platform": "github"})],
+        "sync": [("get_task_changes", "GET", {**user, "since": 0})],
+    }
+
+
+# Share of benchmark sessions per page load, plus "write" for one mutation
+WORKLOAD_WEIGHTS = {
+    "app": 20, "board": 10, "backlog": 8, "calendar": 6, "report": 4, "summary": 8,
+    "archived": 2, "pages": 5, "code": 2, "sync": 20, "write": 15,
+}
+
+
+def workload_session(seed, rng=random):
+    """One weighted pick from WORKLOAD_WEIGHTS as a list of requests"""
+    kind = rng.choices(list(WORKLOAD_WEIGHTS), weights=list(WORKLOAD_WEIGHTS.values()))[0]
+    if kind == "write":
+        writes = [w for w in dashboard_writes(seed) if w[0] not in ("delete_task", "login")]
+        return kind, [rng.choice(writes)]
+    return kind, page_loads(seed)[kind]
+
+
+def dashboard_writes(seed):
+    """POST requests covering every mutation endpoint, safe to replay on seeded data"""
+    user_id = seed["user_id"]
+    task_id = seed["task_ids"][0]
+    other_task = seed["task_ids"][-1]
+    sprint_id = seed["sprint_ids"][-1] if seed["sprint_ids"] else None
+    page_id = seed["page_ids"][0]
+    return [
+        ("update_task_status", "POST", {"task_id": task_id, "status": "review"}),
+        ("increment_subtask", "POST", {"task_id": task_id, "subtasks_completed": 1}),
+        ("increment_subtask", "POST", {"task_id": task_id, "delta": 1}),
+        ("update_priority", "POST", {"task_id": task_id, "priority": "High"}),
+        ("update_task_due_date", "POST", {"task_id": task_id, "due_date": str(datetime.date.today())}),
+        ("assign_task_to_sprint", "POST", {"task_id": task_id, "sprint_id": sprint_id}),
+        ("archive_task", "POST", {"task_id": task_id}),
+        ("unarchive_task", "POST", {"task_id": task_id}),
+        ("batch_tasks", "POST", {"operations": [
+            {"op": "update-status", "task_id": task_id, "status": "progress"},
+            {"op": "update-priority", "task_id": task_id, "priority": "Low"},
+            {"op": "update-due-date", "task_id": task_id, "due_date": str(datetime.date.today())},
+        ]}),
+        ("create_task", "POST", {"user_id": user_id, "title": "Workload task", "sprint_id": sprint_id}),
+        ("delete_task", "POST", {"task_id": other_task}),
+        ("create_page", "POST", {"user_id": user_id, "title": "Workload page"}),
+        ("update_page", "POST", {"page_id": page_id, "title": "Workload page", "body": "updated"}),
+        ("login", "POST", {"email": seed["email"], "password": "wrong"}),
+    ]
+
+
+def signup_email(seed):
+    """The address maintenance_writes signs up with; the caller deletes that user"""
+    return f"signup-{seed['email']}"
+
+
+def maintenance_writes(seed):
+    """
+    The endpoints the benchmark mix leaves out: sprint plans, account and
+    integration setup, deletes, and the unrouted fix_completed_tasks.
+    They replace or drop the seed's rows, so run them last, once.
+    """
+    user = {"user_id": seed["user_id"]}
+    today = datetime.date.today()
+    plan = [
+        {"id": sprint_id, "title": f"Sprint {i + 1}", "start_date": str(today + datetime.timedelta(days=14 * i)),
+         "end_date": str(today + datetime.timedelta(days=14 * i + 13))}
+        for i, sprint_id in enumerate(seed["sprint_ids"][:2] + [None])
+    ]
+    return [
+        ("create_sprints", "POST", {**user, "project_title": "Seed Project", "sprints": plan}),
+        ("refresh_integration", "POST", {**user, "platform": "github"}),
+        ("refresh_integration", "POST", {**user, "platform": "github", "repo_url": "https://github.com/brainmint/seed"}),
+        ("save_integration", "POST", {
+            **user, "platform": "github", "repo_url": "https://github.com/brainmint/seed", "access_token": "seed-token-2",
+        }),
+        ("delete_page", "POST", {"page_id": seed["page_ids"][-1]}),
+        ("fix_completed_tasks", "POST", {}),
+        ("delete_sprints", "POST", user),
+        ("delete_integration", "POST", {**user, "platform": "github"}),
+        ("signup", "POST", {"name": "Seed User", "email": signup_email(seed), "password": "seed"}),
+    ]
+
+
+def call_view(name, method, params):
+    """Run the view behind a URL name (or an unrouted engine view) in-process and return the response"""
+    try:
+        path = reverse(name)
+        view = resolve(path).func
+    except NoReverseMatch:
+        path, view = f"/{name}/", getattr(views, name)
+    if method == "GET":
+        request = _factory.get(path, params)
+    else:
+        request = _factory.post(path, json.dumps(params), content_type="application/json")
+    return view(request)
@@ -23,6 +23,7 @@ import {
   Tooltip,
   ResponsiveContainer,
 } from "recharts";
+import { fetchBoard } from "./boardApi";
 
 const API_BASE_URL = "http://localhost:8000/api";
 
@@ -72,9 +73,8 @@ export default function ActiveSprints({ user }) {
       setCurrentSprint(sprintData.current_sprint || null);
 
       // 2. Load all tasks to calculate backlog
-      const tasksRes = await fetch(`${API_BASE_URL}/tasks/?user_id=${user.id}`);
-      if (tasksRes.ok) {
-        const tasksData = await tasksRes.json();
+      const tasksData = await fetchBoard(API_BASE_URL, user.id).catch(() => null);
+      if (tasksData) {
 
         const allTasks = [
           ...(tasksData.todo || []),
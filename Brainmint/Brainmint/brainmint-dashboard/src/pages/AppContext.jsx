@@ -1,4 +1,5 @@
-import React, { createContext, useContext, useState, useEffect, useCallback } from "react";
+import React, { createContext, useContext, useState, useEffect, useCallback, useRef } from "react";
+import { fetchBoard } from "./boardApi";
 
 const API_BASE_URL = "http://localhost:8000/api";
 
@@ -13,25 +14,26 @@ export function AppProvider({ user, children }) {
   const [projectTitle, setProjectTitle] = useState("");
   const [isLoading, setIsLoading] = useState(true);
   const [error, setError] = useState(null);
+  // Board version the task state reflects, for /tasks/changes/
+  const syncVersion = useRef(null);
 
   // Single fetch for everything
   const refreshData = useCallback(async () => {
     if (!user?.id) return;
     try {
       setError(null);
-      const [tasksRes, sprintsRes] = await Promise.all([
-        fetch(`${API_BASE_URL}/tasks/?user_id=${user.id}`),
+      const [tasksData, sprintsRes] = await Promise.all([
+        fetchBoard(API_BASE_URL, user.id),
         fetch(`${API_BASE_URL}/sprints/?user_id=${user.id}`).catch(() => null)
       ]);
 
-      if (!tasksRes.ok) throw new Error("Failed to fetch tasks");
-      const tasksData = await tasksRes.json();
       setTasks({
         todo: tasksData.todo || [],
         progress: tasksData.progress || [],
         review: tasksData.review || [],
         done: tasksData.done || [],
       });
+      syncVersion.current = tasksData.sync_version ?? null;
 
       if (sprintsRes?.ok) {
         const sprintsData = await sprintsRes.json();
@@ -51,6 +53,48 @@ export function AppProvider({ user, children }) {
     refreshData();
   }, [refreshData]);
 
+  // Apply only the tasks changed since the last sync instead of reloading the board
+  const syncTasks = useCallback(async () => {
+    if (!user?.id) return;
+    if (syncVersion.current === null) return refreshData();
+    try {
+      const res = await fetch(`${API_BASE_URL}/tasks/changes/?user_id=${user.id}&since=${syncVersion.current}`);
+      if (!res.ok) throw new Error("Failed to sync tasks");
+      const data = await res.json();
+      if (data.full_resync) return refreshData();
+      syncVersion.current = data.version;
+      if (!data.changed.length && !data.deleted.length) return;
+
+      const stale = new Set([...data.deleted, ...data.changed.map(t => t.id)]);
+      setTasks(prev => {
+        const next = {};
+        for (const [status, list] of Object.entries(prev)) {
+          next[status] = list.filter(t => !stale.has(t.id));
+        }
+        // Archived tasks fall out of the board here
+        for (const { status, ...task } of data.changed) {
+          if (next[status]) next[status].push(task);
+        }
+        for (const list of Object.values(next)) list.sort((a, b) => Number(a.id) - Number(b.id));
+        return next;
+      });
+    } catch (err) {
+      setError(err.message);
+    }
+  }, [user?.id, refreshData]);
+
+  // Changes made in other tabs (or by teammates) arrive as server-sent events
+  useEffect(() => {
+    if (!user?.id || typeof EventSource === "undefined") return;
+    const source = new EventSource(`${API_BASE_URL}/tasks/events/?user_id=${user.id}`);
+    source.addEventListener("task", (e) => {
+      const event = JSON.parse(e.data);
+      if (syncVersion.current === null || event.version > syncVersion.current) syncTasks();
+    });
+    source.addEventListener("resync", () => refreshData());
+    return () => source.close();
+  }, [user?.id, syncTasks, refreshData]);
+
   // All API mutations live here — components just call these
   const api = {
     async createTask(taskData) {
@@ -59,7 +103,7 @@ export function AppProvider({ user, children }) {
         body: JSON.stringify(taskData),
       });
       if (!res.ok) { const e = await res.json().catch(() => ({})); throw new Error(e.error || "Failed to create task"); }
-      await refreshData();
+      await syncTasks();
     },
 
     async updateTaskStatus(taskId, newStatus) {
@@ -68,16 +112,16 @@ export function AppProvider({ user, children }) {
         body: JSON.stringify({ task_id: taskId, status: newStatus }),
       });
       if (!res.ok) throw new Error("Failed to update status");
-      await refreshData();
+      await syncTasks();
     },
 
-    async incrementSubtask(taskId, currentCompleted, currentTotal) {
+    async incrementSubtask(taskId) {
       const res = await fetch(`${API_BASE_URL}/tasks/increment-subtask/`, {
         method: "POST", headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ task_id: taskId, subtasks_completed: Math.min(currentCompleted + 1, currentTotal) }),
+        body: JSON.stringify({ task_id: taskId, delta: 1 }),
       });
       if (!res.ok) throw new Error("Failed to increment subtask");
-      await refreshData();
+      await syncTasks();
     },
 
     async deleteTask(taskId) {
@@ -86,7 +130,7 @@ export function AppProvider({ user, children }) {
         body: JSON.stringify({ task_id: taskId }),
       });
       if (!res.ok) throw new Error("Failed to delete task");
-      await refreshData();
+      await syncTasks();
     },
 
     async updatePriority(taskId, priority) {
@@ -95,7 +139,7 @@ export function AppProvider({ user, children }) {
         body: JSON.stringify({ task_id: taskId, priority }),
       });
       if (!res.ok) throw new Error("Failed to update priority");
-      await refreshData();
+      await syncTasks();
     },
 
     async assignTaskToSprint(taskId, sprintId) {
@@ -104,7 +148,19 @@ export function AppProvider({ user, children }) {
         body: JSON.stringify({ task_id: taskId, sprint_id: sprintId }),
       });
       if (!res.ok) throw new Error("Failed to assign sprint");
-      await refreshData();
+      await syncTasks();
+    },
+
+    // operations: [{ op: "update-status", task_id, status }, ...] — one request, one commit
+    async batchTasks(operations) {
+      const res = await fetch(`${API_BASE_URL}/tasks/batch/`, {
+        method: "POST", headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ operations }),
+      });
+      if (!res.ok) { const e = await res.json().catch(() => ({})); throw new Error(e.error || "Failed to update tasks"); }
+      const data = await res.json();
+      await syncTasks();
+      return data.results;
     },
 
     async createSprints(userId, projectTitle, sprintList) {
@@ -144,6 +200,7 @@ export function AppProvider({ user, children }) {
       isLoading,
       error,
       refreshData,
+      syncTasks,
       api,
       user,
     }}>
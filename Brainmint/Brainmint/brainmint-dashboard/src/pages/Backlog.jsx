@@ -4,6 +4,7 @@ import {
   ArrowUp, ArrowDown, Trash2, Tag,
   CheckCircle2, Loader2, PlayCircle, X, Archive
 } from "lucide-react";
+import { fetchBoard } from "./boardApi";
 
 const API_BASE_URL = "http://localhost:8000/api";
 
@@ -175,13 +176,12 @@ export default function Backlog({ user }) {
   const loadAll = async () => {
     setIsLoading(true);
     try {
-      const [tasksRes, sprintsRes] = await Promise.all([
-        fetch(`${API_BASE_URL}/tasks/?user_id=${user.id}`),
+      const [data, sprintsRes] = await Promise.all([
+        fetchBoard(API_BASE_URL, user.id).catch(() => null),
         fetch(`${API_BASE_URL}/sprints/?user_id=${user.id}`).catch(() => ({ ok: false }))
       ]);
 
-      if (tasksRes.ok) {
-        const data = await tasksRes.json();
+      if (data) {
         const allTasks = [
           ...data.todo.map(t => ({ ...t, status: "todo" })),
           ...data.progress.map(t => ({ ...t, status: "progress" })),
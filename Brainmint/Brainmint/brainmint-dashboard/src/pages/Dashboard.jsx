@@ -4,15 +4,14 @@ import {
   X, ChevronDown, List, Filter, ArrowUp, ArrowDown, Minus,
   CheckCircle2, CheckSquare, LogOut, Loader2, Trash2, Tag
 } from "lucide-react";
+import { fetchBoard } from "./boardApi";
 
 const API_BASE_URL = "http://localhost:8000/api";
 
 // --- API Helper Functions ---
 const api = {
-  async getTasks(userId) {
-    const response = await fetch(`${API_BASE_URL}/tasks/?user_id=${userId}`);
-    if (!response.ok) throw new Error("Failed to fetch tasks");
-    return response.json();
+  getTasks(userId) {
+    return fetchBoard(API_BASE_URL, userId);
   },
 
   async getSprints(userId) {
@@ -44,14 +43,12 @@ const api = {
     return response.json();
   },
 
-  async incrementSubtask(taskId, currentCompleted, currentTotal) {
+  async incrementSubtask(taskId) {
     const response = await fetch(`${API_BASE_URL}/tasks/increment-subtask/`, {
       method: "POST",
       headers: { "Content-Type": "application/json" },
-      body: JSON.stringify({ 
-        task_id: taskId, 
-        subtasks_completed: Math.min(currentCompleted + 1, currentTotal)
-      }),
+      // Relative, so clicks from other tabs are not overwritten; the server caps at the total
+      body: JSON.stringify({ task_id: taskId, delta: 1 }),
     });
     if (!response.ok) throw new Error("Failed to increment subtask");
     return response.json();
@@ -903,10 +900,8 @@ export default function Dashboard({ user, onLogout }) {
     
     // BACKGROUND UPDATE
     try {
-      await api.incrementSubtask(taskId, currentTask.subtasks.completed, currentTask.subtasks.total);
-      if (willComplete) {
-        await api.updateTaskStatus(taskId, "done");
-      }
+      // The server moves the task to done itself once every subtask is complete
+      await api.incrementSubtask(taskId);
     } catch {
       alert("Failed to update. Reloading...");
       loadAll();
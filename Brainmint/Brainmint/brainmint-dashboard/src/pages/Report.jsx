@@ -8,6 +8,7 @@ import {
   ArrowUpRight, ArrowDownRight, Download, Filter, ChevronDown, Clock,
   Inbox, ChevronUp, Search, Calendar, Flag
 } from "lucide-react";
+import { fetchBoard } from "./boardApi";
 
 const API_BASE_URL = "http://localhost:8000/api";
 
@@ -361,15 +362,14 @@ export default function SprintReportDashboard({ user }) {
       setLoading(true);
       setError(null);
       try {
-        const [reportRes, tasksRes] = await Promise.all([
+        const [reportRes, tasksData] = await Promise.all([
           fetch(`${API_BASE_URL}/sprint-report/?user_id=${userId}`),
-          fetch(`${API_BASE_URL}/tasks/?user_id=${userId}`),
+          fetchBoard(API_BASE_URL, userId).catch(() => null),
         ]);
         if (!reportRes.ok) throw new Error((await reportRes.json()).error || "Failed to load sprint report");
-        if (!tasksRes.ok)  throw new Error("Failed to load tasks");
+        if (!tasksData)    throw new Error("Failed to load tasks");
 
         const reportData = await reportRes.json();
-        const tasksData  = await tasksRes.json();
 
         setReport(reportData);
 
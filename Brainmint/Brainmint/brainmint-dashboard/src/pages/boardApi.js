@@ -0,0 +1,27 @@
+const STATUSES = ["todo", "progress", "review", "done"];
+const PAGE_SIZE = 500;
+
+// Load every column of the board, following next_cursor page by page
+export async function fetchBoard(apiBase, userId) {
+  const board = { todo: [], progress: [], review: [], done: [] };
+  let query = "";
+  let syncVersion = null;
+
+  for (;;) {
+    const res = await fetch(`${apiBase}/tasks/?user_id=${userId}&limit=${PAGE_SIZE}${query}`);
+    if (!res.ok) throw new Error("Failed to fetch tasks");
+    const page = await res.json();
+
+    STATUSES.forEach((s) => board[s].push(...(page[s] || [])));
+    // The first page's version is the one every later page is consistent with
+    if (syncVersion === null) syncVersion = page.sync_version ?? null;
+
+    const cursors = Object.values(page.next_cursor || {}).filter(Boolean);
+    if (!page.has_more || cursors.length === 0) break;
+    // Only the columns that still have rows are requested again
+    const statuses = cursors.map((c) => c.split(".")[0]);
+    query = `&status=${statuses.join(",")}` + cursors.map((c) => `&cursor=${encodeURIComponent(c)}`).join("");
+  }
+
+  return { ...board, sync_version: syncVersion };
+}
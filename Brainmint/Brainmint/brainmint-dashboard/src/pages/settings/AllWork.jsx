@@ -1,5 +1,6 @@
 // FILE: src/pages/settings/AllWork.jsx
 import React, { useState, useEffect } from "react";
+import { fetchBoard } from "../boardApi";
 
 const API_BASE = "http://localhost:8000/api";
 
@@ -23,11 +24,10 @@ export default function AllWork({ user }) {
     setLoading(true);
     setError("");
     try {
-      const [tasksRes, sprintsRes] = await Promise.all([
-        fetch(`${API_BASE}/tasks/?user_id=${userId}`),
+      const [tasksData, sprintsRes] = await Promise.all([
+        fetchBoard(API_BASE, userId),
         fetch(`${API_BASE}/sprints/?user_id=${userId}`),
       ]);
-      const tasksData = await tasksRes.json();
       const sprintsData = await sprintsRes.json();
 
       const allTasks = [
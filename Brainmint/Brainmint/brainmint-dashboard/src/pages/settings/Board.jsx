@@ -1,5 +1,6 @@
 import React, { useState, useEffect } from "react";
 import { Search, Filter, Plus } from "lucide-react";
+import { fetchBoard } from "../boardApi";
 
 const API_BASE_URL = "http://localhost:8000/api";
 
@@ -120,8 +121,7 @@ export default function Board({ user }) {
 
     try {
       setLoading(true);
-      const res = await fetch(`${API_BASE_URL}/tasks/?user_id=${userId}`);
-      const data = await res.json();
+      const data = await fetchBoard(API_BASE_URL, userId);
       console.log("📋 Board tasks:", data);
       setTasks(data);
     } catch (err) {
@@ -1,4 +1,5 @@
 import React, { useState, useEffect, useMemo, useCallback } from "react";
+import { fetchBoard } from "../boardApi";
 
 const API_BASE_URL = "http://localhost:8000/api";
 
@@ -335,11 +336,10 @@ export default function CalendarUI({ user }) {
 
     setLoading(true);
     try {
-      const [taskRes, sprintRes] = await Promise.all([
-        fetch(`${API_BASE_URL}/tasks/?user_id=${userId}`),
+      const [taskData, sprintRes] = await Promise.all([
+        fetchBoard(API_BASE_URL, userId),
         fetch(`${API_BASE_URL}/sprints/?user_id=${userId}`),
       ]);
-      const taskData   = await taskRes.json();
       const sprintData = await sprintRes.json();
 
       const all = [
@@ -365,18 +365,16 @@ export default function CalendarUI({ user }) {
   // ── Task Actions ───────────────────────────────────────────────
   const updateTask = async (updatedTask) => {
     try {
-      await Promise.all([
-        fetch(`${API_BASE_URL}/tasks/update-status/`, {
-          method: 'POST',
-          headers: { 'Content-Type': 'application/json' },
-          body: JSON.stringify({ task_id: updatedTask.id, status: updatedTask.status }),
-        }),
-        fetch(`${API_BASE_URL}/tasks/update-priority/`, {
-          method: 'POST',
-          headers: { 'Content-Type': 'application/json' },
-          body: JSON.stringify({ task_id: updatedTask.id, priority: updatedTask.priority }),
+      await fetch(`${API_BASE_URL}/tasks/batch/`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({
+          operations: [
+            { op: 'update-status', task_id: updatedTask.id, status: updatedTask.status },
+            { op: 'update-priority', task_id: updatedTask.id, priority: updatedTask.priority },
+          ],
         }),
-      ]);
+      });
 
       await fetchData();
     } catch (err) {
@@ -3,6 +3,19 @@ import React, { useState, useEffect, useRef } from "react";
 
 const API_BASE = "http://localhost:8000/api";
 
+// Repos and repo data come from the backend's sync cache; while a refresh
+// is pending, ask again every POLL_MS (at most POLL_LIMIT times)
+const POLL_MS = 2000;
+const POLL_LIMIT = 30;
+const NOT_SYNCED = "Still syncing. Try Refresh in a minute.";
+
+const syncedLabel = (sync) => {
+  if (!sync?.synced_at) return "Syncing…";
+  const minutes = Math.round((sync.age_seconds || 0) / 60);
+  const age = minutes < 1 ? "just now" : minutes < 60 ? `${minutes} min ago` : `${Math.round(minutes / 60)} h ago`;
+  return `Synced ${age}${sync.refreshing ? " · refreshing…" : ""}`;
+};
+
 const PLATFORMS = [
   {
     key: "github", label: "GitHub", icon: "🐙",
@@ -55,6 +68,16 @@ export default function Code({ user }) {
   const [repoData, setRepoData] = useState({});
   const [repoLoading, setRepoLoading] = useState({});
   const [repoErrors, setRepoErrors] = useState({});
+  const [repoSync, setRepoSync] = useState({});
+  const pollTimers = useRef({});
+  const autoSelected = useRef({});
+
+  useEffect(() => () => Object.values(pollTimers.current).forEach(clearTimeout), []);
+
+  const poll = (key, fn) => {
+    clearTimeout(pollTimers.current[key]);
+    pollTimers.current[key] = setTimeout(fn, POLL_MS);
+  };
 
   // Modal state
   const [modalPlatform, setModalPlatform] = useState(null);
@@ -86,32 +109,50 @@ export default function Code({ user }) {
   };
 
   // NEW: Fetch all repos for a platform
-  const fetchAllRepos = async (platform) => {
-    setReposLoading(p => ({ ...p, [platform]: true }));
+  const fetchAllRepos = async (platform, attempt = 0) => {
+    let pending = false;
+    if (attempt === 0) {
+      autoSelected.current[platform] = false;
+      setReposLoading(p => ({ ...p, [platform]: true }));
+    }
     try {
       const res = await fetch(`${API_BASE}/integrations/repos/?user_id=${userId}&platform=${platform}`);
       const data = await res.json();
       if (!res.ok) throw new Error(data.error);
 
-      setAllRepos(p => ({ ...p, [platform]: data.repos || [] }));
+      const repos = data.repos || [];
+      setAllRepos(p => ({ ...p, [platform]: repos }));
 
       // Auto-select first repo
-      if (data.repos && data.repos.length > 0) {
-        setSelectedRepo(p => ({ ...p, [platform]: data.repos[0].url }));
-        fetchRepoData(platform, data.repos[0].url);
+      if (repos.length > 0 && !autoSelected.current[platform]) {
+        autoSelected.current[platform] = true;
+        setSelectedRepo(p => ({ ...p, [platform]: repos[0].url }));
+        fetchRepoData(platform, repos[0].url);
+      }
+
+      if (data.sync?.refreshing && attempt < POLL_LIMIT) {
+        pending = !data.sync.synced_at;
+        poll(`repos:${platform}`, () => fetchAllRepos(platform, attempt + 1));
+      } else if (!data.sync?.synced_at) {
+        // The refresh failed, or polling gave up before the first sync landed
+        throw new Error(data.sync?.error || NOT_SYNCED);
       }
     } catch (err) {
       console.error(`Failed to fetch repos for ${platform}:`, err);
       setRepoErrors(p => ({ ...p, [platform]: err.message }));
     } finally {
-      setReposLoading(p => ({ ...p, [platform]: false }));
+      setReposLoading(p => ({ ...p, [platform]: pending }));
     }
   };
 
   // UPDATED: Fetch repo data with repo URL param
-  const fetchRepoData = async (platform, repoUrl) => {
-    setRepoLoading(p => ({ ...p, [platform]: true }));
-    setRepoErrors(p => ({ ...p, [platform]: null }));
+  const fetchRepoData = async (platform, repoUrl, attempt = 0) => {
+    let pending = false;
+    if (attempt === 0) {
+      clearTimeout(pollTimers.current[`repo:${platform}`]);
+      setRepoLoading(p => ({ ...p, [platform]: true }));
+      setRepoErrors(p => ({ ...p, [platform]: null }));
+    }
     try {
       const res = await fetch(
         `${API_BASE}/integrations/repo-data/?user_id=${userId}&platform=${platform}&repo_url=${encodeURIComponent(repoUrl)}`
@@ -119,13 +160,35 @@ export default function Code({ user }) {
       const data = await res.json();
       if (!res.ok) throw new Error(data.error);
       setRepoData(p => ({ ...p, [platform]: data.data }));
+      setRepoSync(p => ({ ...p, [platform]: data.sync }));
+
+      if (data.sync?.refreshing && attempt < POLL_LIMIT) {
+        pending = !data.data;
+        poll(`repo:${platform}`, () => fetchRepoData(platform, repoUrl, attempt + 1));
+      } else if (!data.data) {
+        throw new Error(data.sync?.error || NOT_SYNCED);
+      }
     } catch (err) {
       setRepoErrors(p => ({ ...p, [platform]: err.message }));
     } finally {
-      setRepoLoading(p => ({ ...p, [platform]: false }));
+      setRepoLoading(p => ({ ...p, [platform]: pending }));
     }
   };
 
+  // Queues a sync of the listing and the selected repo, then polls for it
+  const refreshRepos = async (platform) => {
+    const repoUrl = selectedRepo[platform];
+    await Promise.all([null, repoUrl].map(url =>
+      fetch(`${API_BASE}/integrations/refresh/`, {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ user_id: userId, platform, repo_url: url }),
+      })
+    ));
+    fetchAllRepos(platform, 1);
+    if (repoUrl) fetchRepoData(platform, repoUrl, 1);
+  };
+
   const openModal = (key) => {
     setAccessToken("");
     setModalError("");
@@ -389,6 +452,8 @@ export default function Code({ user }) {
                       <Badge color="#e6f4ea" text="#137333">🌿 {active.stats?.default_branch}</Badge>
                       <button onClick={() => handleDisconnect(activePlatform)} style={{ fontSize: 11, color: "#c5221f", background: "none", border: "1px solid #f5c6c4", borderRadius: 20, cursor: "pointer", padding: "2px 10px", fontWeight: 600 }}>Disconnect</button>
                       <button onClick={() => openModal(activePlatform)} style={{ fontSize: 11, color: "#1a73e8", background: "none", border: "1px solid #c5d9f1", borderRadius: 20, cursor: "pointer", padding: "2px 10px", fontWeight: 600 }}>Update Token</button>
+                      <button onClick={() => refreshRepos(activePlatform)} style={{ fontSize: 11, color: "#5f6368", background: "none", border: "1px solid #dadce0", borderRadius: 20, cursor: "pointer", padding: "2px 10px", fontWeight: 600 }}>↻ Refresh</button>
+                      <span style={{ fontSize: 11, color: "#9aa0a6", alignSelf: "center" }}>{syncedLabel(repoSync[activePlatform])}</span>
                     </div>
                   </div>
                   <div style={{ display: "flex", gap: 28 }}>
@@ -468,6 +533,24 @@ export default function Code({ user }) {
                   )}
                 </Card>
 
+                {/* Contributors (GitHub and GitLab only) */}
+                {active.contributors?.length > 0 && (
+                  <Card title="Top Contributors" icon="👥">
+                    <div style={{ display: "flex", flexWrap: "wrap", gap: 8 }}>
+                      {active.contributors.map((c, i) => (
+                        <Badge key={i} color="#f1f3f4" text="#3c4043">{c.name} · {c.commits}</Badge>
+                      ))}
+                    </div>
+                  </Card>
+                )}
+
+                {/* Parts the last sync couldn't load */}
+                {active.partial && (
+                  <div style={{ fontSize: 12, color: "#b06000", background: "#fef7e0", border: "1px solid #feefc3", borderRadius: 8, padding: "8px 12px" }}>
+                    Some data couldn't be loaded ({Object.keys(active.errors || {}).join(", ")}); it will be retried on the next sync.
+                  </div>
+                )}
+
                 {/* Repo URL footer */}
                 <div style={{ background: "#f8f9fa", borderRadius: 10, padding: "12px 16px", border: "1px solid #e8eaed", display: "flex", alignItems: "center", gap: 10, fontSize: 12, color: "#5f6368" }}>
                   <span>🔗</span>
@@ -1,4 +1,5 @@
 import React, { useState, useEffect, useMemo } from "react";
+import { fetchBoard } from "../boardApi";
 
 const API_BASE_URL = "http://localhost:8000/api";
 
@@ -214,11 +215,10 @@ export default function ListView({ user }) {
     (async () => {
       setLoading(true);
       try {
-        const [taskRes, sprintRes] = await Promise.all([
-          fetch(`${API_BASE_URL}/tasks/?user_id=${userId}`),
+        const [taskData, sprintRes] = await Promise.all([
+          fetchBoard(API_BASE_URL, userId),
           fetch(`${API_BASE_URL}/sprints/?user_id=${userId}`),
         ]);
-        const taskData   = await taskRes.json();
         const sprintData = await sprintRes.json();
 
         const all = [